@@ -4,16 +4,29 @@ BestReviews Wasabi Upload System - BR Assets Analysis
 
 Analyzes the br_assets folder structure in Wasabi, tracking UUID folders,
 batch organization, and duplicate detection.
+
+Usage:
+    python scripts/analysis/analyze_br_assets.py [--from-inventory] [--low-memory [--sort-run-size N]]
+
+Options:
+    --from-inventory    Read objects from the local inventory snapshot
+                        (see build_inventory.py) instead of listing the bucket
+    --low-memory        Run in a fixed memory budget: batch UUID/file counts are
+                        HyperLogLog estimates (~1% error) and UUID/filename
+                        duplicates are grouped from sorted runs spilled to disk
+    --sort-run-size N   Records held in memory per sorted run in --low-memory mode
+                        (default: 500000)
 """
 
 import sys
 import os
 from datetime import datetime
 import csv
-import re
 import signal
+import argparse
 from typing import Generator
 from collections import defaultdict
+from itertools import groupby
 
 # Add the scripts directory to Python path
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -21,6 +34,11 @@ scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
 from utils.credentials import get_s3_client, get_wasabi_credentials
+from utils.inventory import open_inventory, inventory_exists, require_snapshot, iter_objects
+from utils.listing import list_objects_parallel
+from utils.hyperloglog import HyperLogLog
+from utils.external_sort import DEFAULT_RUN_SIZE, ExternalSorter
+from utils.key_parser import find_uuid_segment
 
 class GracefulExit(Exception):
     pass
@@ -29,29 +47,42 @@ def signal_handler(signum, frame):
     print("\nGraceful shutdown initiated...")
     raise GracefulExit()
 
-def is_uuid_like(s: str) -> bool:
-    uuid_pattern = re.compile(r'[0-9a-f]{8}[-]?[0-9a-f]{4}[-]?[0-9a-f]{4}[-]?[0-9a-f]{4}[-]?[0-9a-f]{12}', re.I)
-    return bool(uuid_pattern.match(s))
-
-def list_objects(client, bucket: str, prefix: str = '') -> Generator[dict, None, None]:
-    """Generator function to yield objects from S3/Wasabi"""
-    paginator = client.get_paginator('list_objects_v2')
-    
+def list_objects(client, bucket: str, prefix: str = '', ordered: bool = True) -> Generator[dict, None, None]:
+    """Generator function to yield objects from S3/Wasabi, listing shards in parallel"""
     try:
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-            if 'Contents' in page:
-                for obj in page['Contents']:
-                    yield obj
+        yield from list_objects_parallel(client, bucket, prefix, ordered=ordered)
     except Exception as e:
         print(f"Error listing objects: {e}")
         raise
 
-def analyze_br_assets():
-    """Analyze br_assets folder structure with UUID tracking and duplicate detection."""
+def iter_duplicate_groups(sorter):
+    """Group sorted (uuid, filename, batch, key) records into (uuid_file_key, [(batch, key), ...])."""
+    for (uuid_folder, filename), records in groupby(sorter.sorted(), key=lambda r: (r[0], r[1])):
+        yield f"{uuid_folder}/{filename}", [(batch, full_key) for _, _, batch, full_key in records]
+
+def analyze_br_assets(from_inventory=False, low_memory=False, sort_run_size=DEFAULT_RUN_SIZE):
+    """
+    Analyze br_assets folder structure with UUID tracking and duplicate detection.
+
+    With low_memory, per-batch distinct counts use HyperLogLog and the
+    UUID/filename combinations are spilled to disk in sorted runs instead
+    of being held in a dict, so memory stays flat regardless of bucket size.
+    """
     # Get credentials
     creds = get_wasabi_credentials()
-    client = get_s3_client()
     bucket_name = creds['bucket']
+
+    if from_inventory:
+        if not inventory_exists():
+            print("No inventory database found. Run build_inventory.py first.")
+            return
+        conn = open_inventory()
+        if require_snapshot(conn, bucket_name, 'br_assets/') is None:
+            return
+        objects = iter_objects(conn, bucket_name, 'br_assets/')
+    else:
+        client = get_s3_client()
+        objects = list_objects(client, bucket_name, 'br_assets/')
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     base_filename = f'data/output/br_assets_analysis_{timestamp}'
@@ -76,12 +107,14 @@ def analyze_br_assets():
     
     # Track UUID/filename combinations for duplicate detection
     uuid_file_combo_to_paths = defaultdict(list)
+    combo_sorter = ExternalSorter(run_size=sort_run_size) if low_memory else None
     
-    # Track batch folder statistics
+    # Track batch folder statistics (approximate distinct counts in low-memory mode)
+    distinct_counter = HyperLogLog if low_memory else set
     batch_stats = defaultdict(lambda: {
         'total_files': 0,
-        'uuid_folders': set(),
-        'unique_files': set()
+        'uuid_folders': distinct_counter(),
+        'unique_files': distinct_counter()
     })
     
     # Open all files at start
@@ -110,7 +143,7 @@ def analyze_br_assets():
         print("Starting analysis... Press Ctrl+C to stop gracefully")
         
         try:
-            for obj in list_objects(client, bucket_name, 'br_assets/'):
+            for obj in objects:
                 total_objects += 1
                 
                 # Progress update every 1000 objects
@@ -128,36 +161,38 @@ def analyze_br_assets():
                 # Get filename (last part of the path)
                 filename = path_parts[-1] if not full_key.endswith('/') else ''
                 
-                # Track batch folders
-                batch = path_parts[1]
+                # Track batch folders (interned: a handful of names repeated millions of times)
+                batch = sys.intern(path_parts[1])
                 if batch not in batch_folders:
                     batch_folders.add(batch)
                     struct_writer.writerow([batch, 'batch', 'br_assets'])
                     struct_f.flush()
                 
                 # Look for UUID folders and count their files
-                uuid_folder = None
-                for part in path_parts:
-                    if is_uuid_like(part):
-                        uuid_folder = part
-                        if current_uuid != part:
-                            # Write previous UUID data if exists
-                            if current_uuid and current_batch:
-                                uuid_writer.writerow([current_batch, current_uuid, files_in_current_uuid])
-                                uuid_f.flush()
-                            
-                            current_uuid = part
-                            current_batch = batch
-                            files_in_current_uuid = 0
+                uuid_index = find_uuid_segment(path_parts)
+                uuid_folder = path_parts[uuid_index] if uuid_index is not None else None
+                if uuid_folder:
+                    if current_uuid != uuid_folder:
+                        # Write previous UUID data if exists
+                        if current_uuid and current_batch:
+                            uuid_writer.writerow([current_batch, current_uuid, files_in_current_uuid])
+                            uuid_f.flush()
                         
-                        if not full_key.endswith('/'):  # Count only files, not folders
-                            files_in_current_uuid += 1
+                        current_uuid = uuid_folder
+                        current_batch = batch
+                        files_in_current_uuid = 0
+                    
+                    if not full_key.endswith('/'):  # Count only files, not folders
+                        files_in_current_uuid += 1
                 
                 # Write detailed object information and track for duplicate analysis
                 if not full_key.endswith('/') and filename and uuid_folder:  # Only for actual files with UUID folders
                     # Track UUID/filename combo for duplicate detection
-                    uuid_file_key = f"{uuid_folder}/{filename}"
-                    uuid_file_combo_to_paths[uuid_file_key].append((batch, full_key))
+                    if low_memory:
+                        combo_sorter.add((uuid_folder, filename, batch, full_key))
+                    else:
+                        uuid_file_key = f"{uuid_folder}/{filename}"
+                        uuid_file_combo_to_paths[uuid_file_key].append((batch, full_key))
                     
                     # Update batch statistics
                     batch_stats[batch]['total_files'] += 1
@@ -188,7 +223,14 @@ def analyze_br_assets():
             # Analyze potential duplicates (same UUID/filename combo in different batch folders)
             print("\nAnalyzing potential UUID/filename duplicates across batches...")
             duplicate_uuid_file_count = 0
-            for uuid_file_key, occurrences in uuid_file_combo_to_paths.items():
+            total_combinations = 0
+            if low_memory:
+                print(f"Merging {len(combo_sorter.runs) or 1} sorted run(s) of {combo_sorter.count} files...")
+                combo_groups = iter_duplicate_groups(combo_sorter)
+            else:
+                combo_groups = uuid_file_combo_to_paths.items()
+            for uuid_file_key, occurrences in combo_groups:
+                total_combinations += 1
                 if len(occurrences) > 1:
                     # Check if the occurrences span multiple batch folders
                     batch_folders_in_dupes = set([batch for batch, _ in occurrences])
@@ -214,13 +256,18 @@ def analyze_br_assets():
             
             # Add stats
             stats_writer.writerow(['UUID/Filename Duplicates Across Batches', duplicate_uuid_file_count])
-            stats_writer.writerow(['Total UUID/Filename Combinations', len(uuid_file_combo_to_paths)])
+            stats_writer.writerow(['Total UUID/Filename Combinations', total_combinations])
             stats_writer.writerow(['Total Batch Folders', len(batch_folders)])
+            if low_memory:
+                stats_writer.writerow(['Batch Summary Distinct Counts', 'approximate (HyperLogLog)'])
         
         except GracefulExit:
             print("Gracefully shutting down...")
         
         finally:
+            if combo_sorter is not None:
+                combo_sorter.cleanup()
+
             # Write final statistics
             stats_writer.writerow(['Total Objects Processed', total_objects])
             
@@ -238,6 +285,16 @@ def analyze_br_assets():
             print(f"- {batch_summary_file}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Analyze the br_assets folder structure')
+    parser.add_argument('--from-inventory', action='store_true',
+                        help='Read objects from the local inventory instead of listing the bucket')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='Use HyperLogLog counts and on-disk sorted runs to bound memory')
+    parser.add_argument('--sort-run-size', type=int, default=DEFAULT_RUN_SIZE,
+                        help=f'Records per sorted run in --low-memory mode (default: {DEFAULT_RUN_SIZE})')
+    args = parser.parse_args()
+
     # Set up signal handler for graceful interruption
     signal.signal(signal.SIGINT, signal_handler)
-    analyze_br_assets()
\ No newline at end of file
+    analyze_br_assets(from_inventory=args.from_inventory, low_memory=args.low_memory,
+                      sort_run_size=args.sort_run_size)
\ No newline at end of file
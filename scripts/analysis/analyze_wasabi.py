@@ -12,10 +12,11 @@ scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
 from utils.credentials import get_s3_client, get_s3_resource, get_wasabi_credentials
+from utils.listing import list_objects_parallel
+from utils.key_parser import find_uuid_segment
 
 from datetime import datetime
 import csv
-import re
 import signal
 import sys
 from typing import Generator
@@ -31,20 +32,11 @@ def signal_handler(signum, frame):
     print("\nGraceful shutdown initiated...")
     raise GracefulExit()
 
-def get_s3_client():
-    return get_s3_client()  # Use utils version -> bool:
-    uuid_pattern = re.compile(r'[0-9a-f]{8}[-]?[0-9a-f]{4}[-]?[0-9a-f]{4}[-]?[0-9a-f]{4}[-]?[0-9a-f]{12}', re.I)
-    return bool(uuid_pattern.match(s))
-
 def list_objects(client, bucket: str, prefix: str = 'br_assets/') -> Generator[dict, None, None]:
-    """Generator function to yield objects from S3/Wasabi"""
-    paginator = client.get_paginator('list_objects_v2')
-    
+    """Generator function to yield objects from S3/Wasabi, listing shards in parallel"""
     try:
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-            if 'Contents' in page:
-                for obj in page['Contents']:
-                    yield obj
+        # Ordered so files of one UUID folder arrive together
+        yield from list_objects_parallel(client, bucket, prefix, ordered=True)
     except Exception as e:
         print(f"Error listing objects: {e}")
         raise
@@ -62,6 +54,7 @@ def analyze_full_bucket(bucket_name: str = None):
     batch_summary_file = f'{base_filename}_batch_summary.csv'
     
     client = get_s3_client()
+    bucket_name = bucket_name or get_bucket_name()
     
     # Counters for progress tracking
     total_objects = 0
@@ -147,28 +140,28 @@ def analyze_full_bucket(bucket_name: str = None):
                 # Look for UUID folders and count their files
                 uuid_folder = None
                 batch = None
-                for i, part in enumerate(path_parts):
-                    if is_uuid_like(part):
-                        uuid_folder = part
-                        # Find the batch folder context (the folder containing the UUID)
-                        if i > 0:
-                            if 'assets' in path_parts[0].lower() and i > 1:
-                                batch = path_parts[1]  # For assets, batch is the second element
-                            else:
-                                batch = path_parts[i-1]  # Otherwise, use the parent folder
-                        
-                        if current_uuid != part:
-                            # Write previous UUID data if exists
-                            if current_uuid and current_batch:
-                                uuid_writer.writerow([current_batch, current_uuid, files_in_current_uuid])
-                                uuid_f.flush()
-                            
-                            current_uuid = part
-                            current_batch = batch
-                            files_in_current_uuid = 0
+                i = find_uuid_segment(path_parts)
+                if i is not None:
+                    uuid_folder = path_parts[i]
+                    # Find the batch folder context (the folder containing the UUID)
+                    if i > 0:
+                        if 'assets' in path_parts[0].lower() and i > 1:
+                            batch = path_parts[1]  # For assets, batch is the second element
+                        else:
+                            batch = path_parts[i-1]  # Otherwise, use the parent folder
+                    
+                    if current_uuid != uuid_folder:
+                        # Write previous UUID data if exists
+                        if current_uuid and current_batch:
+                            uuid_writer.writerow([current_batch, current_uuid, files_in_current_uuid])
+                            uuid_f.flush()
                         
-                        if not full_key.endswith('/'):  # Count only files, not folders
-                            files_in_current_uuid += 1
+                        current_uuid = uuid_folder
+                        current_batch = batch
+                        files_in_current_uuid = 0
+                    
+                    if not full_key.endswith('/'):  # Count only files, not folders
+                        files_in_current_uuid += 1
                 
                 # Write detailed object information and track for duplicate analysis
                 if not full_key.endswith('/') and filename and uuid_folder:  # Only for actual files with UUID folders
@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 """
-Updated script to use secure credential management.
+Lists every file under br_assets/ and saves the paths to br_assets_file_list.csv.
+
+Usage:
+    python scripts/analysis/br_assets_files.py [--from-inventory]
+
+Options:
+    --from-inventory    Read keys from the local inventory snapshot
+                        (see build_inventory.py) instead of listing the bucket
 """
 
 import sys
@@ -11,60 +18,53 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
-from utils.credentials import get_s3_client, get_s3_resource, get_wasabi_credentials
+from utils.credentials import get_s3_client, get_wasabi_credentials
+from utils.inventory import open_inventory, inventory_exists, require_snapshot, iter_objects
+from utils.listing import list_objects_parallel
 
+import argparse
 import csv
 
-# Define Wasabi credentials and endpoint
-
-aws_secret_key = 'QoS75QP3FcQzofuRc98NC4TTcdsIh8qQmsbLzzYS'
-  # Replace with the correct Wasabi region
-  # Correct Wasabi endpoint
-
-# Create a session
-session = boto3.Session(
-    aws_access_key_id=aws_access_key,
-    aws_secret_access_key=aws_secret_key,
-    region_name=region_name
-)
-
-# Connect to S3-compatible resource using Wasabi's endpoint
-s3 = session.resource('s3', endpoint_url=endpoint_url)
-
-# Define your Wasabi bucket
-bucket_name = 'bestreviews.com'  # Replace with your bucket name
-bucket = s3.Bucket(bucket_name)
-
-# List to store file paths
-file_list = []
-
-#list unique folders in bucket
-unique_folders_in_bucket = set()
-
-for obj in bucket.objects.all():
-    folder_name = obj.key.split('/')[0]
-    unique_folders_in_bucket.add(folder_name)
-
-print("Unique folders in bucket:", unique_folders_in_bucket)
-print("Folders in CSV:", df['folder'].unique())
-
-
 # Function to list files in 'br_assets' and save to CSV
 def get_bucket_name():
     return get_wasabi_credentials()['bucket']
 
-def list_files_in_br_assets(bucket):
-    for obj in bucket.objects.filter(Prefix='br_assets/'):  # Filter for files in the 'br_assets' folder
-        file_list.append(obj.key)  # Add the file path to the list
-
+def iter_br_assets_keys(from_inventory=False):
+    """Yield every key under br_assets/ from the inventory or a bucket listing."""
+    bucket_name = get_bucket_name()
+
+    if from_inventory:
+        conn = open_inventory()
+        if require_snapshot(conn, bucket_name, 'br_assets/') is None:
+            return
+        for obj in iter_objects(conn, bucket_name, 'br_assets/'):
+            yield obj['Key']
+    else:
+        # Shards of 'br_assets/' are listed concurrently, in key order like the old listing
+        for obj in list_objects_parallel(get_s3_client(), bucket_name, 'br_assets/', ordered=True):
+            yield obj['Key']
+
+def list_files_in_br_assets(from_inventory=False):
     # Write the list of files to a CSV file
+    count = 0
     with open('br_assets_file_list.csv', mode='w', newline='') as file:
         writer = csv.writer(file)
         writer.writerow(['File Path'])  # Write the header
-        for file_key in file_list:
+        for file_key in iter_br_assets_keys(from_inventory):
             writer.writerow([file_key])  # Write each file path to a new row
+            count += 1
+
+    print(f"File list of {count} paths saved to 'br_assets_file_list.csv'")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List files under br_assets/")
+    parser.add_argument('--from-inventory', action='store_true',
+                        help='Read keys from the local inventory instead of listing the bucket')
+    args = parser.parse_args()
 
-    print("File list saved to 'br_assets_file_list.csv'")
+    if args.from_inventory and not inventory_exists():
+        print("No inventory database found. Run build_inventory.py first.")
+        sys.exit(1)
 
-# Run the function to list files and save to CSV
-list_files_in_br_assets(bucket)
+    # Run the function to list files and save to CSV
+    list_files_in_br_assets(from_inventory=args.from_inventory)
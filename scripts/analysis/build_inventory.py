@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+BestReviews Wasabi Upload System - Bucket Inventory Builder
+
+Lists the bucket (or a prefix) once and stores every object in the local
+inventory database used by the analysis and utility scripts, then updates
+the asset filter the uploader and HD comparison probe.
+
+Usage:
+    python scripts/analysis/build_inventory.py [--prefix "br_assets/"] [--db PATH]
+    python scripts/analysis/build_inventory.py --refresh [--prefix "br_assets/"] [--shard-depth 3]
+
+Options:
+    --prefix        Only inventory objects under this prefix (default: whole bucket)
+    --db            Inventory database path (default: data/inventory/bucket_inventory.db)
+    --refresh       Refresh the existing snapshot shard by shard instead of rebuilding it
+    --shard-depth   Path segments that define a shard for --refresh
+                    (default: 3, i.e. br_assets/BatchNN/xx/)
+    --show          Print the snapshot history and exit
+"""
+
+import sys
+import os
+import argparse
+import time
+
+# Add the scripts directory to Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(script_dir)
+sys.path.insert(0, scripts_dir)
+
+from utils.credentials import get_s3_client, get_wasabi_credentials
+from utils.inventory import INVENTORY_DB, open_inventory, build_snapshot, refresh_snapshot, latest_snapshot
+from utils.listing import list_objects_parallel
+from utils.bloom_filter import load_asset_filter
+
+def show_snapshots(conn):
+    rows = conn.execute('SELECT * FROM snapshots ORDER BY id').fetchall()
+    if not rows:
+        print("No snapshots recorded yet")
+        return
+    print(f"{'ID':>5}  {'Kind':<8} {'Bucket':<20} {'Prefix':<25} {'Completed':<28} Objects")
+    for row in rows:
+        print(f"{row['id']:>5}  {row['kind']:<8} {row['bucket']:<20} {row['prefix'] or '(all)':<25} "
+              f"{row['completed_at'] or 'incomplete':<28} {row['object_count'] or 0:,}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a local inventory snapshot of the Wasabi bucket')
+    parser.add_argument('--prefix', default='', help='Only inventory objects under this prefix')
+    parser.add_argument('--db', default=str(INVENTORY_DB), help='Inventory database path')
+    parser.add_argument('--refresh', action='store_true', help='Refresh the existing snapshot incrementally')
+    parser.add_argument('--shard-depth', type=int, default=3, help='Path segments that define a shard for --refresh')
+    parser.add_argument('--show', action='store_true', help='Print the snapshot history and exit')
+    args = parser.parse_args()
+
+    conn = open_inventory(args.db)
+
+    if args.show:
+        show_snapshots(conn)
+        return
+
+    creds = get_wasabi_credentials()
+    client = get_s3_client()
+    bucket = creds['bucket']
+
+    start_time = time.time()
+
+    if args.refresh:
+        prefix = args.prefix or 'br_assets/'
+        if latest_snapshot(conn, bucket, prefix) is None:
+            print(f"No completed snapshot covers '{prefix}'; run without --refresh first")
+            sys.exit(1)
+        print(f"Refreshing inventory of '{bucket}/{prefix}' in {args.db}...")
+        refresh_snapshot(conn, client, bucket, prefix, args.shard_depth)
+    else:
+        print(f"Building inventory of '{bucket}/{args.prefix}' in {args.db}...")
+        build_snapshot(conn, bucket, list_objects_parallel(client, bucket, args.prefix), args.prefix)
+
+    print(f"Inventory complete in {time.time() - start_time:.1f} seconds")
+
+    # Keep the uploaded-asset filter in step with the new snapshot
+    load_asset_filter(conn, bucket, db_path=args.db)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,35 @@
 #!/usr/bin/env python3
 """
-Updated script to use secure credential management.
+Find duplicate objects on Wasabi and write keep/remove plans.
+
+By default objects are duplicates when the same UUID/filename appears in
+more than one batch of the latest br_assets_analysis_*_details.csv. With
+--content, byte-identical objects are found whatever their UUID folder or
+filename, by grouping the listing (or inventory) on Size and ETag; see
+utils/content_dedup.py. Both modes keep the copy in the batch holding the
+most files and write the same wasabi_duplicates_to_remove_simple_*.csv
+path list for bulk_delete_assets.py.
+
+In --content mode only extra copies of the same asset (same normalized
+UUID and exact filename, e.g. Batch29/98/f3 vs Batch30/98/F3) go in that
+list. Identical bytes under other UUIDs or filenames, including filenames
+that differ only in case, are separate assets and are written to
+wasabi_content_duplicates_review_*.csv instead, which bulk_delete_assets.py
+is never pointed at.
+
+Usage:
+    python scripts/analysis/find_wasabi_duplicates.py
+    python scripts/analysis/find_wasabi_duplicates.py --content [--from-inventory] [--cross-etag]
+                                                      [--prefix "br_assets/"] [--min-size BYTES]
+
+Options:
+    --content          Group by content (Size + ETag) instead of UUID/filename
+    --from-inventory   Read objects from the local inventory instead of listing the bucket
+    --cross-etag       Also match same-size objects whose ETags differ because of
+                       multipart uploads, using ranged reads and streamed MD5s
+    --prefix           Prefix to scan in --content mode (default: br_assets/)
+    --min-size         Ignore objects smaller than this many bytes (default: 1)
+    --workers          Concurrent reads for --cross-etag (default: 8)
 """
 
 import sys
@@ -12,7 +41,12 @@ scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
 from utils.credentials import get_s3_client, get_s3_resource, get_wasabi_credentials
+from utils.content_dedup import DEFAULT_WORKERS, content_size, find_content_duplicates, split_by_asset
+from utils.inventory import open_inventory, inventory_exists, require_snapshot, iter_objects
+from utils.key_parser import parse_key
+from utils.listing import list_objects_parallel
 
+import argparse
 import csv
 import os
 import re
@@ -77,7 +111,7 @@ def load_wasabi_details(details_file):
     print(f"Found {len(duplicates)} duplicate UUID/filename combinations on Wasabi")
     return duplicates, batch_counts
 
-def analyze_duplicates(duplicates, batch_counts):
+def analyze_duplicates(duplicates, batch_counts, show_priority=True):
     """
     Analyze duplicate files and create removal recommendations.
     
@@ -98,9 +132,10 @@ def analyze_duplicates(duplicates, batch_counts):
     # Create batch priority map (higher count = higher priority)
     batch_priority = {batch: i for i, (batch, _) in enumerate(sorted_batches)}
     
-    print("\nBatch priority (higher number = keep these files):")
-    for batch, count in sorted_batches:
-        print(f"  {batch}: {count} files (priority: {batch_priority[batch]})")
+    if show_priority:
+        print("\nBatch priority (higher number = keep these files):")
+        for batch, count in sorted_batches:
+            print(f"  {batch}: {count} files (priority: {batch_priority[batch]})")
     
     print("\nAnalyzing duplicates and creating removal suggestions...")
     
@@ -120,36 +155,43 @@ def analyze_duplicates(duplicates, batch_counts):
         for path in sorted_paths[1:]:
             removal_list.append({
                 'full_key': path['full_key'],
-                'uuid_filename': uuid_filename,
+                'uuid_filename': path.get('uuid_filename', uuid_filename),
                 'batch': path['batch'],
-                'kept_in_batch': kept['batch']
+                'kept_in_batch': kept['batch'],
+                'kept_key': kept['full_key']
             })
     
     print(f"Identified {len(removal_list)} files for potential removal")
     return removal_list, kept_list
 
-def write_removal_lists(removal_list, output_prefix):
-    """Write removal list to CSV files"""
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    
-    # Write detailed removal list
-    detailed_file = f"{output_prefix}_detailed_{timestamp}.csv"
-    with open(detailed_file, 'w', newline='', encoding='utf-8') as f:
+def write_detailed_list(items, file_path):
+    """Write removal items with the copy each one duplicates."""
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow([
             "Full Object Key", 
             "UUID/Filename", 
             "Batch", 
-            "Kept In Batch"
+            "Kept In Batch",
+            "Kept Key"
         ])
         
-        for item in removal_list:
+        for item in items:
             writer.writerow([
                 item['full_key'],
                 item['uuid_filename'],
                 item['batch'],
-                item['kept_in_batch']
+                item['kept_in_batch'],
+                item['kept_key']
             ])
+
+def write_removal_lists(removal_list, output_prefix):
+    """Write removal list to CSV files"""
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    
+    # Write detailed removal list
+    detailed_file = f"{output_prefix}_detailed_{timestamp}.csv"
+    write_detailed_list(removal_list, detailed_file)
     
     # Write simple list (just object keys) for bulk delete script input
     simple_file = f"{output_prefix}_simple_{timestamp}.csv"
@@ -166,7 +208,95 @@ def write_removal_lists(removal_list, output_prefix):
     
     return detailed_file, simple_file
 
+def find_content_duplicate_plan(args):
+    """--content mode: group objects by Size/ETag and write the removal plan."""
+    creds = get_wasabi_credentials()
+    bucket = creds['bucket']
+    client = get_s3_client()
+
+    if args.from_inventory:
+        if not inventory_exists():
+            print("No inventory database found. Run build_inventory.py first.")
+            return
+        conn = open_inventory()
+        if require_snapshot(conn, bucket, args.prefix) is None:
+            return
+        objects = iter_objects(conn, bucket, args.prefix)
+    else:
+        print(f"Listing '{bucket}/{args.prefix}'...")
+        objects = list_objects_parallel(client, bucket, args.prefix)
+
+    start_time = time.time()
+    duplicates, batch_counts, stats = find_content_duplicates(
+        objects, client, bucket, cross_etag=args.cross_etag, min_size=args.min_size, workers=args.workers
+    )
+    print(f"Scanned {stats['objects']:,} objects in {time.time() - start_time:.2f} seconds")
+    print(f"Found {len(duplicates):,} groups of byte-identical objects "
+          f"({stats['same_etag_groups']:,} by Size/ETag, {stats['confirmed_groups']:,} confirmed by reading)")
+    if args.cross_etag:
+        print(f"Read {stats['bytes_read'] / (1024 ** 3):.2f} GB to confirm multipart groups")
+
+    # Show each removed copy under its own UUID/filename
+    for paths in duplicates.values():
+        for path in paths:
+            parts = parse_key(path['full_key'])
+            path['uuid_filename'] = f"{parts.uuid}/{parts.filename}" if parts.uuid else path['full_key']
+
+    # Only extra copies of one asset are safe to delete
+    same_asset, cross_asset = split_by_asset(duplicates)
+    removal_list, kept_list = analyze_duplicates(same_asset, batch_counts)
+
+    # Different assets sharing bytes: compare each asset's kept copy, for review only
+    kept = set(kept_list)
+    review_groups = {
+        content_id: [next((path for path in paths if path['full_key'] in kept), paths[0]) for paths in assets]
+        for content_id, assets in cross_asset.items()
+    }
+    review_list, _ = analyze_duplicates(review_groups, batch_counts, show_priority=False)
+
+    write_removal_lists(removal_list, "wasabi_duplicates_to_remove")
+    review_file = f"wasabi_content_duplicates_review_{time.strftime('%Y%m%d_%H%M%S')}.csv"
+    write_detailed_list(review_list, review_file)
+    print(f"3. Cross-UUID/filename copies for review only (not for bulk delete): {review_file}")
+
+    removable_bytes = sum(content_size(content_id) * (len(paths) - 1)
+                          for (content_id, _), paths in same_asset.items())
+    review_bytes = sum(content_size(content_id) * (len(paths) - 1) for content_id, paths in review_groups.items())
+
+    print("\nSummary:")
+    print(f"Total groups of identical content: {len(duplicates):,}")
+    print(f"Total files marked for removal (extra copies of the same asset): {len(removal_list):,}")
+    print(f"Total files kept (one copy of each): {len(kept_list):,}")
+    print(f"Storage reclaimable: {removable_bytes / (1024 ** 3):,.2f} GB")
+    print(f"Files sharing content with another UUID/filename: {len(review_list):,} "
+          f"({review_bytes / (1024 ** 3):,.2f} GB), listed for review only")
+
+    print("\nNext steps:")
+    print("1. Review the detailed list to verify removal recommendations")
+    print("2. Use the simple list with bulk_delete_assets.py to remove duplicates:")
+    print("   python bulk_delete_assets.py --csv-file \"wasabi_duplicates_to_remove_simple_TIMESTAMP.csv\" --dry-run")
+    print("   (Remove --dry-run when you're ready to actually delete)")
+    print("3. The review list holds separate assets: deleting one removes its UUID/filename,")
+    print("   so only act on it after checking nothing references that asset")
+
 def main():
+    parser = argparse.ArgumentParser(description='Find duplicate objects on Wasabi and write removal plans')
+    parser.add_argument('--content', action='store_true',
+                        help='Group by content (Size + ETag) instead of UUID/filename')
+    parser.add_argument('--from-inventory', action='store_true',
+                        help='Read objects from the local inventory instead of listing the bucket')
+    parser.add_argument('--cross-etag', action='store_true',
+                        help='Also match same-size objects whose multipart ETags differ, by reading them')
+    parser.add_argument('--prefix', default='br_assets/', help='Prefix to scan in --content mode (default: br_assets/)')
+    parser.add_argument('--min-size', type=int, default=1, help='Ignore objects smaller than this many bytes (default: 1)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Concurrent reads for --cross-etag (default: {DEFAULT_WORKERS})')
+    args = parser.parse_args()
+
+    if args.content:
+        find_content_duplicate_plan(args)
+        return
+
     # Get the most recent details file
     details_files = [f for f in os.listdir('.') if f.startswith('br_assets_analysis_') and f.endswith('_details.csv')]
     if not details_files:
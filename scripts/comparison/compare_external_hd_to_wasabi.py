@@ -12,38 +12,17 @@ scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
 from utils.credentials import get_s3_client, get_s3_resource, get_wasabi_credentials
+from utils.key_parser import parse_local_path
+from utils.asset_lists import header_index
+from utils.parallel_csv import DEFAULT_WORKERS, csv_rows, map_chunks
+from utils.inventory import INVENTORY_DB, open_inventory
+from utils.bloom_filter import UploadedAssetCheck, load_asset_filter
 
 import csv
 import os
-import re
 from collections import defaultdict
 import time
-
-def extract_uuid_and_filename(filepath):
-    """
-    Extract UUID and filename from a filepath like:
-    D:\OrganizedBatches\Batch1\00\00\00005048-8BA2-45A2-A9525155916759FB\WB7A3733.jpg
-    """
-    path_parts = filepath.replace('\\', '/').split('/')
-    
-    # Find the UUID part (usually the second-to-last segment)
-    uuid = None
-    for part in path_parts:
-        if re.match(r'[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}', part, re.I):
-            uuid = part
-            break
-    
-    # Get the filename (last segment)
-    filename = path_parts[-1] if len(path_parts) > 0 else None
-    
-    # Get batch folder (usually contains "Batch")
-    batch = None
-    for part in path_parts:
-        if "batch" in part.lower():
-            batch = part
-            break
-            
-    return batch, uuid, filename
+import argparse
 
 def get_uuid_file_combo(batch, uuid, filename):
     """Create a standardized UUID/filename combination"""
@@ -51,11 +30,43 @@ def get_uuid_file_combo(batch, uuid, filename):
         return f"{uuid}/{filename}"
     return None
 
-def load_external_hd_files(file_path):
+def external_hd_chunk(text, header):
+    """Parse a range of the external HD CSV into ({uuid_file_combo: filepath}, batch counts)."""
+    external_files = {}
+    batch_stats = defaultdict(int)
+    path_index = header_index(header, 'FilePath')
+    for row in csv_rows(text):
+        filepath = row[path_index] if path_index is not None and path_index < len(row) else None
+        if not filepath:
+            continue
+        
+        batch, uuid, filename = parse_local_path(filepath)
+        if batch:
+            batch_stats[batch] += 1
+        
+        uuid_file_combo = get_uuid_file_combo(batch, uuid, filename)
+        if uuid_file_combo:
+            external_files[uuid_file_combo] = filepath
+    return external_files, batch_stats
+
+def wasabi_chunk(text, header):
+    """Parse a range of the Wasabi details CSV into a set of uuid_file_combos."""
+    wasabi_files = set()
+    uuid_index = header_index(header, 'UUID Folder')
+    filename_index = header_index(header, 'Filename')
+    for row in csv_rows(text):
+        uuid = row[uuid_index] if uuid_index is not None and uuid_index < len(row) else None
+        filename = row[filename_index] if filename_index is not None and filename_index < len(row) else None
+        if uuid and filename:
+            wasabi_files.add(f"{uuid}/{filename}")
+    return wasabi_files
+
+def load_external_hd_files(file_path, workers=1):
     """
     Load external HD files from CSV file:
     - Assumes CSV has a header row with 'FilePath' column
     - Returns a dictionary with uuid_file_combo as key and original filepath as value
+    - With workers > 1 the file is parsed in chunks across processes
     """
     external_files = {}
     batch_stats = defaultdict(int)
@@ -65,28 +76,36 @@ def load_external_hd_files(file_path):
     total_rows = 0
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                total_rows += 1
-                if total_rows % 10000 == 0:
-                    elapsed = time.time() - start_time
-                    print(f"Processed {total_rows} rows in {elapsed:.2f} seconds ({total_rows/elapsed:.2f} rows/sec)")
-                
-                # Get the filepath from the CSV
-                filepath = row.get('FilePath')
-                if not filepath:
-                    continue
-                
-                # Extract UUID and filename
-                batch, uuid, filename = extract_uuid_and_filename(filepath)
-                if batch:
-                    batch_stats[batch] += 1
-                
-                # Create UUID/filename combo
-                uuid_file_combo = get_uuid_file_combo(batch, uuid, filename)
-                if uuid_file_combo:
-                    external_files[uuid_file_combo] = filepath
+        if workers > 1:
+            _, results = map_chunks(file_path, external_hd_chunk, workers)
+            # Later chunks win, as later rows did when read line by line
+            for chunk_files, chunk_stats in results:
+                external_files.update(chunk_files)
+                for batch, count in chunk_stats.items():
+                    batch_stats[batch] += count
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    total_rows += 1
+                    if total_rows % 10000 == 0:
+                        elapsed = time.time() - start_time
+                        print(f"Processed {total_rows} rows in {elapsed:.2f} seconds ({total_rows/elapsed:.2f} rows/sec)")
+                    
+                    # Get the filepath from the CSV
+                    filepath = row.get('FilePath')
+                    if not filepath:
+                        continue
+                    
+                    # Extract UUID and filename
+                    batch, uuid, filename = parse_local_path(filepath)
+                    if batch:
+                        batch_stats[batch] += 1
+                    
+                    # Create UUID/filename combo
+                    uuid_file_combo = get_uuid_file_combo(batch, uuid, filename)
+                    if uuid_file_combo:
+                        external_files[uuid_file_combo] = filepath
     
     except Exception as e:
         print(f"Error loading external HD files: {e}")
@@ -99,11 +118,12 @@ def load_external_hd_files(file_path):
     
     return external_files
 
-def load_wasabi_files(file_path):
+def load_wasabi_files(file_path, workers=1):
     """
     Load files already on Wasabi from the details CSV file:
     - Assumes CSV has headers with 'Full Object Key', 'Filename', 'UUID Folder' columns
     - Returns a set of uuid_file_combos
+    - With workers > 1 the file is parsed in chunks across processes
     """
     wasabi_files = set()
     print(f"Loading Wasabi files from {file_path}...")
@@ -111,20 +131,25 @@ def load_wasabi_files(file_path):
     total_rows = 0
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                total_rows += 1
-                if total_rows % 10000 == 0:
-                    elapsed = time.time() - start_time
-                    print(f"Processed {total_rows} rows in {elapsed:.2f} seconds ({total_rows/elapsed:.2f} rows/sec)")
-                
-                uuid = row.get('UUID Folder')
-                filename = row.get('Filename')
-                
-                if uuid and filename:
-                    uuid_file_combo = f"{uuid}/{filename}"
-                    wasabi_files.add(uuid_file_combo)
+        if workers > 1:
+            _, results = map_chunks(file_path, wasabi_chunk, workers)
+            for chunk_files in results:
+                wasabi_files.update(chunk_files)
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    total_rows += 1
+                    if total_rows % 10000 == 0:
+                        elapsed = time.time() - start_time
+                        print(f"Processed {total_rows} rows in {elapsed:.2f} seconds ({total_rows/elapsed:.2f} rows/sec)")
+                    
+                    uuid = row.get('UUID Folder')
+                    filename = row.get('Filename')
+                    
+                    if uuid and filename:
+                        uuid_file_combo = f"{uuid}/{filename}"
+                        wasabi_files.add(uuid_file_combo)
     
     except Exception as e:
         print(f"Error loading Wasabi files: {e}")
@@ -154,25 +179,45 @@ def find_missing_files(external_files, wasabi_files):
     return missing_files
 
 def main():
-    # Get the most recent details file based on timestamp in filename
-    details_files = [f for f in os.listdir('.') if f.startswith('br_assets_analysis_') and f.endswith('_details.csv')]
-    if not details_files:
-        print("No Wasabi details files found. Please run analyze_br_assets.py first.")
-        return
-    
-    # Sort by timestamp (newest first)
-    details_files.sort(reverse=True)
-    wasabi_details_file = details_files[0]
-    print(f"Using most recent Wasabi details file: {wasabi_details_file}")
+    parser = argparse.ArgumentParser(description='Find external HD files that are not yet on Wasabi')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                      help=f'Processes parsing each list in chunks (default: {DEFAULT_WORKERS}; 1 reads line by line)')
+    parser.add_argument('--inventory', action='store_true',
+                      help='Check against the local inventory through its asset filter instead of a details CSV')
+    parser.add_argument('--db', default=str(INVENTORY_DB), help='Inventory database path for --inventory')
+    args = parser.parse_args()
+    
+    if args.inventory:
+        # Filter probes answer most files; only filter hits query the inventory
+        conn = open_inventory(args.db)
+        bucket = get_wasabi_credentials()['bucket']
+        bloom = load_asset_filter(conn, bucket, db_path=args.db)
+        if bloom is None:
+            return
+        wasabi_files = UploadedAssetCheck(conn, bucket, bloom)
+    else:
+        # Get the most recent details file based on timestamp in filename
+        details_files = [f for f in os.listdir('.') if f.startswith('br_assets_analysis_') and f.endswith('_details.csv')]
+        if not details_files:
+            print("No Wasabi details files found. Please run analyze_br_assets.py first.")
+            return
+        
+        # Sort by timestamp (newest first)
+        details_files.sort(reverse=True)
+        wasabi_details_file = details_files[0]
+        print(f"Using most recent Wasabi details file: {wasabi_details_file}")
     
     external_hd_file = 'external_hd_files.csv'
     
     # Load files
-    external_files = load_external_hd_files(external_hd_file)
-    wasabi_files = load_wasabi_files(wasabi_details_file)
+    external_files = load_external_hd_files(external_hd_file, args.workers)
+    if not args.inventory:
+        wasabi_files = load_wasabi_files(wasabi_details_file, args.workers)
     
     # Compare and find missing files
     missing_files = find_missing_files(external_files, wasabi_files)
+    if args.inventory:
+        wasabi_files.print_stats()
     
     # Write results to file
     output_file = f'missing_files_{time.strftime("%Y%m%d_%H%M%S")}.csv'
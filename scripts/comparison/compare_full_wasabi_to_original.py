@@ -1,6 +1,30 @@
 #!/usr/bin/env python3
 """
-Updated script to use secure credential management.
+Compare the original asset list against Wasabi and/or external HD lists.
+
+For every compared source the assets missing from it and the extra assets
+it holds are written to CSV, with a script that creates the folders for
+the missing ones. Several sources (Wasabi and any number of external HD
+lists) can be compared in one run.
+
+With --low-memory every source is normalized into sorted run files on
+disk and all of them are compared in one streaming k-way merge, so memory
+stays bounded by --sort-run-size however long the lists are.
+
+Usage:
+    python scripts/comparison/compare_full_wasabi_to_original.py [--source wasabi external_hd]
+                                                                 [--external-hd-file FILE ...]
+                                                                 [--low-memory] [--sort-run-size N]
+                                                                 [--workers N]
+
+Options:
+    --source              Sources to compare against the original list (default: wasabi)
+    --external-hd-file    External HD list; repeat for several drives
+                          (default: external_hd_files_final_may_3_2025.csv)
+    --low-memory          Compare sorted runs on disk instead of in-memory sets
+    --sort-run-size N     Records per sorted run in --low-memory mode (default: 500000)
+    --workers N           Processes parsing each list in chunks (default: CPU count;
+                          1 reads line by line)
 """
 
 import sys
@@ -12,381 +36,372 @@ scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
 from utils.credentials import get_s3_client, get_s3_resource, get_wasabi_credentials
+from utils.asset_set import AssetSet
+from utils.asset_lists import (iter_external_hd_files, iter_original_list, iter_wasabi_files,
+                               load_asset_set, merge_sorted_sources, sort_source)
+from utils.external_sort import DEFAULT_RUN_SIZE
+from utils.parallel_csv import DEFAULT_WORKERS
 
 import csv
 import os
-import re
 from collections import defaultdict
 import time
 import argparse
 
-def extract_uuid_and_filename(filepath):
-    """
-    Extract UUID and filename from a path like:
-    E70CC37E-AA88-4D59-831AB9C37C662207/_592A1080.jpg
-    """
-    # Handle different possible formats
-    if '/' in filepath:
-        # If path has slash, split on the last one
-        parts = filepath.strip().split('/')
-        if len(parts) >= 2:
-            uuid = parts[-2]
-            filename = parts[-1]
-            return uuid, filename
-    
-    # Format like UUID/filename
-    uuid_match = re.search(r'([0-9A-F]{8}-?[0-9A-F]{4}-?[0-9A-F]{4}-?[0-9A-F]{4}-?[0-9A-F]{12})', filepath, re.I)
-    if uuid_match:
-        uuid = uuid_match.group(1)
-        # Assume filename is after the UUID
-        rest = filepath[filepath.find(uuid) + len(uuid):].strip()
-        if rest.startswith('/') or rest.startswith('\\'):
-            rest = rest[1:]
-        
-        if rest:
-            return uuid, rest
-    
-    # Format like UUID_filename.jpg
-    parts = filepath.split('_', 1)
-    if len(parts) == 2 and re.match(r'[0-9A-F]{8,}', parts[0], re.I):
-        return parts[0], '_' + parts[1]
-    
-    # Last resort - just treat the whole thing as a filename
-    return None, filepath
-
-def normalize_uuid(uuid):
-    """Normalize UUID format by removing hyphens and converting to uppercase"""
-    if not uuid:
-        return None
-    
-    # Remove any hyphens
-    uuid = uuid.replace('-', '')
-    
-    # Convert to uppercase
-    return uuid.upper()
-
-def normalize_filename(filename):
-    """Normalize filename by removing leading/trailing whitespace"""
-    if not filename:
-        return None
-    
-    return filename.strip()
-
-def get_uuid_file_combo(uuid, filename):
-    """Create a standardized UUID/filename combination for comparison"""
-    if uuid and filename:
-        return f"{normalize_uuid(uuid)}/{normalize_filename(filename)}"
-    return None
-
-def load_original_list(file_path):
+DEFAULT_EXTERNAL_HD_FILE = 'external_hd_files_final_may_3_2025.csv'
+
+def load_original_list(file_path, workers=1):
     """
     Load the original asset list from CSV file.
-    Returns a set of normalized UUID/filename combinations and a mapping of normalized to original UUIDs
+    Returns an AssetSet of normalized UUID/filename combinations that also
+    keeps the original UUID format of every entry
     """
-    original_assets = set()
-    original_uuid_map = {}  # Maps normalized UUID to original UUID format
-    skipped_lines = 0
-    total_lines = 0
-    
+    original_assets = AssetSet()
     print(f"Loading original asset list from {file_path}...")
     start_time = time.time()
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-            # Skip header if present
-            header = f.readline().strip()
-            if header.lower().startswith('original'):
-                print(f"Skipping header: '{header}'")
-            else:
-                # If not a header, process the line
-                uuid, filename = extract_uuid_and_filename(header)
-                if uuid and filename:
-                    # Store original UUID format
-                    original_uuid_map[normalize_uuid(uuid)] = uuid
-                    
-                    combo = get_uuid_file_combo(uuid, filename)
-                    if combo:
-                        original_assets.add(combo)
-                    else:
-                        skipped_lines += 1
-            
-            # Process the rest of the file
-            for line_num, line in enumerate(f, 2):
-                total_lines += 1
-                
-                if total_lines % 10000 == 0:
-                    elapsed = time.time() - start_time
-                    print(f"Processed {total_lines:,} lines in {elapsed:.2f} seconds ({total_lines/elapsed:.2f} lines/sec)")
-                
-                line = line.strip()
-                if not line:
-                    skipped_lines += 1
-                    continue
-                
-                uuid, filename = extract_uuid_and_filename(line)
-                
-                if uuid and filename:
-                    # Store original UUID format
-                    original_uuid_map[normalize_uuid(uuid)] = uuid
-                    
-                    combo = get_uuid_file_combo(uuid, filename)
-                    if combo:
-                        original_assets.add(combo)
-                    else:
-                        skipped_lines += 1
-                else:
-                    skipped_lines += 1
-                    # Log a few examples of lines we couldn't parse
-                    if skipped_lines <= 5:
-                        print(f"Warning: Could not parse line {line_num}: '{line}'")
-    
-    except Exception as e:
-        print(f"Error loading original list: {e}")
-    
+
+    if workers > 1:
+        try:
+            original_assets = load_asset_set(file_path, 'original', workers, keep_format=True)
+        except Exception as e:
+            print(f"Error loading original list: {e}")
+    else:
+        for uuid, filename in iter_original_list(file_path):
+            # Keep the original UUID format alongside the normalized one
+            original_assets.add(uuid, filename, keep_format=True)
+
     elapsed = time.time() - start_time
     print(f"Loaded {len(original_assets):,} original assets in {elapsed:.2f} seconds")
-    print(f"Stored {len(original_uuid_map):,} original UUID formats")
-    print(f"Skipped {skipped_lines:,} lines that could not be parsed")
-    
-    return original_assets, original_uuid_map
 
-def load_wasabi_files(file_path):
-    """
-    Load files currently on Wasabi from the details CSV file.
-    Returns a set of normalized UUID/filename combinations.
-    """
-    wasabi_assets = set()
-    print(f"Loading Wasabi files from {file_path}...")
-    start_time = time.time()
-    total_rows = 0
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                total_rows += 1
-                if total_rows % 10000 == 0:
-                    elapsed = time.time() - start_time
-                    print(f"Processed {total_rows:,} rows in {elapsed:.2f} seconds ({total_rows/elapsed:.2f} rows/sec)")
-                
-                # Get UUID Folder from the updated output
-                uuid = row.get('UUID Folder')
-                filename = row.get('Filename')
-                
-                combo = get_uuid_file_combo(uuid, filename)
-                if combo:
-                    wasabi_assets.add(combo)
-    
-    except Exception as e:
-        print(f"Error loading Wasabi files: {e}")
-    
-    elapsed = time.time() - start_time
-    print(f"Loaded {len(wasabi_assets):,} Wasabi files in {elapsed:.2f} seconds")
-    
-    return wasabi_assets
+    return original_assets
 
-def load_external_hd_files(file_path):
-    """
-    Load files from the external HD CSV file.
-    Returns a set of normalized UUID/filename combinations.
-    """
-    external_assets = set()
-    print(f"Loading external HD files from {file_path}...")
+def load_source(source, workers=1):
+    """Load one compared source into an AssetSet."""
+    assets = AssetSet()
+    print(f"Loading {source['name']} files from {source['file']}...")
     start_time = time.time()
-    total_rows = 0
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                total_rows += 1
-                if total_rows % 10000 == 0:
-                    elapsed = time.time() - start_time
-                    print(f"Processed {total_rows:,} rows in {elapsed:.2f} seconds ({total_rows/elapsed:.2f} rows/sec)")
-                
-                # Get the filepath from the external HD file
-                filepath = row.get('FilePath', '')
-                if filepath:
-                    uuid, filename = extract_uuid_and_filename(filepath)
-                    combo = get_uuid_file_combo(uuid, filename)
-                    if combo:
-                        external_assets.add(combo)
-    
-    except Exception as e:
-        print(f"Error loading external HD files: {e}")
-    
+
+    if workers > 1:
+        try:
+            assets = load_asset_set(source['file'], source['kind'], workers)
+        except Exception as e:
+            print(f"Error loading {source['name']} files: {e}")
+    else:
+        for uuid, filename in source['reader'](source['file']):
+            assets.add(uuid, filename)
+
     elapsed = time.time() - start_time
-    print(f"Loaded {len(external_assets):,} external HD files in {elapsed:.2f} seconds")
-    
-    return external_assets
+    print(f"Loaded {len(assets):,} {source['name']} files in {elapsed:.2f} seconds")
+
+    return assets
 
 def find_missing_assets(original_assets, external_assets):
     """Find assets in the original list that are not in external HD"""
     missing_assets = original_assets - external_assets
-    
+
     print(f"Found {len(missing_assets):,} missing assets")
     return missing_assets
 
 def find_extra_assets(original_assets, external_assets):
     """Find assets in external HD that are not in the original list"""
     extra_assets = external_assets - original_assets
-    
+
     print(f"Found {len(extra_assets):,} extra assets in external HD")
     return extra_assets
 
-def format_for_ftp_download(missing_assets, original_uuid_map):
+def format_for_ftp_download(assets, original_assets=None):
     """
-    Format missing assets for FTP download, creating a list of asset paths.
-    Uses the original UUID format with hyphens if available.
+    Format assets for FTP download, creating a list of asset paths.
+    Uses the original UUID format with hyphens if available: the format each
+    entry was loaded with, else the one original_assets has for that UUID.
     """
-    formatted_list = []
-    
-    for combo in missing_assets:
-        norm_uuid, filename = combo.split('/')
-        
-        # Use original UUID format if available, otherwise use normalized
-        original_uuid = original_uuid_map.get(norm_uuid, norm_uuid)
-        
-        # Format as UUID/filename for FTP path
-        formatted_list.append(f"{original_uuid}/{filename}")
-    
-    return formatted_list
+    return list(assets.paths(spellings=original_assets))
 
-def main():
-    # Set up command line arguments
-    parser = argparse.ArgumentParser(description='Compare assets between different sources')
-    parser.add_argument('--source', choices=['wasabi', 'external_hd'], default='wasabi',
-                      help='Source to compare against original list (default: wasabi)')
-    args = parser.parse_args()
+class ComparisonOutput:
+    """Missing and extra asset CSVs plus the folder creation script for one compared source."""
 
-    original_list_file = 'original_list.csv'
-    
-    # Load original list
-    original_assets, original_uuid_map = load_original_list(original_list_file)
-    
-    if args.source == 'wasabi':
+    def __init__(self, source, timestamp):
+        self.source = source
+        self.missing_file = f"{source['missing_prefix']}_{timestamp}.csv"
+        self.extra_file = f"{source['extra_prefix']}_{timestamp}.csv"
+        self.script_file = f"{source['script_prefix']}_{timestamp}.sh"
+        self.missing = 0
+        self.extra = 0
+        self.common = 0
+
+        self._missing_f = open(self.missing_file, 'w', newline='', encoding='utf-8')
+        self._extra_f = open(self.extra_file, 'w', newline='', encoding='utf-8')
+        self._missing_writer = csv.writer(self._missing_f)
+        self._extra_writer = csv.writer(self._extra_f)
+        self._missing_writer.writerow(["AssetPath"])
+        self._extra_writer.writerow(["AssetPath"])
+
+        self._script_f = open(self.script_file, 'w', encoding='utf-8')
+        self._script_f.write("#!/bin/bash\n\n")
+        self._script_f.write("# Script to create folder structure for missing assets\n")
+        self._script_f.write("# Created on " + time.strftime("%Y-%m-%d %H:%M:%S") + "\n\n")
+        self._script_f.write("BASE_DIR=\"missing_assets\"\n")
+        self._script_f.write("mkdir -p \"$BASE_DIR\"\n\n")
+
+    def add_missing(self, path):
+        self._missing_writer.writerow([path])
+        self.missing += 1
+
+    def add_extra(self, path):
+        self._extra_writer.writerow([path])
+        self.extra += 1
+
+    def add_folder(self, uuid):
+        self._script_f.write(f"mkdir -p \"$BASE_DIR/{uuid}\"\n")
+
+    def close(self):
+        self._missing_f.close()
+        self._extra_f.close()
+        self._script_f.close()
+        # Make the script executable
+        os.chmod(self.script_file, 0o755)
+
+def compare_in_memory(original_list_file, sources, timestamp, workers=1):
+    """Compare each source against the original list with in-memory AssetSets."""
+    original_assets = load_original_list(original_list_file, workers)
+    outputs = []
+
+    for source in sources:
+        comparison_assets = load_source(source, workers)
+
+        # Find missing and extra assets
+        missing_assets = find_missing_assets(original_assets, comparison_assets)
+        extra_assets = find_extra_assets(original_assets, comparison_assets)
+
+        output = ComparisonOutput(source, timestamp)
+        output.total = len(comparison_assets)
+        output.common = len(comparison_assets) - len(extra_assets)
+
+        # Format for FTP download - using original UUID format
+        formatted_missing = format_for_ftp_download(missing_assets)
+        for path in formatted_missing:
+            output.add_missing(path)
+        for path in format_for_ftp_download(extra_assets, original_assets):
+            output.add_extra(path)
+
+        # Create unique directories based on UUID - using original format
+        unique_uuids = set()
+        for path in formatted_missing:
+            unique_uuids.add(path.split('/')[0])
+        for uuid in sorted(unique_uuids):
+            output.add_folder(uuid)
+
+        output.close()
+        outputs.append(output)
+
+    return len(original_assets), outputs
+
+def compare_sorted(original_list_file, sources, timestamp, run_size=DEFAULT_RUN_SIZE):
+    """
+    Compare every source against the original list in one streaming merge
+    of sorted runs. Memory is bounded by run_size and one UUID folder.
+    """
+    sorters = []
+    try:
+        print(f"Sorting original asset list from {original_list_file}...")
+        sorters.append(sort_source(iter_original_list(original_list_file), run_size, keep_format=True))
+        for source in sources:
+            print(f"Sorting {source['name']} files from {source['file']}...")
+            sorters.append(sort_source(source['reader'](source['file']), run_size))
+
+        outputs = [ComparisonOutput(source, timestamp) for source in sources]
+        for output in outputs:
+            output.total = 0
+        original_total = 0
+        start_time = time.time()
+
+        print(f"Merging {len(sorters)} sorted sources...")
+        for norm, spelling, files in merge_sorted_sources(sorters):
+            # Use original UUID format if available, otherwise use normalized
+            uuid = spelling or norm
+            original_total += sum(1 for _, present in files if 0 in present)
+
+            for index, output in enumerate(outputs, 1):
+                has_missing = False
+                for filename, present in files:
+                    in_original = 0 in present
+                    in_source = index in present
+                    if in_source:
+                        output.total += 1
+                    if in_original and in_source:
+                        output.common += 1
+                    elif in_original:
+                        output.add_missing(f"{uuid}/{filename}")
+                        has_missing = True
+                    elif in_source:
+                        output.add_extra(f"{uuid}/{filename}")
+                if has_missing:
+                    output.add_folder(uuid)
+
+        for output in outputs:
+            output.close()
+            print(f"{output.source['name']}: {output.missing:,} missing, {output.extra:,} extra, "
+                  f"{output.common:,} in both")
+        print(f"Merged in {time.time() - start_time:.2f} seconds")
+
+        return original_total, outputs
+
+    finally:
+        for sorter in sorters:
+            sorter.cleanup()
+
+def resolve_sources(args):
+    """Build the list of sources to compare from the command line."""
+    sources = []
+
+    if 'wasabi' in args.source:
         # Get the most recent details file from analyze_full_bucket.py
         details_files = [f for f in os.listdir('.') if f.startswith('full_bucket_analysis_') and f.endswith('_details.csv')]
         if not details_files:
             print("No Wasabi details files found. Please run analyze_full_bucket.py first.")
-            return
-        
+            return None
+
         details_files.sort(reverse=True)
         wasabi_details_file = details_files[0]
         print(f"Using most recent Wasabi details file: {wasabi_details_file}")
-        
-        # Load Wasabi files
-        comparison_assets = load_wasabi_files(wasabi_details_file)
-        source_name = "Wasabi"
-        missing_prefix = "missing_assets_for_ftp"
-        extra_prefix = "extra_assets_in_wasabi"
-        upload_instructions = "3. Connect to the SFTP site and download the missing assets into the created folders\n\n"
-    else:  # external_hd
-        external_hd_file = 'external_hd_files_final_may_3_2025.csv'
-        if not os.path.exists(external_hd_file):
-            print(f"External HD file not found: {external_hd_file}")
-            return
-            
-        # Load external HD files
-        comparison_assets = load_external_hd_files(external_hd_file)
-        source_name = "external HD"
-        missing_prefix = "missing_assets_in_external_hd"
-        extra_prefix = "extra_assets_in_external_hd"
-        upload_instructions = "3. Copy the missing assets from the original source into the created folders\n\n"
-    
-    # Find missing and extra assets
-    missing_assets = find_missing_assets(original_assets, comparison_assets)
-    extra_assets = find_extra_assets(original_assets, comparison_assets)
-    
-    # Format for FTP download - using original UUID format
-    formatted_missing = format_for_ftp_download(missing_assets, original_uuid_map)
-    formatted_extra = format_for_ftp_download(extra_assets, original_uuid_map)
-    
-    # Write missing assets to a file
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    missing_output_file = f"{missing_prefix}_{timestamp}.csv"
-    extra_output_file = f"{extra_prefix}_{timestamp}.csv"
-    
-    with open(missing_output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(["AssetPath"])
-        for path in formatted_missing:
-            writer.writerow([path])
-    
-    with open(extra_output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(["AssetPath"])
-        for path in formatted_extra:
-            writer.writerow([path])
-    
-    print(f"\nResults written to {missing_output_file}")
-    print(f"Extra assets written to {extra_output_file}")
-    
-    # Generate folder structure creation script
-    script_file = f"create_folders_for_missing_{timestamp}.sh"
-    
-    with open(script_file, 'w', encoding='utf-8') as f:
-        f.write("#!/bin/bash\n\n")
-        f.write("# Script to create folder structure for missing assets\n")
-        f.write("# Created on " + time.strftime("%Y-%m-%d %H:%M:%S") + "\n\n")
-        f.write("BASE_DIR=\"missing_assets\"\n")
-        f.write("mkdir -p \"$BASE_DIR\"\n\n")
-        
-        # Create unique directories based on UUID - using original format
-        unique_uuids = set()
-        for path in formatted_missing:
-            uuid = path.split('/')[0]
-            unique_uuids.add(uuid)
-        
-        for uuid in sorted(unique_uuids):
-            f.write(f"mkdir -p \"$BASE_DIR/{uuid}\"\n")
-    
-    # Make the script executable
-    os.chmod(script_file, 0o755)
-    
-    print(f"Folder creation script written to {script_file}")
-    print(f"Run this script to create the folder structure for the missing assets")
-    
-    # Generate a README with instructions
-    readme_file = f"README_missing_assets_{timestamp}.txt"
-    
+        sources.append({
+            'kind': 'wasabi',
+            'slug': 'wasabi',
+            'name': "Wasabi",
+            'file': wasabi_details_file,
+            'reader': iter_wasabi_files,
+            'missing_prefix': "missing_assets_for_ftp",
+            'extra_prefix': "extra_assets_in_wasabi",
+            'upload_instructions': "Connect to the SFTP site and download the missing assets into the created folders"
+        })
+
+    if 'external_hd' in args.source:
+        external_hd_files = args.external_hd_file or [DEFAULT_EXTERNAL_HD_FILE]
+        for external_hd_file in external_hd_files:
+            if not os.path.exists(external_hd_file):
+                print(f"External HD file not found: {external_hd_file}")
+                return None
+
+            # Several drives get their own output names
+            suffix = ''
+            name = "external HD"
+            if len(external_hd_files) > 1:
+                suffix = '_' + os.path.splitext(os.path.basename(external_hd_file))[0]
+                name = f"external HD ({os.path.basename(external_hd_file)})"
+            sources.append({
+                'kind': 'external_hd',
+                'slug': f"external_hd{suffix}",
+                'name': name,
+                'file': external_hd_file,
+                'reader': iter_external_hd_files,
+                'missing_prefix': f"missing_assets_in_external_hd{suffix}",
+                'extra_prefix': f"extra_assets_in_external_hd{suffix}",
+                'upload_instructions': "Copy the missing assets from the original source into the created folders"
+            })
+
+    # One source keeps the historical script name
+    for source in sources:
+        source['script_prefix'] = "create_folders_for_missing"
+        if len(sources) > 1:
+            source['script_prefix'] += '_' + source['slug']
+
+    return sources
+
+def write_readme(readme_file, outputs):
     with open(readme_file, 'w', encoding='utf-8') as f:
         f.write("MISSING AND EXTRA ASSETS ANALYSIS\n")
         f.write("================================\n\n")
         f.write(f"This package contains information about:\n")
-        f.write(f"1. {len(missing_assets):,} assets that are in the original list but not found in {source_name}\n")
-        f.write(f"2. {len(extra_assets):,} assets that are in {source_name} but not in the original list\n\n")
-        f.write("FILES INCLUDED:\n")
-        f.write(f"1. {missing_output_file} - List of missing assets in {source_name}\n")
-        f.write(f"2. {extra_output_file} - List of extra assets found in {source_name}\n")
-        f.write(f"3. {script_file} - Script to create the folder structure for downloads\n\n")
-        f.write("STEPS TO COMPLETE:\n")
-        f.write("1. Review both asset lists to understand the differences\n")
+        item = 1
+        for output in outputs:
+            source_name = output.source['name']
+            f.write(f"{item}. {output.missing:,} assets that are in the original list but not found in {source_name}\n")
+            f.write(f"{item + 1}. {output.extra:,} assets that are in {source_name} but not in the original list\n")
+            item += 2
+        f.write("\nFILES INCLUDED:\n")
+        item = 1
+        for output in outputs:
+            source_name = output.source['name']
+            f.write(f"{item}. {output.missing_file} - List of missing assets in {source_name}\n")
+            f.write(f"{item + 1}. {output.extra_file} - List of extra assets found in {source_name}\n")
+            f.write(f"{item + 2}. {output.script_file} - Script to create the folder structure for downloads\n")
+            item += 3
+        f.write("\nSTEPS TO COMPLETE:\n")
+        f.write("1. Review the asset lists to understand the differences\n")
         f.write("2. Run the folder creation script to prepare your local structure:\n")
-        f.write(f"   bash {script_file}\n\n")
-        f.write(upload_instructions)
+        for output in outputs:
+            f.write(f"   bash {output.script_file}\n")
+        f.write("\n")
+        instructions = []
+        for output in outputs:
+            if output.source['upload_instructions'] not in instructions:
+                instructions.append(output.source['upload_instructions'])
+        f.write(f"3. {' / '.join(instructions)}\n\n")
         f.write("4. After copying/downloading, you can use the upload_asset.py script to upload to Wasabi:\n")
         f.write("   python3 upload_asset.py --source-dir \"missing_assets\" --target-prefix \"br_assets/Batch_Recovery\"\n\n")
         f.write("5. Verify the upload by running analyze_full_bucket.py again\n")
-    
+
+def main():
+    # Set up command line arguments
+    parser = argparse.ArgumentParser(description='Compare assets between different sources')
+    parser.add_argument('--source', nargs='+', choices=['wasabi', 'external_hd'], default=['wasabi'],
+                      help='Sources to compare against original list (default: wasabi)')
+    parser.add_argument('--external-hd-file', action='append',
+                      help=f'External HD list; repeat for several drives (default: {DEFAULT_EXTERNAL_HD_FILE})')
+    parser.add_argument('--low-memory', action='store_true',
+                      help='Compare sorted runs on disk in one streaming merge instead of in-memory sets')
+    parser.add_argument('--sort-run-size', type=int, default=DEFAULT_RUN_SIZE,
+                      help=f'Records per sorted run in --low-memory mode (default: {DEFAULT_RUN_SIZE})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                      help=f'Processes parsing each list in chunks (default: {DEFAULT_WORKERS}; 1 reads line by line)')
+    args = parser.parse_args()
+
+    original_list_file = 'original_list.csv'
+
+    sources = resolve_sources(args)
+    if not sources:
+        return
+
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    if args.low_memory:
+        original_total, outputs = compare_sorted(original_list_file, sources, timestamp, args.sort_run_size)
+    else:
+        original_total, outputs = compare_in_memory(original_list_file, sources, timestamp, args.workers)
+
+    for output in outputs:
+        print(f"\nResults written to {output.missing_file}")
+        print(f"Extra assets written to {output.extra_file}")
+        print(f"Folder creation script written to {output.script_file}")
+    print(f"Run the folder creation script to create the folder structure for the missing assets")
+
+    # Generate a README with instructions
+    readme_file = f"README_missing_assets_{timestamp}.txt"
+    write_readme(readme_file, outputs)
     print(f"Instructions written to {readme_file}")
-    
+
     # Print summary and next steps
     print("\nSUMMARY:")
-    print(f"Original list contains {len(original_assets):,} assets")
-    print(f"{source_name.title()} contains: {len(comparison_assets):,} assets")
-    print(f"Missing assets in {source_name}: {len(missing_assets):,} assets")
-    print(f"Extra assets in {source_name}: {len(extra_assets):,} assets")
-    
+    print(f"Original list contains {original_total:,} assets")
+    for output in outputs:
+        source_name = output.source['name']
+        print(f"{source_name[0].upper() + source_name[1:]} contains: {output.total:,} assets")
+        print(f"Missing assets in {source_name}: {output.missing:,} assets")
+        print(f"Extra assets in {source_name}: {output.extra:,} assets")
+
     print("\nNEXT STEPS:")
-    print(f"1. Review the missing assets file: {missing_output_file}")
-    print(f"2. Review the extra assets file: {extra_output_file}")
-    print(f"3. Create folder structure using: bash {script_file}")
-    if args.source == 'wasabi':
-        print(f"4. Download missing assets from SFTP into the created folders")
-    else:
-        print(f"4. Copy missing assets from original source into the created folders")
-    print(f"5. Upload to Wasabi using upload_asset.py")
+    step = 1
+    for output in outputs:
+        print(f"{step}. Review the missing assets file: {output.missing_file}")
+        print(f"{step + 1}. Review the extra assets file: {output.extra_file}")
+        print(f"{step + 2}. Create folder structure using: bash {output.script_file}")
+        step += 3
+    if any(output.source['kind'] == 'wasabi' for output in outputs):
+        print(f"{step}. Download missing assets from SFTP into the created folders")
+        step += 1
+    if any(output.source['kind'] == 'external_hd' for output in outputs):
+        print(f"{step}. Copy missing assets from original source into the created folders")
+        step += 1
+    print(f"{step}. Upload to Wasabi using upload_asset.py")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
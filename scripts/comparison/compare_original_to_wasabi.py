@@ -12,84 +12,40 @@ scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
 from utils.credentials import get_s3_client, get_s3_resource, get_wasabi_credentials
+from utils.key_parser import split_uuid_filename
+from utils.asset_set import AssetSet
+from utils.asset_lists import load_asset_set
+from utils.parallel_csv import DEFAULT_WORKERS
 
 import csv
 import os
-import re
 from collections import defaultdict
 import time
+import argparse
 
-def extract_uuid_and_filename(filepath):
-    """
-    Extract UUID and filename from a path like:
-    E70CC37E-AA88-4D59-831AB9C37C662207/_592A1080.jpg
-    """
-    # Handle different possible formats
-    if '/' in filepath:
-        # If path has slash, split on the last one
-        parts = filepath.strip().split('/')
-        if len(parts) >= 2:
-            uuid = parts[-2]
-            filename = parts[-1]
-            return uuid, filename
-    
-    # Format like UUID/filename
-    uuid_match = re.search(r'([0-9A-F]{8}-?[0-9A-F]{4}-?[0-9A-F]{4}-?[0-9A-F]{4}-?[0-9A-F]{12})', filepath, re.I)
-    if uuid_match:
-        uuid = uuid_match.group(1)
-        # Assume filename is after the UUID
-        rest = filepath[filepath.find(uuid) + len(uuid):].strip()
-        if rest.startswith('/') or rest.startswith('\\'):
-            rest = rest[1:]
-        
-        if rest:
-            return uuid, rest
-    
-    # Format like UUID_filename.jpg
-    parts = filepath.split('_', 1)
-    if len(parts) == 2 and re.match(r'[0-9A-F]{8,}', parts[0], re.I):
-        return parts[0], '_' + parts[1]
-    
-    # Last resort - just treat the whole thing as a filename
-    return None, filepath
-
-def normalize_uuid(uuid):
-    """Normalize UUID format by removing hyphens and converting to uppercase"""
-    if not uuid:
-        return None
-    
-    # Remove any hyphens
-    uuid = uuid.replace('-', '')
-    
-    # Convert to uppercase
-    return uuid.upper()
-
-def normalize_filename(filename):
-    """Normalize filename by removing leading/trailing whitespace"""
-    if not filename:
-        return None
-    
-    return filename.strip()
-
-def get_uuid_file_combo(uuid, filename):
-    """Create a standardized UUID/filename combination for comparison"""
-    if uuid and filename:
-        return f"{normalize_uuid(uuid)}/{normalize_filename(filename)}"
-    return None
-
-def load_original_list(file_path):
+def load_original_list(file_path, workers=1):
     """
     Load the original asset list from CSV file.
-    Returns a set of normalized UUID/filename combinations and a mapping of normalized to original UUIDs
+    Returns an AssetSet of normalized UUID/filename combinations that also
+    keeps the original UUID format of every entry
     """
-    original_assets = set()
-    original_uuid_map = {}  # Maps normalized UUID to original UUID format
+    original_assets = AssetSet()
     skipped_lines = 0
     total_lines = 0
     
     print(f"Loading original asset list from {file_path}...")
     start_time = time.time()
     
+    if workers > 1:
+        # Chunks are parsed in worker processes and report their own skipped lines
+        try:
+            original_assets = load_asset_set(file_path, 'original', workers, keep_format=True)
+        except Exception as e:
+            print(f"Error loading original list: {e}")
+        elapsed = time.time() - start_time
+        print(f"Loaded {len(original_assets):,} original assets in {elapsed:.2f} seconds")
+        return original_assets
+    
     try:
         with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
             # Skip header if present
@@ -98,16 +54,10 @@ def load_original_list(file_path):
                 print(f"Skipping header: '{header}'")
             else:
                 # If not a header, process the line
-                uuid, filename = extract_uuid_and_filename(header)
+                uuid, filename = split_uuid_filename(header)
                 if uuid and filename:
-                    # Store original UUID format
-                    original_uuid_map[normalize_uuid(uuid)] = uuid
-                    
-                    combo = get_uuid_file_combo(uuid, filename)
-                    if combo:
-                        original_assets.add(combo)
-                    else:
-                        skipped_lines += 1
+                    # Keep the original UUID format alongside the normalized one
+                    original_assets.add(uuid, filename, keep_format=True)
             
             # Process the rest of the file
             for line_num, line in enumerate(f, 2):
@@ -122,17 +72,11 @@ def load_original_list(file_path):
                     skipped_lines += 1
                     continue
                 
-                uuid, filename = extract_uuid_and_filename(line)
+                uuid, filename = split_uuid_filename(line)
                 
                 if uuid and filename:
-                    # Store original UUID format
-                    original_uuid_map[normalize_uuid(uuid)] = uuid
-                    
-                    combo = get_uuid_file_combo(uuid, filename)
-                    if combo:
-                        original_assets.add(combo)
-                    else:
-                        skipped_lines += 1
+                    # Keep the original UUID format alongside the normalized one
+                    original_assets.add(uuid, filename, keep_format=True)
                 else:
                     skipped_lines += 1
                     # Log a few examples of lines we couldn't parse
@@ -144,21 +88,29 @@ def load_original_list(file_path):
     
     elapsed = time.time() - start_time
     print(f"Loaded {len(original_assets):,} original assets in {elapsed:.2f} seconds")
-    print(f"Stored {len(original_uuid_map):,} original UUID formats")
     print(f"Skipped {skipped_lines:,} lines that could not be parsed")
     
-    return original_assets, original_uuid_map
+    return original_assets
 
-def load_wasabi_files(file_path):
+def load_wasabi_files(file_path, workers=1):
     """
     Load files currently on Wasabi from the details CSV file.
-    Returns a set of normalized UUID/filename combinations.
+    Returns an AssetSet of normalized UUID/filename combinations.
     """
-    wasabi_assets = set()
+    wasabi_assets = AssetSet()
     print(f"Loading Wasabi files from {file_path}...")
     start_time = time.time()
     total_rows = 0
     
+    if workers > 1:
+        try:
+            wasabi_assets = load_asset_set(file_path, 'wasabi', workers)
+        except Exception as e:
+            print(f"Error loading Wasabi files: {e}")
+        elapsed = time.time() - start_time
+        print(f"Loaded {len(wasabi_assets):,} Wasabi files in {elapsed:.2f} seconds")
+        return wasabi_assets
+    
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
@@ -171,9 +123,7 @@ def load_wasabi_files(file_path):
                 uuid = row.get('UUID Folder')
                 filename = row.get('Filename')
                 
-                combo = get_uuid_file_combo(uuid, filename)
-                if combo:
-                    wasabi_assets.add(combo)
+                wasabi_assets.add(uuid, filename)
     
     except Exception as e:
         print(f"Error loading Wasabi files: {e}")
@@ -190,25 +140,19 @@ def find_missing_assets(original_assets, wasabi_assets):
     print(f"Found {len(missing_assets):,} missing assets")
     return missing_assets
 
-def format_for_ftp_download(missing_assets, original_uuid_map):
+def format_for_ftp_download(missing_assets):
     """
     Format missing assets for FTP download, creating a list of asset paths.
     Uses the original UUID format with hyphens if available.
     """
-    formatted_list = []
-    
-    for combo in missing_assets:
-        norm_uuid, filename = combo.split('/')
-        
-        # Use original UUID format if available, otherwise use normalized
-        original_uuid = original_uuid_map.get(norm_uuid, norm_uuid)
-        
-        # Format as UUID/filename for FTP path
-        formatted_list.append(f"{original_uuid}/{filename}")
-    
-    return formatted_list
+    return list(missing_assets.paths())
 
 def main():
+    parser = argparse.ArgumentParser(description='Find original assets that are not yet on Wasabi')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                      help=f'Processes parsing each list in chunks (default: {DEFAULT_WORKERS}; 1 reads line by line)')
+    args = parser.parse_args()
+    
     # Get the most recent details file from analyze_br_assets.py
     details_files = [f for f in os.listdir('.') if f.startswith('br_assets_analysis_') and f.endswith('_details.csv')]
     if not details_files:
@@ -222,14 +166,14 @@ def main():
     original_list_file = 'original_list.csv'
     
     # Load and normalize both datasets
-    original_assets, original_uuid_map = load_original_list(original_list_file)
-    wasabi_assets = load_wasabi_files(wasabi_details_file)
+    original_assets = load_original_list(original_list_file, args.workers)
+    wasabi_assets = load_wasabi_files(wasabi_details_file, args.workers)
     
     # Find missing assets
     missing_assets = find_missing_assets(original_assets, wasabi_assets)
     
     # Format for FTP download - using original UUID format
-    formatted_missing = format_for_ftp_download(missing_assets, original_uuid_map)
+    formatted_missing = format_for_ftp_download(missing_assets)
     
     # Write missing assets to a file
     timestamp = time.strftime("%Y%m%d_%H%M%S")
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Reconcile the original asset list, Wasabi and any number of external HD
+lists in one run.
+
+Every list is parsed once into normalized UUID/filename records, sorted on
+disk, and all of them are walked together in one k-way merge. That single
+pass writes a presence matrix (one row per asset, one column per source)
+and, from the same rows, the assets each source has that each other source
+lacks -- replacing separate runs of compare_original_to_wasabi.py,
+compare_external_hd_to_wasabi.py and compare_full_wasabi_to_original.py.
+One folder creation script (for original assets missing from Wasabi) and
+one README are generated.
+
+Usage:
+    python scripts/comparison/reconcile_assets.py [--original FILE]
+                                                  [--wasabi-details FILE | --no-wasabi]
+                                                  [--external-hd-file FILE ...]
+                                                  [--sort-run-size N]
+
+Options:
+    --original            Original asset list (default: original_list.csv)
+    --wasabi-details      Wasabi details CSV (default: newest br_assets_analysis_* or
+                          full_bucket_analysis_* details file)
+    --no-wasabi           Leave Wasabi out of the reconciliation
+    --external-hd-file    External HD list; repeat for several drives
+                          (default: external_hd_files_final_may_3_2025.csv if present)
+    --sort-run-size N     Records per sorted run (default: 500000)
+"""
+
+import sys
+import os
+
+# Add the scripts directory to Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(script_dir)
+sys.path.insert(0, scripts_dir)
+
+from utils.asset_lists import (iter_external_hd_files, iter_original_list, iter_wasabi_files,
+                               merge_sorted_sources, sort_source)
+from utils.external_sort import DEFAULT_RUN_SIZE
+
+import csv
+import os
+from collections import defaultdict
+import time
+import argparse
+
+DEFAULT_EXTERNAL_HD_FILE = 'external_hd_files_final_may_3_2025.csv'
+
+def find_wasabi_details_file():
+    """Newest details CSV written by analyze_br_assets.py or analyze_full_bucket.py, or None."""
+    details_files = [
+        f for f in os.listdir('.')
+        if f.startswith(('br_assets_analysis_', 'full_bucket_analysis_')) and f.endswith('_details.csv')
+    ]
+    if not details_files:
+        return None
+    # Both names end in the same _YYYYMMDD_HHMMSS timestamp
+    details_files.sort(key=lambda f: f.split('_analysis_', 1)[1], reverse=True)
+    return details_files[0]
+
+def resolve_sources(args):
+    """Build the list of sources to reconcile; the original list is always first."""
+    if not os.path.exists(args.original):
+        print(f"Original asset list not found: {args.original}")
+        return None
+
+    sources = [{
+        'name': "Original",
+        'slug': 'original',
+        'file': args.original,
+        'reader': iter_original_list,
+        'keep_format': True
+    }]
+
+    if not args.no_wasabi:
+        wasabi_details_file = args.wasabi_details or find_wasabi_details_file()
+        if not wasabi_details_file:
+            print("No Wasabi details files found. Please run analyze_br_assets.py or analyze_full_bucket.py first.")
+            return None
+        print(f"Using Wasabi details file: {wasabi_details_file}")
+        sources.append({
+            'name': "Wasabi",
+            'slug': 'wasabi',
+            'file': wasabi_details_file,
+            'reader': iter_wasabi_files,
+            'keep_format': False
+        })
+
+    external_hd_files = args.external_hd_file
+    if not external_hd_files and os.path.exists(DEFAULT_EXTERNAL_HD_FILE):
+        external_hd_files = [DEFAULT_EXTERNAL_HD_FILE]
+    used_slugs = {source['slug'] for source in sources}
+    for external_hd_file in external_hd_files or []:
+        if not os.path.exists(external_hd_file):
+            print(f"External HD file not found: {external_hd_file}")
+            return None
+
+        stem = os.path.splitext(os.path.basename(external_hd_file))[0]
+        slug = stem
+        suffix = 2
+        while slug in used_slugs:
+            slug = f"{stem}_{suffix}"
+            suffix += 1
+        used_slugs.add(slug)
+        sources.append({
+            'name': slug,
+            'slug': slug,
+            'file': external_hd_file,
+            'reader': iter_external_hd_files,
+            'keep_format': False
+        })
+
+    if len(sources) < 2:
+        print("Nothing to reconcile: give Wasabi and/or at least one external HD list.")
+        return None
+
+    return sources
+
+class PairOutput:
+    """Assets one source has that another lacks, written as they are found."""
+
+    def __init__(self, have, lack, timestamp):
+        self.have = have
+        self.lack = lack
+        self.file = f"in_{have['slug']}_not_in_{lack['slug']}_{timestamp}.csv"
+        self.count = 0
+        self._f = open(self.file, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._f)
+        self._writer.writerow(["AssetPath"])
+
+    def add(self, path):
+        self._writer.writerow([path])
+        self.count += 1
+
+    def close(self):
+        self._f.close()
+
+def reconcile(sources, timestamp, run_size=DEFAULT_RUN_SIZE):
+    """
+    Parse every source once and walk them all in one merge, writing the
+    presence matrix, every pairwise difference and the folder creation
+    script. Returns (matrix file, script file or None, pair outputs,
+    per-source totals, presence pattern counts).
+    """
+    sorters = []
+    try:
+        for source in sources:
+            print(f"Sorting {source['name']} entries from {source['file']}...")
+            sorters.append(sort_source(source['reader'](source['file']), run_size, source['keep_format']))
+
+        indexes = range(len(sources))
+        pairs = {
+            (have, lack): PairOutput(sources[have], sources[lack], timestamp)
+            for have in indexes for lack in indexes if have != lack
+        }
+        totals = [0] * len(sources)
+        patterns = defaultdict(int)
+
+        matrix_file = f"asset_matrix_{timestamp}.csv"
+        matrix_f = open(matrix_file, 'w', newline='', encoding='utf-8')
+        matrix_writer = csv.writer(matrix_f)
+        matrix_writer.writerow(["AssetPath"] + [source['name'] for source in sources])
+
+        # Folders for original assets still missing from Wasabi
+        wasabi_index = next((i for i, source in enumerate(sources) if source['slug'] == 'wasabi'), None)
+        script_file = None
+        script_f = None
+        if wasabi_index is not None:
+            script_file = f"create_folders_for_missing_{timestamp}.sh"
+            script_f = open(script_file, 'w', encoding='utf-8')
+            script_f.write("#!/bin/bash\n\n")
+            script_f.write("# Script to create folder structure for missing assets\n")
+            script_f.write("# Created on " + time.strftime("%Y-%m-%d %H:%M:%S") + "\n\n")
+            script_f.write("BASE_DIR=\"missing_assets\"\n")
+            script_f.write("mkdir -p \"$BASE_DIR\"\n\n")
+
+        start_time = time.time()
+        print(f"Merging {len(sorters)} sorted sources...")
+        for norm, spelling, files in merge_sorted_sources(sorters):
+            # Use original UUID format if available, otherwise use normalized
+            uuid = spelling or norm
+            missing_from_wasabi = False
+
+            for filename, present in files:
+                path = f"{uuid}/{filename}"
+                row = [1 if i in present else 0 for i in indexes]
+                matrix_writer.writerow([path] + row)
+                patterns[tuple(row)] += 1
+
+                for have in present:
+                    totals[have] += 1
+                    for lack in indexes:
+                        if lack not in present:
+                            pairs[(have, lack)].add(path)
+
+                if wasabi_index is not None and 0 in present and wasabi_index not in present:
+                    missing_from_wasabi = True
+
+            if missing_from_wasabi:
+                script_f.write(f"mkdir -p \"$BASE_DIR/{uuid}\"\n")
+
+        matrix_f.close()
+        for output in pairs.values():
+            output.close()
+        if script_f:
+            script_f.close()
+            # Make the script executable
+            os.chmod(script_file, 0o755)
+        print(f"Merged in {time.time() - start_time:.2f} seconds")
+
+        return matrix_file, script_file, list(pairs.values()), totals, patterns
+
+    finally:
+        for sorter in sorters:
+            sorter.cleanup()
+
+def describe_pattern(sources, pattern):
+    """'Original + Wasabi' style label for a presence pattern."""
+    return ' + '.join(source['name'] for source, present in zip(sources, pattern) if present)
+
+def write_readme(readme_file, sources, matrix_file, script_file, pairs, totals, patterns):
+    with open(readme_file, 'w', encoding='utf-8') as f:
+        f.write("ASSET RECONCILIATION\n")
+        f.write("====================\n\n")
+        f.write("Sources reconciled:\n")
+        for source, total in zip(sources, totals):
+            f.write(f"  {source['name']}: {total:,} assets ({source['file']})\n")
+        f.write("\nAssets by where they are present:\n")
+        for pattern, count in sorted(patterns.items(), key=lambda item: -item[1]):
+            f.write(f"  {describe_pattern(sources, pattern)}: {count:,}\n")
+        f.write("\nFILES INCLUDED:\n")
+        f.write(f"1. {matrix_file} - Every asset with a 1/0 column per source\n")
+        item = 2
+        for output in pairs:
+            f.write(f"{item}. {output.file} - {output.count:,} assets in {output.have['name']} "
+                    f"but not in {output.lack['name']}\n")
+            item += 1
+        if script_file:
+            f.write(f"{item}. {script_file} - Script to create the folder structure for original assets missing from Wasabi\n")
+            f.write("\nSTEPS TO COMPLETE:\n")
+            f.write("1. Review the asset lists to understand the differences\n")
+            f.write("2. Run the folder creation script to prepare your local structure:\n")
+            f.write(f"   bash {script_file}\n\n")
+            f.write("3. Fetch the missing assets into the created folders - the in_<drive>_not_in_wasabi lists show\n")
+            f.write("   which external HD already holds them; the rest come from the SFTP site\n\n")
+            f.write("4. Upload to Wasabi using upload_asset.py:\n")
+            f.write("   python3 upload_asset.py --source-dir \"missing_assets\" --target-prefix \"br_assets/Batch_Recovery\"\n\n")
+            f.write("5. Verify the upload by running analyze_br_assets.py again\n")
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconcile the original list, Wasabi and external HD lists in one pass')
+    parser.add_argument('--original', default='original_list.csv',
+                      help='Original asset list (default: original_list.csv)')
+    parser.add_argument('--wasabi-details',
+                      help='Wasabi details CSV (default: newest analysis details file)')
+    parser.add_argument('--no-wasabi', action='store_true',
+                      help='Leave Wasabi out of the reconciliation')
+    parser.add_argument('--external-hd-file', action='append',
+                      help=f'External HD list; repeat for several drives (default: {DEFAULT_EXTERNAL_HD_FILE} if present)')
+    parser.add_argument('--sort-run-size', type=int, default=DEFAULT_RUN_SIZE,
+                      help=f'Records per sorted run (default: {DEFAULT_RUN_SIZE})')
+    args = parser.parse_args()
+
+    sources = resolve_sources(args)
+    if not sources:
+        return
+
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    matrix_file, script_file, pairs, totals, patterns = reconcile(sources, timestamp, args.sort_run_size)
+
+    print(f"\nPresence matrix written to {matrix_file}")
+    for output in pairs:
+        print(f"In {output.have['name']} but not in {output.lack['name']}: {output.count:,} -> {output.file}")
+    if script_file:
+        print(f"Folder creation script written to {script_file}")
+
+    # Generate a README with instructions
+    readme_file = f"README_missing_assets_{timestamp}.txt"
+    write_readme(readme_file, sources, matrix_file, script_file, pairs, totals, patterns)
+    print(f"Instructions written to {readme_file}")
+
+    print("\nSUMMARY:")
+    for source, total in zip(sources, totals):
+        print(f"{source['name']} contains: {total:,} assets")
+    print("Assets by where they are present:")
+    for pattern, count in sorted(patterns.items(), key=lambda item: -item[1]):
+        print(f"  {describe_pattern(sources, pattern)}: {count:,}")
+
+if __name__ == "__main__":
+    main()
@@ -19,9 +19,18 @@ Options:
     --limit N           Limit deletion to N assets (safety measure)
     --force             Skip confirmation prompts
     --continue-on-error Continue processing if individual deletions fail
+    --workers N         Concurrent delete_objects requests (default: 8)
+    --journal PATH      Checkpoint every completed batch to PATH; re-running with the
+                        same journal skips keys that were already deleted
+    --retry-failed      With --journal, only re-send the keys that failed last time
+                        (--csv-file/--prefix are not needed)
+
+With --prefix and --force, deletion starts while the listing is still running.
+Throttling (SlowDown/503) pauses all workers with an adaptive backoff.
 
 Example:
     python scripts/core/bulk_delete_assets.py --prefix "br_assets/outdated/" --limit 100 --dry-run
+    python scripts/core/bulk_delete_assets.py --csv-file paths.csv --journal data/state/cleanup.jsonl --force
 """
 
 import sys
@@ -31,6 +40,9 @@ import argparse
 import datetime
 import csv
 import time
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 
 # Add the scripts directory to Python path
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -38,12 +50,20 @@ scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
 from utils.credentials import get_s3_client, get_wasabi_credentials
+from utils.listing import list_objects_parallel, is_retryable_error, RETRYABLE_CODES
+from utils.deletion_journal import DeletionJournal
+
+# S3 accepts at most 1000 keys per delete_objects request
+BATCH_SIZE = 1000
+DEFAULT_WORKERS = 8
+LOG_BUFFER_SIZE = 1024 * 1024
 
 def load_paths_from_csv(csv_file):
     """Load paths to delete from CSV file."""
     paths = []
     try:
-        with open(csv_file, 'r', newline='') as file:
+        # utf-8-sig strips the BOM Excel adds, which would otherwise hide the 'path' header
+        with open(csv_file, 'r', newline='', encoding='utf-8-sig') as file:
             reader = csv.DictReader(file)
             if 'path' not in reader.fieldnames:
                 print(f"Error: CSV file must have a 'path' column")
@@ -63,111 +83,276 @@ def list_objects_by_prefix(s3_client, bucket, prefix):
     """List all objects matching the given prefix."""
     objects = []
     try:
-        paginator = s3_client.get_paginator('list_objects_v2')
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-            if 'Contents' in page:
-                for obj in page['Contents']:
-                    objects.append(obj['Key'])
+        for obj in list_objects_parallel(s3_client, bucket, prefix, ordered=True):
+            objects.append(obj['Key'])
     except Exception as e:
         print(f"Error listing objects with prefix '{prefix}': {e}")
         return None
     
     return objects
 
-def delete_objects_batch(s3_client, bucket, object_keys, dry_run=False, log_writer=None):
-    """Delete a batch of objects (up to 1000 at a time)."""
-    if dry_run:
-        print(f"DRY RUN: Would delete {len(object_keys)} objects")
-        return len(object_keys), 0
-    
+def stream_objects_by_prefix(s3_client, bucket, prefix, listing_errors):
+    """
+    Yield keys matching the prefix while the listing is still running.
+
+    A listing failure is reported, appended to listing_errors and ends the
+    stream, so batches already submitted still finish and get logged.
+    """
     try:
-        # Prepare delete request
-        delete_objects = [{'Key': key} for key in object_keys]
-        
-        response = s3_client.delete_objects(
-            Bucket=bucket,
-            Delete={'Objects': delete_objects}
-        )
-        
-        deleted_count = len(response.get('Deleted', []))
-        error_count = len(response.get('Errors', []))
-        
-        # Log results
-        timestamp = datetime.datetime.now().isoformat()
-        
-        for deleted in response.get('Deleted', []):
-            if log_writer:
-                log_writer.writerow({
-                    'timestamp': timestamp,
-                    'object_key': deleted['Key'],
-                    'status': 'deleted',
-                    'error': ''
-                })
-        
-        for error in response.get('Errors', []):
-            if log_writer:
-                log_writer.writerow({
-                    'timestamp': timestamp,
-                    'object_key': error['Key'],
-                    'status': 'error',
-                    'error': f"{error['Code']}: {error['Message']}"
-                })
-            print(f"Error deleting {error['Key']}: {error['Code']} - {error['Message']}")
-        
-        return deleted_count, error_count
-        
+        for obj in list_objects_parallel(s3_client, bucket, prefix):
+            yield obj['Key']
     except Exception as e:
-        print(f"Error in batch delete: {e}")
-        return 0, len(object_keys)
+        print(f"Error listing objects with prefix '{prefix}': {e}")
+        listing_errors.append(e)
+
+class AdaptiveBackoff:
+    """
+    Backoff shared by all delete workers.
+
+    A SlowDown/503 from any request pauses every worker and doubles the
+    delay; each successful request shrinks it again, so throughput settles
+    just under what the endpoint accepts.
+    """
+
+    def __init__(self, initial_delay=0.5, max_delay=30.0):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self.pause_until = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            remaining = self.pause_until - time.time()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def on_throttle(self):
+        with self._lock:
+            self.delay = min(max(self.delay * 2, self.initial_delay), self.max_delay)
+            self.pause_until = max(self.pause_until, time.time() + self.delay)
+            return self.delay
+
+    def on_success(self):
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay > self.initial_delay else 0.0
+
+def delete_objects_batch(s3_client, bucket, object_keys, backoff=None, max_retries=8):
+    """
+    Delete a batch of objects (up to 1000 at a time).
+
+    Throttled requests and throttled keys are retried with adaptive backoff.
+    Returns (deleted_keys, errors) where errors is a list of (key, message).
+    """
+    backoff = backoff or AdaptiveBackoff()
+    remaining = list(object_keys)
+    errors = []
+    attempt = 0
+
+    while remaining:
+        backoff.wait()
+        try:
+            # Quiet mode only reports failures, which keeps responses small
+            response = s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={'Objects': [{'Key': key} for key in remaining], 'Quiet': True}
+            )
+        except Exception as e:
+            attempt += 1
+            if is_retryable_error(e) and attempt <= max_retries:
+                delay = backoff.on_throttle()
+                print(f"Delete request failed ({e}); backing off {delay:.1f}s")
+                continue
+            errors += [(key, str(e)) for key in remaining]
+            failed = {key for key, _ in errors}
+            return [key for key in object_keys if key not in failed], errors
+
+        retry = []
+        for error in response.get('Errors', []):
+            if error.get('Code') in RETRYABLE_CODES and attempt < max_retries:
+                retry.append(error['Key'])
+            else:
+                errors.append((error['Key'], f"{error.get('Code')}: {error.get('Message')}"))
+
+        if retry:
+            attempt += 1
+            delay = backoff.on_throttle()
+            print(f"{len(retry)} keys throttled; backing off {delay:.1f}s")
+        else:
+            backoff.on_success()
+        remaining = retry
+
+    failed = {key for key, _ in errors}
+    return [key for key in object_keys if key not in failed], errors
+
+def iter_batches(keys, batch_size=BATCH_SIZE):
+    """Group an iterable of keys into lists of at most batch_size."""
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def run_deletion(s3_client, bucket, keys, log_writer, workers=DEFAULT_WORKERS, continue_on_error=False,
+                 total=None, journal=None):
+    """
+    Delete keys with up to `workers` delete_objects requests in flight.
+
+    keys may be a generator (e.g. a listing still in progress): batches are
+    submitted as soon as they fill, so listing and deletion overlap.
+    Each finished batch is checkpointed to the journal, if given.
+    Returns (total_deleted, total_errors).
+    """
+    backoff = AdaptiveBackoff()
+    total_deleted = 0
+    total_errors = 0
+    processed = 0
+    batch_num = 0
+    stop = False
+    start_time = time.time()
+
+    def handle(future):
+        nonlocal total_deleted, total_errors, processed, stop
+        deleted_keys, errors = future.result()
+        if journal is not None:
+            journal.record_batch(deleted_keys, errors)
+        timestamp = datetime.datetime.now().isoformat()
+
+        for key in deleted_keys:
+            log_writer.writerow({'timestamp': timestamp, 'object_key': key, 'status': 'deleted', 'error': ''})
+        for key, message in errors:
+            log_writer.writerow({'timestamp': timestamp, 'object_key': key, 'status': 'error', 'error': message})
+            print(f"Error deleting {key}: {message}")
+
+        total_deleted += len(deleted_keys)
+        total_errors += len(errors)
+        processed += len(deleted_keys) + len(errors)
+
+        if errors and not continue_on_error:
+            stop = True
+
+        elapsed = time.time() - start_time
+        rate = processed / elapsed if elapsed > 0 else 0
+        if total:
+            print(f"Progress: {processed}/{total} ({processed/total*100:.1f}%) - {rate:.1f} objects/sec")
+        else:
+            print(f"Progress: {processed} objects - {rate:.1f} objects/sec")
 
-def bulk_delete_assets(csv_file=None, prefix=None, dry_run=False, limit=None, force=False, continue_on_error=False):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        for batch in iter_batches(keys):
+            if stop:
+                break
+            batch_num += 1
+            in_flight.add(executor.submit(delete_objects_batch, s3_client, bucket, batch, backoff))
+
+            # Keep at most `workers` requests outstanding
+            while len(in_flight) >= workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    handle(future)
+
+        for future in as_completed(in_flight):
+            handle(future)
+
+    if stop:
+        print("Errors encountered. Stopped submitting new batches (use --continue-on-error to keep going).")
+
+    return total_deleted, total_errors
+
+def bulk_delete_assets(csv_file=None, prefix=None, dry_run=False, limit=None, force=False, continue_on_error=False,
+                       workers=DEFAULT_WORKERS, journal_path=None, retry_failed=False):
     """Main function to perform bulk deletion."""
     # Get credentials and client
     creds = get_wasabi_credentials()
     s3_client = get_s3_client()
     bucket = creds['bucket']
+
+    journal = None
+    if journal_path:
+        try:
+            journal = DeletionJournal(journal_path, bucket)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return False
+        if journal.batches:
+            print(f"Resuming from journal {journal_path}: {len(journal.deleted)} keys already deleted, "
+                  f"{len(journal.failed)} failed")
+    elif retry_failed:
+        print("Error: --retry-failed requires --journal")
+        return False
     
     # Determine what to delete
-    objects_to_delete = []
-    
-    if csv_file:
+    listing_errors = []
+    if retry_failed:
+        objects_to_delete = journal.failed_keys()
+        print(f"Retrying {len(objects_to_delete)} keys that failed in earlier runs")
+    elif csv_file:
         print(f"Loading deletion paths from CSV: {csv_file}")
         objects_to_delete = load_paths_from_csv(csv_file)
         if objects_to_delete is None:
             return False
     elif prefix:
-        print(f"Finding objects with prefix: {prefix}")
-        objects_to_delete = list_objects_by_prefix(s3_client, bucket, prefix)
-        if objects_to_delete is None:
-            return False
+        if force:
+            # No confirmation needed, so delete while the listing is still running
+            print(f"Streaming objects with prefix: {prefix}")
+            objects_to_delete = stream_objects_by_prefix(s3_client, bucket, prefix, listing_errors)
+        else:
+            print(f"Finding objects with prefix: {prefix}")
+            objects_to_delete = list_objects_by_prefix(s3_client, bucket, prefix)
+            if objects_to_delete is None:
+                return False
     else:
         print("Error: Must specify either --csv-file or --prefix")
         return False
-    
-    if not objects_to_delete:
-        print("No objects found to delete")
-        return True
-    
-    # Apply limit if specified
-    if limit and len(objects_to_delete) > limit:
-        objects_to_delete = objects_to_delete[:limit]
+
+    streaming = not isinstance(objects_to_delete, list)
+
+    # Skip everything the journal already confirmed as deleted
+    if journal is not None and journal.deleted and not retry_failed:
+        if streaming:
+            objects_to_delete = journal.pending(objects_to_delete)
+        else:
+            before = len(objects_to_delete)
+            objects_to_delete = list(journal.pending(objects_to_delete))
+            print(f"Skipping {before - len(objects_to_delete)} keys already deleted according to the journal")
+
+    if not streaming:
+        if not objects_to_delete:
+            print("No objects found to delete")
+            return True
+
+        # Apply limit if specified
+        if limit and len(objects_to_delete) > limit:
+            objects_to_delete = objects_to_delete[:limit]
+            print(f"Limited to first {limit} objects")
+
+        print(f"Found {len(objects_to_delete)} objects to delete")
+
+        # Show sample of what will be deleted
+        if len(objects_to_delete) <= 10:
+            print("Objects to delete:")
+            for obj in objects_to_delete:
+                print(f"  - {obj}")
+        else:
+            print("Sample of objects to delete:")
+            for obj in objects_to_delete[:10]:
+                print(f"  - {obj}")
+            print(f"  ... and {len(objects_to_delete) - 10} more")
+    elif limit:
+        objects_to_delete = itertools.islice(objects_to_delete, limit)
         print(f"Limited to first {limit} objects")
-    
-    print(f"Found {len(objects_to_delete)} objects to delete")
-    
-    # Show sample of what will be deleted
-    if len(objects_to_delete) <= 10:
-        print("Objects to delete:")
-        for obj in objects_to_delete:
-            print(f"  - {obj}")
-    else:
-        print("Sample of objects to delete:")
-        for obj in objects_to_delete[:10]:
-            print(f"  - {obj}")
-        print(f"  ... and {len(objects_to_delete) - 10} more")
+
+    if dry_run:
+        count = len(objects_to_delete) if not streaming else sum(1 for _ in objects_to_delete)
+        print(f"\nDRY RUN: Would delete {count} objects in {(count + BATCH_SIZE - 1) // BATCH_SIZE} batches")
+        return not listing_errors
     
     # Confirmation
-    if not force and not dry_run:
+    if not force:
         confirmation = input(f"\nAre you sure you want to delete {len(objects_to_delete)} objects? (yes/no): ")
         if confirmation.lower() != 'yes':
             print("Deletion cancelled")
@@ -180,60 +365,45 @@ def bulk_delete_assets(csv_file=None, prefix=None, dry_run=False, limit=None, fo
     # Ensure output directory exists
     os.makedirs('data/output', exist_ok=True)
     
-    total_deleted = 0
-    total_errors = 0
-    
-    # Process in batches of 1000 (S3 limit)
-    batch_size = 1000
-    
-    with open(log_file, 'w', newline='') as csvfile:
+    # Rows are only written from the main thread; a large buffer avoids a write per row
+    with open(log_file, 'w', newline='', buffering=LOG_BUFFER_SIZE) as csvfile:
         fieldnames = ['timestamp', 'object_key', 'status', 'error']
         log_writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         log_writer.writeheader()
         
-        print(f"\n{'DRY RUN: ' if dry_run else ''}Starting deletion...")
+        print(f"\nStarting deletion with {workers} concurrent requests...")
         start_time = time.time()
-        
-        for i in range(0, len(objects_to_delete), batch_size):
-            batch = objects_to_delete[i:i+batch_size]
-            batch_num = i // batch_size + 1
-            total_batches = (len(objects_to_delete) + batch_size - 1) // batch_size
-            
-            print(f"Processing batch {batch_num}/{total_batches} ({len(batch)} objects)...")
-            
-            deleted, errors = delete_objects_batch(
-                s3_client, bucket, batch, dry_run, log_writer if not dry_run else None
-            )
-            
-            total_deleted += deleted
-            total_errors += errors
-            
-            if errors > 0 and not continue_on_error:
-                print(f"Errors encountered in batch {batch_num}. Stopping.")
-                break
-            
-            # Progress update
-            progress = (i + len(batch)) / len(objects_to_delete) * 100
-            elapsed = time.time() - start_time
-            if elapsed > 0:
-                rate = (i + len(batch)) / elapsed
-                print(f"Progress: {progress:.1f}% ({rate:.1f} objects/sec)")
+
+        total_deleted, total_errors = run_deletion(
+            s3_client, bucket, objects_to_delete, log_writer,
+            workers=workers,
+            continue_on_error=continue_on_error,
+            total=None if streaming else len(objects_to_delete),
+            journal=journal
+        )
     
     elapsed = time.time() - start_time
-    print(f"\n{'DRY RUN ' if dry_run else ''}Deletion complete:")
-    print(f"- {'Would delete' if dry_run else 'Deleted'}: {total_deleted} objects")
-    if not dry_run:
-        print(f"- Errors: {total_errors} objects")
-        print(f"- Time: {elapsed:.1f} seconds")
-        print(f"- Log file: {log_file}")
+    print(f"\nDeletion complete:")
+    print(f"- Deleted: {total_deleted} objects")
+    print(f"- Errors: {total_errors} objects")
+    print(f"- Time: {elapsed:.1f} seconds ({total_deleted / elapsed if elapsed > 0 else 0:.1f} objects/sec)")
+    print(f"- Log file: {log_file}")
+    if listing_errors:
+        print(f"- Listing failed: objects under '{prefix}' listed after the error were not deleted")
+    if journal is not None:
+        print(f"- Journal: {journal_path}")
+        if total_errors:
+            print(f"  Re-run with --journal {journal_path} --retry-failed to retry only the failed keys")
+        if listing_errors:
+            print(f"  Re-run with --journal {journal_path} to resume after the keys already deleted")
     
-    return total_errors == 0
+    return total_errors == 0 and not listing_errors
 
 def main():
     parser = argparse.ArgumentParser(description='Bulk delete assets from Wasabi bucket')
     
     # Mutually exclusive group for input source
-    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group = parser.add_mutually_exclusive_group()
     input_group.add_argument('--csv-file', help='CSV file containing paths to delete')
     input_group.add_argument('--prefix', help='Prefix/folder pattern to match for deletion')
     
@@ -242,8 +412,18 @@ def main():
     parser.add_argument('--limit', type=int, help='Limit deletion to N assets')
     parser.add_argument('--force', action='store_true', help='Skip confirmation prompts')
     parser.add_argument('--continue-on-error', action='store_true', help='Continue on errors')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Concurrent delete_objects requests (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--journal', help='Checkpoint completed batches here and resume from it on re-runs')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='Only re-send the keys recorded as failed in --journal')
     
     args = parser.parse_args()
+
+    if not (args.csv_file or args.prefix or args.retry_failed):
+        parser.error('one of --csv-file, --prefix or --retry-failed is required')
+    if args.retry_failed and not args.journal:
+        parser.error('--retry-failed requires --journal')
     
     try:
         # Test connection
@@ -262,7 +442,10 @@ def main():
         dry_run=args.dry_run,
         limit=args.limit,
         force=args.force,
-        continue_on_error=args.continue_on_error
+        continue_on_error=args.continue_on_error,
+        workers=args.workers,
+        journal_path=args.journal,
+        retry_failed=args.retry_failed
     )
     
     if not success:
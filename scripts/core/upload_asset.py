@@ -4,18 +4,38 @@ BestReviews Wasabi Upload System - Asset Upload Utility
 
 This script uploads assets to the Wasabi bucket with options to set them as public.
 It includes error handling, category-based organization, and public/private options.
+A whole directory tree can be uploaded in one run through a bounded worker pool.
+Files above multipart_threshold_mb are uploaded through a resumable multipart
+journal, so re-running after an interruption only sends the missing parts.
+The ACL, Content-Type and Cache-Control are sent with the upload itself.
+Uploads are private unless --public is given; --policy-acl instead applies
+the bucket's public_access_* setting from config/upload_config.json, which
+makes every file public on a bucket whose policy is public.
 
 Usage:
     python scripts/core/upload_asset.py --local-path "/path/to/local/file.jpg" --remote-path "category/subcategory/filename.jpg" [--public] [--dry-run]
+    python scripts/core/upload_asset.py --source-dir "missing_assets" --target-prefix "br_assets/Batch_Recovery" [options]
+    python scripts/core/upload_asset.py --abort-orphaned "br_assets/" [--orphan-age-hours 24] [--dry-run]
 
 Options:
-    --local-path     Path to the local file to upload (required)
-    --remote-path    Destination path within the bucket (required)
+    --local-path     Path to the local file to upload
+    --remote-path    Destination path within the bucket
+    --source-dir     Local directory to upload recursively
+    --target-prefix  Destination prefix for --source-dir uploads
+    --threads N      Concurrent uploads for --source-dir (default: upload_threads from config)
+    --overwrite      Re-upload files that already exist under --target-prefix
+    --skip-uploaded  Skip files whose UUID/filename is already in the bucket, checked
+                     through the inventory's asset filter instead of the bucket
+    --abort-orphaned Abort unfinished multipart uploads under a prefix that the journal cannot resume
+    --orphan-age-hours  Only abort uploads started more than this many hours ago (default: 24)
     --public         Make the asset publicly accessible (optional)
+    --private        Keep the asset private (the default)
+    --policy-acl     Use the bucket's configured access policy instead (optional)
     --dry-run        Only check settings, don't upload (optional)
 
 Example:
     python scripts/core/upload_asset.py --local-path "/desktop/image.jpg" --remote-path "br_assets/electronics/cameras/image.jpg" --public
+    python scripts/core/upload_asset.py --source-dir "missing_assets" --target-prefix "br_assets/Batch_Recovery" --threads 8
 """
 
 import sys
@@ -25,6 +45,7 @@ import argparse
 import datetime
 import csv
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add the scripts directory to Python path
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -32,6 +53,11 @@ scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
 from utils.credentials import get_s3_client, get_wasabi_credentials
+from utils.config import load_upload_config, get_upload_extra_args
+from utils.multipart import UploadJournal, resumable_upload, abort_orphaned_uploads
+from utils.inventory import open_inventory
+from utils.bloom_filter import UploadedAssetCheck, load_asset_filter
+from utils.key_parser import parse_local_path
 
 def check_object_exists(s3_client, bucket, path):
     """Check if an object exists in the bucket."""
@@ -62,22 +88,32 @@ def ensure_folder_exists(s3_client, bucket, remote_path):
         else:
             raise e
 
-def make_public(s3_client, bucket, remote_path):
-    """Make an object publicly accessible."""
-    try:
-        s3_client.put_object_acl(
-            Bucket=bucket,
-            Key=remote_path,
-            ACL='public-read'
+def transfer_file(s3_client, bucket, local_path, remote_path, journal=None, extra_args=None):
+    """
+    Upload a file, using a resumable journaled multipart upload for large files.
+
+    extra_args (ACL, ContentType, CacheControl) go into the initial PUT or
+    CreateMultipartUpload, so no follow-up request is needed.
+    """
+    config = load_upload_config()
+    threshold = config['multipart_threshold_mb'] * 1024 * 1024
+
+    if os.path.getsize(local_path) >= threshold:
+        resumable_upload(
+            s3_client, bucket, local_path, remote_path,
+            journal or UploadJournal(),
+            part_size=config['multipart_chunk_mb'] * 1024 * 1024,
+            extra_args=extra_args
         )
-        print(f"Set public access for: {remote_path}")
-        return True
-    except Exception as e:
-        print(f"Error setting public access: {str(e)}")
-        return False
+    else:
+        s3_client.upload_file(local_path, bucket, remote_path, ExtraArgs=extra_args)
 
 def upload_file(local_path, remote_path, make_public_flag=False, dry_run=False):
-    """Upload a file to Wasabi with options to make it public."""
+    """
+    Upload a file to Wasabi with options to make it public.
+
+    make_public_flag=None applies the bucket's configured access policy.
+    """
     # Get credentials and client
     creds = get_wasabi_credentials()
     s3_client = get_s3_client()
@@ -96,10 +132,13 @@ def upload_file(local_path, remote_path, make_public_flag=False, dry_run=False):
         if confirmation.lower() != 'y':
             print("Upload cancelled")
             return False
+
+    extra_args = get_upload_extra_args(bucket, local_path, make_public_flag)
+    is_public = extra_args['ACL'] == 'public-read'
     
     if dry_run:
         print(f"Dry run: Would upload '{local_path}' to '{remote_path}'")
-        if make_public_flag:
+        if is_public:
             print(f"Dry run: Would make '{remote_path}' publicly accessible")
         return True
     
@@ -114,21 +153,14 @@ def upload_file(local_path, remote_path, make_public_flag=False, dry_run=False):
         # Get file size for progress reporting
         file_size = os.path.getsize(local_path)
         
-        # Upload with progress callback
-        s3_client.upload_file(
-            local_path, 
-            bucket, 
-            remote_path
-        )
+        transfer_file(s3_client, bucket, local_path, remote_path, extra_args=extra_args)
         
         elapsed = time.time() - start_time
         speed = file_size / elapsed / 1024 if elapsed > 0 else 0  # KB/s
         
         print(f"Upload complete. {file_size/1024:.1f} KB in {elapsed:.1f} seconds ({speed:.1f} KB/s)")
-        
-        # Make the file public if requested
-        if make_public_flag:
-            make_public(s3_client, bucket, remote_path)
+        if is_public:
+            print(f"Uploaded with public access: {remote_path}")
         
         # Log the upload
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -150,7 +182,7 @@ def upload_file(local_path, remote_path, make_public_flag=False, dry_run=False):
                 'remote_path': remote_path,
                 'timestamp': timestamp,
                 'size_kb': f"{file_size/1024:.1f}",
-                'public': 'yes' if make_public_flag else 'no',
+                'public': 'yes' if is_public else 'no',
                 'status': 'uploaded'
             })
         
@@ -161,14 +193,215 @@ def upload_file(local_path, remote_path, make_public_flag=False, dry_run=False):
         print(f"Error uploading file: {str(e)}")
         return False
 
+def list_existing_keys(s3_client, bucket, prefix):
+    """Return the set of keys already stored under a prefix (one listing instead of a HEAD per file)."""
+    existing = set()
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            existing.add(obj['Key'])
+    return existing
+
+def collect_local_files(source_dir, target_prefix):
+    """Walk a local tree and pair each file with its destination key."""
+    target_prefix = target_prefix.strip('/')
+    files = []
+    for root, _, filenames in os.walk(source_dir):
+        for name in sorted(filenames):
+            if name.startswith('.'):
+                continue  # Skip .DS_Store and other hidden files
+            local_path = os.path.join(root, name)
+            relative = os.path.relpath(local_path, source_dir).replace(os.sep, '/')
+            remote_path = f"{target_prefix}/{relative}" if target_prefix else relative
+            files.append((local_path, remote_path))
+    return files
+
+def _upload_worker(s3_client, bucket, local_path, remote_path, make_public_flag=False, journal=None):
+    """Upload one file; returns (local_path, remote_path, size, public, error)."""
+    try:
+        file_size = os.path.getsize(local_path)
+        extra_args = get_upload_extra_args(bucket, local_path, make_public_flag)
+        transfer_file(s3_client, bucket, local_path, remote_path, journal, extra_args)
+        return local_path, remote_path, file_size, extra_args['ACL'] == 'public-read', None
+    except Exception as e:
+        return local_path, remote_path, 0, False, str(e)
+
+def skip_uploaded_assets(files, bucket):
+    """
+    Drop files whose UUID folder and filename are already anywhere in the bucket,
+    according to the inventory's asset filter (no bucket calls).
+    """
+    conn = open_inventory()
+    bloom = load_asset_filter(conn, bucket)
+    if bloom is None:
+        print("Not skipping uploaded assets: no inventory snapshot")
+        return files
+
+    check = UploadedAssetCheck(conn, bucket, bloom)
+    remaining = []
+    for local_path, remote_path in files:
+        _, uuid, filename = parse_local_path(local_path)
+        if not check.contains(uuid, filename):
+            remaining.append((local_path, remote_path))
+    check.print_stats()
+    if len(remaining) < len(files):
+        print(f"Skipping {len(files) - len(remaining)} files already uploaded elsewhere in the bucket")
+    return remaining
+
+def upload_directory(source_dir, target_prefix, make_public_flag=False, dry_run=False, threads=None, overwrite=False,
+                     skip_uploaded=False):
+    """Upload every file under source_dir to target_prefix using a bounded worker pool."""
+    if not os.path.isdir(source_dir):
+        print(f"Error: Source directory '{source_dir}' not found")
+        return False
+
+    config = load_upload_config()
+    threads = threads or config['upload_threads']
+
+    creds = get_wasabi_credentials()
+    bucket = creds['bucket']
+    # Each upload_file call may itself open several connections for multipart parts
+    s3_client = get_s3_client(max_pool_connections=max(threads * 10, 50))
+
+    files = collect_local_files(source_dir, target_prefix)
+    if not files:
+        print(f"No files found in '{source_dir}'")
+        return True
+    print(f"Found {len(files)} files in '{source_dir}'")
+
+    if skip_uploaded:
+        files = skip_uploaded_assets(files, bucket)
+        if not files:
+            print("Nothing left to upload")
+            return True
+
+    # One listing of the destination replaces per-file existence and folder checks
+    prefix = target_prefix.strip('/') + '/' if target_prefix.strip('/') else ''
+    existing = list_existing_keys(s3_client, bucket, prefix)
+
+    if not overwrite:
+        skipped = [remote for _, remote in files if remote in existing]
+        files = [(local, remote) for local, remote in files if remote not in existing]
+        if skipped:
+            print(f"Skipping {len(skipped)} files that already exist (use --overwrite to replace them)")
+
+    folder_keys = sorted({os.path.dirname(remote) + '/' for _, remote in files if os.path.dirname(remote)})
+    missing_folders = [folder for folder in folder_keys if folder not in existing]
+
+    public = get_upload_extra_args(bucket, source_dir, make_public_flag)['ACL'] == 'public-read'
+    if public and make_public_flag is None:
+        print(f"WARNING: the access policy for bucket '{bucket}' is public - all {len(files)} files "
+              f"will be uploaded with a public-read ACL")
+
+    if dry_run:
+        for local_path, remote_path in files:
+            print(f"Dry run: Would upload '{local_path}' to '{remote_path}'")
+        print(f"Dry run: Would create {len(missing_folders)} folder markers and upload {len(files)} files "
+              f"with {threads} threads{' (public)' if public else ''}")
+        return True
+
+    for folder_key in missing_folders:
+        s3_client.put_object(Bucket=bucket, Key=folder_key)
+    if missing_folders:
+        print(f"Created {len(missing_folders)} folder markers")
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_filename = f"data/output/uploaded_assets_{timestamp}.csv"
+    os.makedirs(os.path.dirname(log_filename), exist_ok=True)
+
+    total_files = len(files)
+    uploaded = 0
+    failed = 0
+    total_bytes = 0
+    start_time = time.time()
+
+    print(f"Uploading {total_files} files to '{prefix}' with {threads} threads...")
+
+    journal = UploadJournal()
+
+    with open(log_filename, 'w', newline='') as csvfile, \
+         ThreadPoolExecutor(max_workers=threads) as executor:
+        fieldnames = ['local_path', 'remote_path', 'timestamp', 'size_kb', 'public', 'status']
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        futures = [
+            executor.submit(_upload_worker, s3_client, bucket, local_path, remote_path, make_public_flag, journal)
+            for local_path, remote_path in files
+        ]
+
+        for done, future in enumerate(as_completed(futures), 1):
+            local_path, remote_path, file_size, is_public, error = future.result()
+
+            if error:
+                failed += 1
+                print(f"Error uploading '{local_path}': {error}")
+            else:
+                uploaded += 1
+                total_bytes += file_size
+
+            writer.writerow({
+                'local_path': local_path,
+                'remote_path': remote_path,
+                'timestamp': timestamp,
+                'size_kb': f"{file_size/1024:.1f}",
+                'public': 'yes' if is_public else 'no',
+                'status': 'error' if error else 'uploaded'
+            })
+
+            if done % 25 == 0 or done == total_files:
+                elapsed = time.time() - start_time
+                rate = done / elapsed if elapsed > 0 else 0
+                speed = total_bytes / elapsed / (1024 * 1024) if elapsed > 0 else 0
+                print(f"Progress: {done}/{total_files} ({done/total_files*100:.1f}%) - "
+                      f"{rate:.1f} files/sec, {speed:.2f} MB/s")
+
+    elapsed = time.time() - start_time
+    speed = total_bytes / elapsed / (1024 * 1024) if elapsed > 0 else 0
+    print("\nUpload complete:")
+    print(f"- Uploaded: {uploaded} files ({total_bytes/(1024*1024):.1f} MB)")
+    print(f"- Errors: {failed} files")
+    print(f"- Time: {elapsed:.1f} seconds ({speed:.2f} MB/s aggregate)")
+    print(f"- Log file: {log_filename}")
+
+    return failed == 0
+
 def main():
     parser = argparse.ArgumentParser(description='Upload an asset to Wasabi bucket')
-    parser.add_argument('--local-path', required=True, help='Path to the local file to upload')
-    parser.add_argument('--remote-path', required=True, help='Destination path within the bucket')
-    parser.add_argument('--public', action='store_true', help='Make the asset publicly accessible')
+    parser.add_argument('--local-path', help='Path to the local file to upload')
+    parser.add_argument('--remote-path', help='Destination path within the bucket')
+    parser.add_argument('--source-dir', help='Local directory to upload recursively')
+    parser.add_argument('--target-prefix', help='Destination prefix for --source-dir uploads')
+    parser.add_argument('--threads', type=int, help='Concurrent uploads for --source-dir (default: upload_threads from config)')
+    parser.add_argument('--overwrite', action='store_true', help='Re-upload files that already exist under --target-prefix')
+    parser.add_argument('--skip-uploaded', action='store_true',
+                        help='Skip files whose UUID/filename the inventory already has anywhere under br_assets/')
+    parser.add_argument('--abort-orphaned', metavar='PREFIX', help='Abort unfinished multipart uploads under a prefix')
+    parser.add_argument('--orphan-age-hours', type=float, default=24, help='Minimum age of uploads to abort (default: 24)')
+    parser.add_argument('--public', action='store_const', const=True, default=False,
+                        help='Make the asset publicly accessible')
+    parser.add_argument('--private', action='store_const', const=False, dest='public',
+                        help='Keep the asset private (the default)')
+    parser.add_argument('--policy-acl', action='store_const', const=None, dest='public',
+                        help="Apply the bucket's access policy from config (public on a public bucket)")
     parser.add_argument('--dry-run', action='store_true', help='Check settings without uploading')
     
     args = parser.parse_args()
+
+    sweep_mode = args.abort_orphaned is not None
+    directory_mode = args.source_dir is not None or args.target_prefix is not None
+    if sweep_mode:
+        if directory_mode or args.local_path or args.remote_path:
+            parser.error('--abort-orphaned cannot be combined with an upload')
+    elif directory_mode:
+        if not (args.source_dir and args.target_prefix is not None):
+            parser.error('--source-dir and --target-prefix must be used together')
+        if args.local_path or args.remote_path:
+            parser.error('--local-path/--remote-path cannot be combined with --source-dir')
+    elif not (args.local_path and args.remote_path):
+        parser.error('either --local-path and --remote-path, or --source-dir and --target-prefix are required')
+    if args.skip_uploaded and not directory_mode:
+        parser.error('--skip-uploaded only applies to --source-dir uploads')
     
     try:
         # Test connection
@@ -180,13 +413,35 @@ def main():
         print(f"Error connecting to bucket: {str(e)}")
         sys.exit(1)
     
-    # Upload the file
-    success = upload_file(
-        args.local_path, 
-        args.remote_path, 
-        args.public, 
-        args.dry_run
-    )
+    if sweep_mode:
+        aborted = abort_orphaned_uploads(
+            s3_client,
+            creds['bucket'],
+            args.abort_orphaned,
+            journal=UploadJournal(),
+            older_than_hours=args.orphan_age_hours,
+            dry_run=args.dry_run
+        )
+        print(f"{'Would abort' if args.dry_run else 'Aborted'} {len(aborted)} orphaned multipart uploads")
+        success = True
+    elif directory_mode:
+        success = upload_directory(
+            args.source_dir,
+            args.target_prefix,
+            make_public_flag=args.public,
+            dry_run=args.dry_run,
+            threads=args.threads,
+            overwrite=args.overwrite,
+            skip_uploaded=args.skip_uploaded
+        )
+    else:
+        # Upload the file
+        success = upload_file(
+            args.local_path, 
+            args.remote_path, 
+            args.public, 
+            args.dry_run
+        )
     
     if not success:
         sys.exit(1)
@@ -1,6 +1,29 @@
 #!/usr/bin/env python3
 """
-Updated script to use secure credential management.
+Copy assets into br_assets/<category>/<subcategory>/ using the asset CSV metadata.
+
+The asset CSV (filename, extension, folder, category, subcategory columns)
+is indexed once into a dict keyed by (folder, full filename), so every
+bucket object resolves in O(1). The full copy plan is built before any
+copy starts.
+
+Copies run concurrently as server-side copy_object requests (multipart
+upload_part_copy for large objects). Destinations that already have the
+same ETag and size are skipped, and results stream to a log that lets an
+interrupted run resume.
+
+Usage:
+    python scripts/utilities/copy_files.py [--csv-file assetsList.csv] [--dry-run] [--from-inventory]
+                                           [--workers 16] [--log-file copy_log.csv]
+
+Options:
+    --csv-file          Asset metadata CSV (default: assetsList.csv)
+    --dry-run           Build and save the copy plan without copying anything
+    --from-inventory    Read the bucket contents from the local inventory instead of listing it
+    --workers N         Concurrent copy requests (default: 16)
+    --log-file PATH     Resumable copy log (default: copy_log.csv)
+    --multipart-threshold-mb N
+                        Use multipart copy above this size (default: 512)
 """
 
 import sys
@@ -11,89 +34,93 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
-from utils.credentials import get_s3_client, get_s3_resource, get_wasabi_credentials
+from utils.credentials import get_s3_client, get_wasabi_credentials
+from utils.listing import list_objects_parallel
+from utils.inventory import open_inventory, inventory_exists, require_snapshot, iter_objects
+from utils.copy_engine import DEFAULT_WORKERS, MULTIPART_COPY_THRESHOLD, pool_connections, run_copy_plan
 
+import argparse
+import time
 import pandas as pd
 import csv
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
 
-# Load the CSV file
-csv_file = 'assetsList.csv'  # Replace with your CSV file path
-df = pd.read_csv(csv_file)
-
-# Create a full filename column for easier matching
-df['full_filename'] = df['filename'] + '.' + df['extension']
-
-# Define Wasabi credentials and endpoint
-
-aws_secret_key = 'QoS75QP3FcQzofuRc98NC4TTcdsIh8qQmsbLzzYS'
-  # Replace with the correct Wasabi region
-  # Correct Wasabi endpoint
-
-# Create a session
-session = boto3.Session(
-    aws_access_key_id=aws_access_key,
-    aws_secret_access_key=aws_secret_key,
-    region_name=region_name
-)
-
-# Connect to S3-compatible resource using Wasabi's endpoint
-s3 = session.resource('s3', endpoint_url=endpoint_url)
-
-# Define your Wasabi bucket
-bucket = s3.Bucket('bestreviews.com')
-
-# Create an empty list to store files that error out
-error_log = []
-
-# Copy files based on category/subcategory, skipping the 'br_assets' folder
-
-
-def copy_files(bucket, df):
+# Appended to on every run; a re-run skips the copies it records as done
+DEFAULT_COPY_LOG = 'copy_log.csv'
+
+def load_asset_index(csv_file):
+    """
+    Index the asset CSV as {(folder, full_filename): (category, subcategory)}.
+
+    When several rows share a folder and filename the first one wins, as
+    the old per-object DataFrame filter did.
+    """
+    df = pd.read_csv(csv_file, dtype=str)
+    df = df.dropna(subset=['folder', 'filename', 'extension'])
+
+    # Create a full filename column for easier matching
+    df['full_filename'] = df['filename'] + '.' + df['extension']
+    df = df.drop_duplicates(subset=['folder', 'full_filename'], keep='first')
+
+    return dict(zip(
+        zip(df['folder'], df['full_filename']),
+        zip(df['category'], df['subcategory'])
+    ))
+
+def build_copy_plan(objects, asset_index):
+    """
+    Resolve every object against the asset index.
+
+    Returns (plan, unmatched): plan is a list of dicts with source, destination,
+    size and etag; unmatched lists the keys without CSV metadata.
+    Files already inside 'br_assets' are skipped.
+    """
+    plan = []
+    unmatched = []
+    for obj in objects:
+        key = obj['Key']  # This is the file's full path
+
+        # Skip any files inside 'br_assets'
+        if key.startswith('br_assets/') or key.endswith('/'):
+            continue
+
+        folder_name = key.split('/')[0]  # Extract folder name
+        file_name = key.split('/')[-1]  # Extract filename with extension
+
+        metadata = asset_index.get((folder_name, file_name))
+        if metadata is None:
+            unmatched.append(key)
+            continue
+
+        # Define the new folder structure under 'br_assets'
+        category, sub_category = metadata
+        new_folder = f"br_assets/{category}/{sub_category}/"
+        plan.append({
+            'source': key,
+            'destination': new_folder + file_name,  # No renaming, just copying
+            'size': obj.get('Size'),
+            'etag': (obj.get('ETag') or '').strip('"')
+        })
+
+    return plan, unmatched
+
+def save_plan(plan, plan_file):
+    with open(plan_file, mode='w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=['source', 'destination', 'size', 'etag'])
+        writer.writeheader()
+        writer.writerows(plan)
+
+def copy_files(s3_client, bucket_name, plan, log_file=DEFAULT_COPY_LOG, workers=DEFAULT_WORKERS,
+               threshold_mb=None):
+    """Copy every planned object concurrently. Returns the error log (list of {'file', 'error'})."""
+    threshold = threshold_mb * 1024 * 1024 if threshold_mb else MULTIPART_COPY_THRESHOLD
+    error_log = []
     try:
-        for obj in bucket.objects.all():  # Iterate through all files in the bucket
-            key = obj.key  # This is the file's full path
-
-            # Skip any files inside 'br_assets'
-            if key.startswith('br_assets/'):
-                continue
-
-            folder_name = key.split('/')[0]  # Extract folder name
-            file_name = key.split('/')[-1]  # Extract filename with extension
-
-            # Filter the DataFrame to find the corresponding entry
-            match = df[(df['folder'] == folder_name) &
-                       (df['full_filename'] == file_name)]
-
-            if not match.empty:
-                # Get the category and subcategory metadata
-                category = match.iloc[0]['category']
-                sub_category = match.iloc[0]['subcategory']
-
-                # Define the new folder structure under 'br_assets'
-                new_folder = f"br_assets/{category}/{sub_category}/"
-                new_file_key = new_folder + file_name  # No renaming, just copying
-
-                try:
-                    # Copy the file to the new location
-                    copy_source = {
-                        'Bucket': bucket.name,
-                        'Key': key
-                    }
-                    bucket.copy(copy_source, new_file_key)
-
-                    print(f"File {key} copied to {new_file_key}")
-
-                except Exception as e:
-                    # If an error occurs, log the file and the error
-                    print(f"Error copying {key}: {e}")
-                    error_log.append({
-                        'file': key,
-                        'error': str(e)
-                    })
-
-            else:
-                print(f"No match found for {key}")
+        print(f"Copying {len(plan)} files with {workers} workers (log: {log_file})...")
+        counts, error_log = run_copy_plan(s3_client, bucket_name, plan, log_file,
+                                          workers=workers, threshold=threshold)
+        print(f"Copied: {counts['copied']}, already at destination: {counts['skipped']}, "
+              f"done in earlier runs: {counts['already_done']}, errors: {counts['error']}")
 
     except ClientError as e:
         print(f"Client error: {e}")
@@ -104,16 +131,74 @@ def copy_files(bucket, df):
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
 
-
-# Copy the files
-copy_files(bucket, df)
-
-# Step to create a CSV error log report
-error_log_file = 'error_log.csv'
-with open(error_log_file, mode='w', newline='') as file:
-    writer = csv.DictWriter(file, fieldnames=['file', 'error'])
-    writer.writeheader()
-    for error in error_log:
-        writer.writerow(error)
-
-print(f"Error log saved to {error_log_file}")
+    return error_log
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy assets into br_assets/<category>/<subcategory>/')
+    parser.add_argument('--csv-file', default='assetsList.csv', help='Asset metadata CSV')
+    parser.add_argument('--dry-run', action='store_true', help='Only build and save the copy plan')
+    parser.add_argument('--from-inventory', action='store_true',
+                        help='Read the bucket contents from the local inventory instead of listing it')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Concurrent copy requests (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--log-file', default=DEFAULT_COPY_LOG, help='Resumable copy log')
+    parser.add_argument('--multipart-threshold-mb', type=int, help='Use multipart copy above this size')
+    args = parser.parse_args()
+
+    if args.from_inventory and not inventory_exists():
+        print("No inventory database found. Run build_inventory.py first.")
+        sys.exit(1)
+
+    # Sized for every copy worker plus the shared multipart part pool
+    s3_client = get_s3_client(max_pool_connections=pool_connections(args.workers))
+    bucket_name = get_wasabi_credentials()['bucket']
+
+    start_time = time.time()
+    asset_index = load_asset_index(args.csv_file)
+    print(f"Indexed {len(asset_index)} assets from {args.csv_file}")
+
+    if args.from_inventory:
+        conn = open_inventory()
+        if require_snapshot(conn, bucket_name) is None:
+            sys.exit(1)
+        objects = iter_objects(conn, bucket_name)
+    else:
+        objects = list_objects_parallel(s3_client, bucket_name)
+
+    plan, unmatched = build_copy_plan(objects, asset_index)
+    print(f"Copy plan: {len(plan)} files to copy, {len(unmatched)} without a match "
+          f"(built in {time.time() - start_time:.1f} seconds)")
+
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    plan_file = f'copy_plan_{timestamp}.csv'
+    save_plan(plan, plan_file)
+    print(f"Copy plan saved to {plan_file}")
+
+    if unmatched:
+        unmatched_file = f'copy_unmatched_{timestamp}.csv'
+        with open(unmatched_file, mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['file'])
+            writer.writerows([key] for key in unmatched)
+        print(f"Files without a match saved to {unmatched_file}")
+
+    if args.dry_run:
+        print("DRY RUN: no files copied")
+        return
+
+    # Copy the files
+    error_log = copy_files(s3_client, bucket_name, plan, args.log_file, args.workers,
+                           args.multipart_threshold_mb)
+
+    # Step to create a CSV error log report
+    error_log_file = 'error_log.csv'
+    with open(error_log_file, mode='w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=['file', 'error'])
+        writer.writeheader()
+        for error in error_log:
+            writer.writerow(error)
+
+    print(f"Error log saved to {error_log_file}")
+
+if __name__ == "__main__":
+    main()
@@ -1,202 +1,332 @@
 #!/usr/bin/env python3
-"""
-Updated script to use secure credential management.
-"""
-
-import sys
-import os
-
-# Add the scripts directory to Python path
-script_dir = os.path.dirname(os.path.abspath(__file__))
-scripts_dir = os.path.dirname(script_dir)
-sys.path.insert(0, scripts_dir)
-
-from utils.credentials import get_s3_client, get_s3_resource, get_wasabi_credentials
-
 """
 BestReviews Asset Management - Asset Finder Utility
 
 This script searches for assets in the Wasabi bucket by filename, regardless of
-which folder they reside in. It returns all matching file paths.
+which folder they reside in. It returns all matching file paths with their
+size and last modified date.
+
+When the local inventory (see build_inventory.py) covers the prefix, exact
+lookups use its filename index and substring, prefix and glob lookups use
+a trigram index, so each takes milliseconds; otherwise, or with --scan,
+the bucket is listed once for all search terms.
 
 Usage:
     python3 find_asset.py --filename "filename.jpg" [options]
+    python3 find_asset.py --terms-file terms.txt --match prefix [options]
 
 Options:
     --filename          Filename to search for (e.g., "image.jpg")
     --case-sensitive    Perform a case-sensitive search (default is case-insensitive)
     --partial-match     Search for partial matches (contains instead of exact match)
+    --match MODE        exact (default), substring, prefix or glob (e.g. "DSC_*.JPG")
+    --terms-file FILE   Search for every term in FILE (one per line); results always go to one CSV
+    --names-file FILE   Resolve every filename in FILE (exact match) and write one CSV of
+                        name -> matching keys, including names that were not found.
+                        Text files hold one name per line; CSV files are read from --column
+    --column NAME       CSV column holding the filenames (default: originalFilename, else the first column)
+    --search-keys       Match against full keys instead of basenames
     --export-csv        Export results to a CSV file
     --prefix            Limit search to a specific prefix/folder
+    --scan              List the bucket even if the inventory is available
 
 Example:
     python3 find_asset.py --filename "_O5A9870.jpg"
     python3 find_asset.py --filename "product" --partial-match --prefix "br_assets/"
+    python3 find_asset.py --filename "WB7A*.jpg" --match glob
+    python3 find_asset.py --names-file "data/input/missing assets may 8.csv" --column originalFilename
 """
 
-from botocore.exceptions import ClientError
-import argparse
 import sys
 import os
+
+# Add the scripts directory to Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.dirname(script_dir)
+sys.path.insert(0, scripts_dir)
+
+from utils.credentials import get_s3_client, get_wasabi_credentials
+from utils.listing import list_objects_parallel
+from utils.inventory import (open_inventory, inventory_exists, latest_snapshot, require_snapshot,
+                             find_by_filename, fold_filename)
+from utils.ngram_index import MATCH_MODES, search_many, value_matches
+
+import argparse
 import time
 import datetime
 import csv
 
-# Wasabi credentials
+BUCKET = get_wasabi_credentials()['bucket']
 
+def create_s3_client():
+    """Create and return an S3 client configured for Wasabi."""
+    try:
+        # Using secure credentials from utils
+        return get_s3_client()
+    except Exception as e:
+        print(f"Error creating S3 client: {str(e)}")
+        sys.exit(1)
 
+def load_terms(terms_file):
+    """Read search terms from a text file, one per line (blank lines and # comments skipped)."""
+    terms = []
+    with open(terms_file, encoding='utf-8-sig') as f:
+        for line in f:
+            term = line.strip()
+            if term and not term.startswith('#') and term not in terms:
+                terms.append(term)
+    return terms
 
+def load_names(names_file, column=None):
+    """
+    Read filenames to resolve from a text file or a CSV column.
 
+    Duplicates are dropped, keeping the first occurrence's order.
+    """
+    if column is None and not names_file.lower().endswith('.csv'):
+        return load_terms(names_file)
 
+    names = []
+    seen = set()
+    with open(names_file, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        if column is None:
+            column = 'originalFilename' if 'originalFilename' in reader.fieldnames else reader.fieldnames[0]
+        elif column not in reader.fieldnames:
+            print(f"Error: column '{column}' not found in {names_file}")
+            sys.exit(1)
+        print(f"Reading filenames from column '{column}' of {names_file}")
 
-def create_s3_client():
-    """Create and return an S3 client configured for Wasabi."""
-    try:
-        # Using secure credentials from utils}")
-        sys.exit(1)
+        for row in reader:
+            name = (row[column] or '').strip()
+            if name and name not in seen:
+                seen.add(name)
+                names.append(name)
+    return names
+
+def find_files_in_inventory(conn, terms, match='exact', case_sensitive=False, prefix="", field='filename'):
+    """
+    Find matching files in the local inventory.
 
-def find_files_by_name(s3_client, filename, case_sensitive=False, partial_match=False, prefix=""):
+    Exact filename matches are probes of the filename index; substring,
+    prefix and glob matches use the trigram index (built on first use).
+    Returns {term: [listing entries (Key, Size, LastModified)]}.
     """
-    Find all files in the Wasabi bucket that match the specified filename.
+    start_time = time.time()
+    print(f"Searching inventory for {len(terms)} term(s)...")
+    print(f"Search options: match={match}, case_sensitive={case_sensitive}, prefix='{prefix}', field={field}")
+
+    if match == 'exact' and field == 'filename':
+        results = {term: find_by_filename(conn, BUCKET, term, case_sensitive, prefix) for term in terms}
+    else:
+        results = search_many(conn, BUCKET, terms, match, field, case_sensitive, prefix)
+
+    print(f"Inventory search took {(time.time() - start_time) * 1000:.1f} ms")
+    return results
+
+def find_files_by_name(s3_client, terms, match='exact', case_sensitive=False, prefix="", field='filename'):
+    """
+    Find all files in the Wasabi bucket that match any of the search terms.
     
     Args:
         s3_client: Boto3 S3 client
-        filename: Filename to search for
+        terms: Filenames or patterns to search for
+        match: 'exact', 'substring', 'prefix' or 'glob'
         case_sensitive: Whether to perform case-sensitive matching
-        partial_match: Whether to search for partial matches (contains vs. exact)
         prefix: Optional prefix to limit the search scope
+        field: 'filename' to match basenames, 'key' to match full keys
         
     Returns:
-        List of matching file paths
+        Dict of term -> matching listing entries (Key, Size, LastModified).
+        All terms are resolved in a single pass over the listing.
     """
-    matches = []
+    results = {term: [] for term in terms}
     count = 0
     start_time = time.time()
     
-    # Prepare search terms
-    if not case_sensitive:
-        search_term = filename.lower()
-    else:
-        search_term = filename
-    
-    # Create paginator for handling large buckets
-    paginator = s3_client.get_paginator('list_objects_v2')
-    page_iterator = paginator.paginate(Bucket=BUCKET, Prefix=prefix)
+    print(f"Searching for files matching {len(terms)} term(s)...")
+    print(f"Search options: match={match}, case_sensitive={case_sensitive}, prefix='{prefix}', field={field}")
     
-    print(f"Searching for files matching '{filename}'...")
-    print(f"Search options: case_sensitive={case_sensitive}, partial_match={partial_match}, prefix='{prefix}'")
+    # Exact terms are resolved with one dict lookup per object instead of a loop over terms
+    exact_terms = {}
+    if match == 'exact':
+        for term in terms:
+            exact_terms.setdefault(term if case_sensitive else fold_filename(term), []).append(term)
     
-    # Process each page of results
-    for page in page_iterator:
-        if 'Contents' not in page:
+    # Shards of the prefix are listed concurrently
+    for obj in list_objects_parallel(s3_client, BUCKET, prefix, ordered=True):
+        count += 1
+        
+        # Calculate progress every 1000 objects
+        if count % 1000 == 0:
+            elapsed = time.time() - start_time
+            rate = count / elapsed if elapsed > 0 else 0
+            print(f"\rProcessed {count} objects ({rate:.1f} objects/sec)...", end="")
+        
+        # Match the basename (filename) or the key (full path)
+        value = obj['Key'] if field == 'key' else os.path.basename(obj['Key'])
+        if exact_terms:
+            for term in exact_terms.get(value if case_sensitive else fold_filename(value), ()):
+                results[term].append(obj)
             continue
-            
-        for obj in page['Contents']:
-            count += 1
-            
-            # Calculate progress every 1000 objects
-            if count % 1000 == 0:
-                elapsed = time.time() - start_time
-                rate = count / elapsed if elapsed > 0 else 0
-                print(f"\rProcessed {count} objects ({rate:.1f} objects/sec)...", end="")
-            
-            # Extract the key (full path) and basename (filename)
-            key = obj['Key']
-            basename = os.path.basename(key)
-            
-            # Apply case sensitivity option
-            if not case_sensitive:
-                compare_basename = basename.lower()
-            else:
-                compare_basename = basename
-            
-            # Match based on partial or exact matching
-            if partial_match:
-                if search_term in compare_basename:
-                    matches.append(key)
-            else:
-                if compare_basename == search_term:
-                    matches.append(key)
+        for term in terms:
+            if value_matches(value, term, match, case_sensitive):
+                results[term].append(obj)
     
     # Final progress update
     elapsed = time.time() - start_time
     rate = count / elapsed if elapsed > 0 else 0
     print(f"\rProcessed {count} objects ({rate:.1f} objects/sec)      ")
     
-    return matches
+    return results
 
-def export_to_csv(matches, filename, search_params):
-    """Export the search results to a CSV file."""
+def export_to_csv(results, include_term=False):
+    """Export the search results ({term: entries}) to a CSV file."""
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     csv_filename = f"asset_search_results_{timestamp}.csv"
     
     with open(csv_filename, 'w', newline='') as csvfile:
         fieldnames = ['path', 'filename', 'size_bytes', 'last_modified']
+        if include_term:
+            fieldnames.append('term')
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
         
-        for path in matches:
-            basename = os.path.basename(path)
-            # We don't have size and last_modified in our matches yet
-            # They could be added by checking each object, but that would
-            # add a lot of API calls for large result sets
-            writer.writerow({
-                'path': path,
-                'filename': basename,
-                'size_bytes': '',
-                'last_modified': ''
-            })
+        for term, matches in results.items():
+            for obj in matches:
+                last_modified = obj.get('LastModified')
+                row = {
+                    'path': obj['Key'],
+                    'filename': os.path.basename(obj['Key']),
+                    'size_bytes': obj.get('Size', ''),
+                    'last_modified': last_modified.isoformat() if last_modified else ''
+                }
+                if include_term:
+                    row['term'] = term
+                writer.writerow(row)
     
     return csv_filename
 
+def export_name_lookup(results):
+    """Write one row per (name, matching key); names without matches get a single empty row."""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_filename = f"asset_lookup_results_{timestamp}.csv"
+
+    with open(csv_filename, 'w', newline='') as csvfile:
+        fieldnames = ['name', 'match_count', 'path', 'size_bytes', 'last_modified']
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for name, matches in results.items():
+            if not matches:
+                writer.writerow({'name': name, 'match_count': 0, 'path': '', 'size_bytes': '', 'last_modified': ''})
+            for obj in matches:
+                last_modified = obj.get('LastModified')
+                writer.writerow({
+                    'name': name,
+                    'match_count': len(matches),
+                    'path': obj['Key'],
+                    'size_bytes': obj.get('Size', ''),
+                    'last_modified': last_modified.isoformat() if last_modified else ''
+                })
+
+    return csv_filename
+
 def main():
     parser = argparse.ArgumentParser(description='Find assets in Wasabi bucket by filename')
-    parser.add_argument('--filename', required=True, help='Filename to search for')
+    terms_group = parser.add_mutually_exclusive_group(required=True)
+    terms_group.add_argument('--filename', help='Filename to search for')
+    terms_group.add_argument('--terms-file', help='Text file with one search term per line')
+    terms_group.add_argument('--names-file', help='Text or CSV file of filenames to resolve (exact match)')
+    parser.add_argument('--column', help='CSV column holding the filenames for --names-file')
     parser.add_argument('--case-sensitive', action='store_true', help='Perform case-sensitive search')
-    parser.add_argument('--partial-match', action='store_true', help='Search for partial matches')
+    parser.add_argument('--partial-match', action='store_true', help='Search for partial matches (same as --match substring)')
+    parser.add_argument('--match', choices=MATCH_MODES, help='How terms are matched (default: exact)')
+    parser.add_argument('--search-keys', action='store_true', help='Match against full keys instead of basenames')
     parser.add_argument('--export-csv', action='store_true', help='Export results to CSV')
     parser.add_argument('--prefix', default='', help='Limit search to specific prefix/folder')
+    parser.add_argument('--scan', action='store_true', help='List the bucket even if the inventory is available')
     
     args = parser.parse_args()
+
+    match = args.match or ('substring' if args.partial_match else 'exact')
+    field = 'key' if args.search_keys else 'filename'
+    if args.names_file:
+        match, field = 'exact', 'filename'
+        terms = load_names(args.names_file, args.column)
+        print(f"Loaded {len(terms)} unique filenames to resolve")
+    elif args.terms_file:
+        terms = load_terms(args.terms_file)
+    else:
+        terms = [args.filename]
+    batch = bool(args.terms_file or args.names_file)
+
+    conn = None
+    if not args.scan and inventory_exists():
+        conn = open_inventory()
+        if latest_snapshot(conn, BUCKET, args.prefix) is None:
+            conn = None
     
-    # Create S3 client
-    s3_client = create_s3_client()
-    
-    # Test connection
-    try:
-        s3_client.head_bucket(Bucket=BUCKET)
-        print(f"Successfully connected to bucket: {BUCKET}")
-    except Exception as e:
-        print(f"Error connecting to bucket: {str(e)}")
-        sys.exit(1)
-    
-    # Search for files
-    matches = find_files_by_name(
-        s3_client,
-        args.filename,
-        case_sensitive=args.case_sensitive,
-        partial_match=args.partial_match,
-        prefix=args.prefix
-    )
+    if conn is not None:
+        require_snapshot(conn, BUCKET, args.prefix)
+        results = find_files_in_inventory(
+            conn,
+            terms,
+            match=match,
+            case_sensitive=args.case_sensitive,
+            prefix=args.prefix,
+            field=field
+        )
+    else:
+        # Create S3 client
+        s3_client = create_s3_client()
+        
+        # Test connection
+        try:
+            s3_client.head_bucket(Bucket=BUCKET)
+            print(f"Successfully connected to bucket: {BUCKET}")
+        except Exception as e:
+            print(f"Error connecting to bucket: {str(e)}")
+            sys.exit(1)
+        
+        # Search for files
+        results = find_files_by_name(
+            s3_client,
+            terms,
+            match=match,
+            case_sensitive=args.case_sensitive,
+            prefix=args.prefix,
+            field=field
+        )
     
     # Display results
-    print(f"\nFound {len(matches)} matching files:")
-    for i, path in enumerate(matches, 1):
-        print(f"{i}. {path}")
+    total_matches = sum(len(matches) for matches in results.values())
+    if batch:
+        found = sum(1 for matches in results.values() if matches)
+        print(f"\nFound {total_matches} matching files for {found} of {len(terms)} terms:")
+        if not args.names_file:
+            for term, matches in results.items():
+                print(f"  {term}: {len(matches)} match(es)")
+    else:
+        matches = results[args.filename]
+        print(f"\nFound {len(matches)} matching files:")
+        for i, obj in enumerate(matches, 1):
+            print(f"{i}. {obj['Key']} ({obj.get('Size') or 0:,} bytes)")
     
-    # Export results if requested
-    if args.export_csv and matches:
-        search_params = {
-            'filename': args.filename,
-            'case_sensitive': args.case_sensitive,
-            'partial_match': args.partial_match,
-            'prefix': args.prefix
-        }
-        csv_filename = export_to_csv(matches, args.filename, search_params)
+    if args.names_file:
+        missing = [term for term, matches in results.items() if not matches]
+        print(f"Names not found: {len(missing)}")
+        csv_filename = export_name_lookup(results)
+        print(f"\nResults exported to {csv_filename}")
+        return
+
+    # Export results if requested (always for batch searches)
+    if (args.export_csv or batch) and total_matches:
+        csv_filename = export_to_csv(results, include_term=batch)
         print(f"\nResults exported to {csv_filename}")
     
     # Provide a command for deletion if files were found
-    if matches:
+    if total_matches:
         print("\nTo delete these files, you can:")
         print("1. Export results to CSV with --export-csv flag")
         print("2. Use bulk_delete_assets.py with the generated CSV file:")
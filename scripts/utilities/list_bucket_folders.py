@@ -1,6 +1,20 @@
 #!/usr/bin/env python3
 """
-Updated script to use secure credential management.
+Lists every folder in the Wasabi bucket (or under a prefix) and saves them to CSV.
+
+Folders are discovered breadth-first: each level's CommonPrefixes are
+listed concurrently by a worker pool, so deep trees such as
+br_assets/BatchNN/xx/yy/UUID/ come back complete. With --from-inventory
+the tree is derived from the local inventory without any LIST calls.
+
+Usage:
+    python scripts/utilities/list_bucket_folders.py [prefix] [--max-depth N] [--workers N] [--from-inventory]
+
+Options:
+    prefix              Only list folders under this prefix (e.g. 'br_assets/')
+    --max-depth N       Levels to descend below the prefix (default: unlimited)
+    --workers N         Concurrent listing requests (default: 16)
+    --from-inventory    Derive the folders from the local inventory (see build_inventory.py)
 """
 
 import sys
@@ -11,135 +25,83 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
-from utils.credentials import get_s3_client, get_s3_resource, get_wasabi_credentials
+from utils.credentials import get_s3_client, get_wasabi_credentials
+from utils.listing import DEFAULT_WORKERS, list_prefix
+from utils.inventory import open_inventory, inventory_exists, require_snapshot, iter_objects
 
+import argparse
 import csv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import sys
-
-# Define Wasabi credentials and endpoint
-
-aws_secret_key = 'QoS75QP3FcQzofuRc98NC4TTcdsIh8qQmsbLzzYS'
-
-
-bucket_name = 'bestreviews.com'
-
-# Create a session
-print("Establishing connection to Wasabi...")
-session = boto3.Session(
-    aws_access_key_id=aws_access_key,
-    aws_secret_access_key=aws_secret_key,
-    region_name=region_name
-)
-
-# Connect to S3-compatible resource using Wasabi's endpoint
-s3 = session.resource('s3', endpoint_url=endpoint_url)
-s3_client = session.client('s3', endpoint_url=endpoint_url)
-
-# Define your Wasabi bucket
-bucket = s3.Bucket(bucket_name)
-
-# Generate timestamp for the output file
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-output_filename = f'bucket_folders_{timestamp}.csv'
 
 def get_bucket_name():
     return get_wasabi_credentials()['bucket']
 
-def list_all_folders(bucket, prefix=None):
+def list_all_folders(s3_client, bucket_name, prefix='', max_depth=None, workers=DEFAULT_WORKERS):
     """
-    Lists all folders in the specified bucket.
-    In S3, folders are represented by objects with keys that end with a '/'
-    
+    Lists all folders under prefix with a concurrent breadth-first search.
+    In S3, folders are CommonPrefixes of a '/' delimited listing, or objects
+    with keys that end with a '/'
+
     Args:
-        bucket: The S3 bucket object
+        s3_client: Boto3 S3 client
+        bucket_name: Bucket to list
         prefix: Optional prefix to filter results (e.g., 'br_assets/')
-    
+        max_depth: Number of levels to descend below prefix (None for all)
+        workers: Number of concurrent listing requests
+
     Returns:
-        A list of folder paths
+        A sorted list of folder paths
     """
     print(f"Retrieving folders from bucket: {bucket_name}")
-    
-    # Initialize list to store folders
-    folders = []
-    
-    # Set up pagination parameters
-    total_folders = 0
-    delimiter = '/'
-    
-    # Use the list_objects_v2 method which supports pagination and delimiters
-    paginator = s3_client.get_paginator('list_objects_v2')
-    
-    # Set up the parameters for paginator
-    operation_parameters = {
-        'Bucket': bucket_name,
-        'Delimiter': delimiter
-    }
-    
-    # Add prefix if specified
-    if prefix:
-        operation_parameters['Prefix'] = prefix
-    
-    # Paginate through results
-    page_iterator = paginator.paginate(**operation_parameters)
-    
-    for page in page_iterator:
-        # Get common prefixes (folders)
-        if 'CommonPrefixes' in page:
-            for obj in page['CommonPrefixes']:
-                folder_path = obj['Prefix']
-                folders.append(folder_path)
-                total_folders += 1
-                
-                # Print progress every 100 folders
-                if total_folders % 100 == 0:
-                    print(f"Found {total_folders} folders so far...")
-        
-        # Also check for 'folders' that are represented as objects with keys ending in '/'
-        if 'Contents' in page:
-            for obj in page['Contents']:
-                key = obj['Key']
-                if key.endswith('/'):
-                    if key not in folders:  # Avoid duplicates
-                        folders.append(key)
-                        total_folders += 1
-                        
-                        # Print progress every 100 folders
-                        if total_folders % 100 == 0:
-                            print(f"Found {total_folders} folders so far...")
-                            
-    # Recursively list subfolders
-    subfolder_count = 0
-    all_folders = folders.copy()
-    
-    for folder in folders:
-        # Get subfolders for each folder
-        subfolder_params = {
-            'Bucket': bucket_name, 
-            'Delimiter': delimiter,
-            'Prefix': folder
-        }
-        
-        subfolder_iterator = paginator.paginate(**subfolder_params)
-        for page in subfolder_iterator:
-            if 'CommonPrefixes' in page:
-                for obj in page['CommonPrefixes']:
-                    subfolder_path = obj['Prefix']
-                    if subfolder_path not in all_folders:  # Avoid duplicates
-                        all_folders.append(subfolder_path)
-                        subfolder_count += 1
-                        
-                        # Print progress every 100 subfolders
-                        if subfolder_count % 100 == 0:
-                            print(f"Found {subfolder_count} subfolders so far...")
-    
-    print(f"Total folders found: {len(all_folders)}")
-    return all_folders
+
+    folders = set()
+    frontier = [prefix or '']
+    depth = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while frontier and (max_depth is None or depth < max_depth):
+            next_frontier = set()
+            listings = executor.map(lambda p: list_prefix(s3_client, bucket_name, p, delimiter='/'), frontier)
+
+            for contents, common_prefixes in listings:
+                next_frontier.update(common_prefixes)
+                # Also pick up 'folders' that are represented as objects with keys ending in '/'
+                for obj in contents:
+                    if obj['Key'].endswith('/') and obj['Key'] != prefix:
+                        folders.add(obj['Key'])
+
+            next_frontier -= folders
+            folders.update(next_frontier)
+            frontier = sorted(next_frontier)
+            depth += 1
+            print(f"Level {depth}: {len(frontier)} new folders ({len(folders)} total)")
+
+    print(f"Total folders found: {len(folders)}")
+    return sorted(folders)
+
+def folders_from_inventory(conn, bucket_name, prefix='', max_depth=None):
+    """Derive the folder tree under prefix from inventory keys, without any LIST calls."""
+    print(f"Deriving folders from the local inventory for bucket: {bucket_name}")
+    base_depth = prefix.count('/')
+    folders = set()
+
+    for obj in iter_objects(conn, bucket_name, prefix):
+        parts = obj['Key'].split('/')[:-1]
+        if max_depth is not None:
+            parts = parts[:base_depth + max_depth]
+        # Every ancestor below the prefix is a folder
+        for level in range(base_depth + 1, len(parts) + 1):
+            folders.add('/'.join(parts[:level]) + '/')
+
+    folders.discard(prefix)
+    print(f"Total folders found: {len(folders)}")
+    return sorted(folders)
 
 def save_to_csv(folders, filename):
     """
     Saves the list of folders to a CSV file
-    
+
     Args:
         folders: List of folder paths
         filename: Output CSV filename
@@ -157,23 +119,44 @@ def save_to_csv(folders, filename):
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description='List all folders in the Wasabi bucket')
+    parser.add_argument('prefix', nargs='?', default='', help="Only list folders under this prefix (e.g. 'br_assets/')")
+    parser.add_argument('--max-depth', type=int, help='Levels to descend below the prefix (default: unlimited)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Concurrent listing requests (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--from-inventory', action='store_true',
+                        help='Derive the folders from the local inventory instead of listing the bucket')
+    args = parser.parse_args()
+
+    # Generate timestamp for the output file
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_filename = f'bucket_folders_{timestamp}.csv'
+
     try:
-        # Get command line arguments
-        prefix = None
-        if len(sys.argv) > 1:
-            prefix = sys.argv[1]
-            print(f"Filtering folders with prefix: {prefix}")
-        
+        bucket_name = get_bucket_name()
+        if args.prefix:
+            print(f"Filtering folders with prefix: {args.prefix}")
+
         # List all folders
-        folders = list_all_folders(bucket, prefix)
-        
+        if args.from_inventory:
+            if not inventory_exists():
+                print("No inventory database found. Run build_inventory.py first.")
+                sys.exit(1)
+            conn = open_inventory()
+            if require_snapshot(conn, bucket_name, args.prefix) is None:
+                sys.exit(1)
+            folders = folders_from_inventory(conn, bucket_name, args.prefix, args.max_depth)
+        else:
+            print("Establishing connection to Wasabi...")
+            folders = list_all_folders(get_s3_client(), bucket_name, args.prefix, args.max_depth, args.workers)
+
         # Save results to CSV
         save_to_csv(folders, output_filename)
-        
+
         print("Operation completed successfully!")
-        
+
     except Exception as e:
         print(f"An error occurred: {e}")
-        
+
 if __name__ == "__main__":
     main()
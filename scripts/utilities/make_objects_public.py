@@ -1,6 +1,30 @@
 #!/usr/bin/env python3
 """
-Updated script to use secure credential management.
+Make Wasabi objects public (public-read ACL).
+
+Objects are streamed from a single parallel listing straight into a pool
+of ACL workers, so the bucket is read once and many ACL requests are in
+flight at the same time.
+
+ACL state is cached in the inventory database (see utils/acl_cache.py),
+keyed by the object's ETag and LastModified, so re-runs and audits skip
+every object whose ACL was already seen and that has not changed since.
+
+Usage:
+    python scripts/utilities/make_objects_public.py [--prefix PREFIX] [--workers N] [--no-acl-check]
+    python scripts/utilities/make_objects_public.py --test 50 [--from-inventory]
+    python scripts/utilities/make_objects_public.py --audit --prefix br_assets/ [--from-inventory]
+
+Options:
+    --prefix            Only process objects under this prefix (default: whole bucket)
+    --test N            Test mode: only process N random folders
+    --from-inventory    Read objects (or the --test folders) from the local inventory instead of
+                        listing the bucket
+    --audit             Report objects under --prefix that are not public, without changing ACLs
+    --no-cache          Ignore and do not update the ACL state cache
+    --workers N         Concurrent ACL requests (default: 16)
+    --no-acl-check      Skip the get_object_acl check and always send put_object_acl
+                        (one request per object instead of two)
 """
 
 import sys
@@ -11,155 +35,251 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 scripts_dir = os.path.dirname(script_dir)
 sys.path.insert(0, scripts_dir)
 
-from utils.credentials import get_s3_client, get_s3_resource, get_wasabi_credentials
+from utils.credentials import get_s3_client, get_wasabi_credentials
+from utils.listing import list_objects_parallel
+from utils.inventory import open_inventory, inventory_exists, require_snapshot, iter_objects, latest_snapshot
+from utils.acl_cache import ACLCache
 
 import csv
 import random
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
 import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 
-# Define Wasabi credentials and endpoint
+DEFAULT_WORKERS = 16
 
-aws_secret_key = 'QoS75QP3FcQzofuRc98NC4TTcdsIh8qQmsbLzzYS'
+ALL_USERS_URI = 'http://acs.amazonaws.com/groups/global/AllUsers'
 
+def get_bucket_name():
+    return get_wasabi_credentials()['bucket']
+
+def check_public(s3_client, bucket_name, obj_key):
+    """Read an object's ACL. Returns (is_public, error); is_public is None if the ACL could not be read."""
+    try:
+        # Get the current ACL
+        acl = s3_client.get_object_acl(Bucket=bucket_name, Key=obj_key)
+    except Exception as e:
+        return None, str(e)
 
+    # Check for public-read grant
+    for grant in acl.get('Grants', []):
+        grantee = grant.get('Grantee', {})
+        if (grantee.get('Type') == 'Group' and
+            grantee.get('URI') == ALL_USERS_URI and
+            grant.get('Permission') == 'READ'):
+            return True, None
+    return False, None
 
-# Create a session
-session = boto3.Session(
-    aws_access_key_id=aws_access_key,
-    aws_secret_access_key=aws_secret_key,
-    region_name=region_name
-)
+# Function to check if an object is already public
+def is_object_public(s3_client, bucket_name, obj_key):
+    public, error = check_public(s3_client, bucket_name, obj_key)
+    if error:
+        print(f"Error checking ACL for {obj_key}: {error}")
+    return bool(public)
 
-# Connect to S3-compatible resource using Wasabi's endpoint
-s3 = session.resource('s3', endpoint_url=endpoint_url)
-s3_client = session.client('s3', endpoint_url=endpoint_url)
+def folder_of(key):
+    """The folder a key lives in ('a/b/c.jpg' -> 'a/b/'; folder markers are their own folder)."""
+    if key.endswith('/'):
+        return key
+    if '/' in key:
+        return key.rsplit('/', 1)[0] + '/'
+    return None
 
-# Define your Wasabi bucket
-bucket_name = 'bestreviews.com'
-bucket = s3.Bucket(bucket_name)
+def in_selected_folders(key, folders):
+    """True if any ancestor prefix of key is one of the selected folders (O(depth) set lookups)."""
+    index = key.find('/')
+    while index != -1:
+        if key[:index + 1] in folders:
+            return True
+        index = key.find('/', index + 1)
+    return False
 
-# Parse command line arguments
-parser = argparse.ArgumentParser(description='Make Wasabi objects public')
-parser.add_argument('--test', type=int, help='Test mode: specify number of random folders to process')
-args = parser.parse_args()
+# Function to get all folder prefixes in the bucket
+def get_all_folders(s3_client, bucket_name, prefix='', from_inventory=False):
+    folders = set()
+    if from_inventory:
+        print("Reading folders from the local inventory...")
+        conn = open_inventory()
+        if require_snapshot(conn, bucket_name, prefix) is None:
+            return []
+        objects = iter_objects(conn, bucket_name, prefix)
+    else:
+        print("Scanning for folders in bucket...")
+        objects = list_objects_parallel(s3_client, bucket_name, prefix)
 
-# Lists to store results
-successful_objects = []
-failed_objects = []
-already_public = []
+    for obj in objects:
+        folder = folder_of(obj['Key'])
+        if folder:
+            folders.add(folder)
 
-# Count for progress reporting
-total_objects = 0
-processed_objects = 0
-start_time = time.time()
+    return sorted(folders)
 
-# Function to check if an object is already public
-def get_bucket_name():
-    return get_wasabi_credentials()['bucket']
+def iter_selected_objects(s3_client, bucket_name, folders):
+    """
+    List only the selected folders.
 
-def is_object_public(obj_key):
+    Folders nested inside another selected folder are dropped so every
+    object is listed exactly once.
+    """
+    selected = set(folders)
+    roots = [folder for folder in sorted(selected)
+             if not in_selected_folders(folder[:-1], selected)]
+    for folder in roots:
+        yield from list_objects_parallel(s3_client, bucket_name, folder)
+
+def set_public_acl(s3_client, bucket_name, key, check_acl=True):
+    """Worker: returns (key, status, error) with status 'public', 'already_public' or 'failed'."""
     try:
-        # Get the current ACL
-        acl = s3_client.get_object_acl(Bucket=bucket_name, Key=obj_key)
-        
-        # Check for public-read grant
-        for grant in acl.get('Grants', []):
-            grantee = grant.get('Grantee', {})
-            if (grantee.get('Type') == 'Group' and 
-                grantee.get('URI') == 'http://acs.amazonaws.com/groups/global/AllUsers' and
-                grant.get('Permission') == 'READ'):
-                return True
-        return False
+        # Check if object is already public
+        if check_acl and is_object_public(s3_client, bucket_name, key):
+            return key, 'already_public', None
+
+        # Set ACL to public-read
+        s3_client.put_object_acl(
+            Bucket=bucket_name,
+            Key=key,
+            ACL='public-read'
+        )
+        return key, 'public', None
     except Exception as e:
-        print(f"Error checking ACL for {obj_key}: {str(e)}")
-        return False
+        return key, 'failed', str(e)
 
-# Function to get all folder prefixes in the bucket
-def get_all_folders():
-    print("Scanning for folders in bucket...")
-    folders = set()
-    for obj in bucket.objects.all():
-        # Get the folder part of the key
-        parts = obj.key.split('/')
-        if len(parts) > 1:
-            # Reconstruct the folder path (everything except the last part)
-            folder = '/'.join(parts[:-1]) + '/'
-            folders.add(folder)
-        elif obj.key.endswith('/'):
-            # It's a folder object itself
-            folders.add(obj.key)
-    
-    return list(folders)
+class ResultWriter:
+    """Streams results to the three CSV files as they arrive."""
+
+    def __init__(self):
+        # Generate timestamp for filenames
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        self.success_file = f'public_objects_success_{timestamp}.csv'
+        self.failed_file = f'public_objects_failed_{timestamp}.csv'
+        self.already_file = f'already_public_objects_{timestamp}.csv'
+
+        self._files = [open(path, mode='w', newline='')
+                       for path in (self.success_file, self.failed_file, self.already_file)]
+        self.success = csv.writer(self._files[0])
+        self.success.writerow(['Object Key'])
+        self.failed = csv.DictWriter(self._files[1], fieldnames=['key', 'error'])
+        self.failed.writeheader()
+        self.already = csv.writer(self._files[2])
+        self.already.writerow(['Object Key'])
+
+        self.counts = {'public': 0, 'already_public': 0, 'failed': 0}
+
+    def record(self, key, status, error=None):
+        self.counts[status] += 1
+        if status == 'public':
+            self.success.writerow([key])
+        elif status == 'already_public':
+            self.already.writerow([key])
+        else:
+            self.failed.writerow({'key': key, 'error': error})
+
+    def close(self):
+        for f in self._files:
+            f.close()
+
+def iter_source_objects(s3_client, bucket_name, prefix='', from_inventory=False):
+    """Objects under prefix from the inventory or a parallel listing."""
+    if from_inventory:
+        conn = open_inventory()
+        if require_snapshot(conn, bucket_name, prefix) is None:
+            return
+        yield from iter_objects(conn, bucket_name, prefix)
+    else:
+        yield from list_objects_parallel(s3_client, bucket_name, prefix)
+
+def open_acl_cache(bucket_name, prefix=''):
+    """Open the ACL cache and drop entries the inventory shows as changed."""
+    cache = ACLCache(bucket_name)
+    if latest_snapshot(cache.conn, bucket_name, prefix) is not None:
+        removed = cache.prune_stale(prefix)
+        if removed:
+            print(f"Dropped {removed} cached ACL entries for objects that changed since they were checked")
+    return cache
 
 # Function to make objects public
-def make_objects_public(folder_limit=None):
-    global processed_objects, total_objects
-    
+def make_objects_public(folder_limit=None, prefix='', workers=DEFAULT_WORKERS, check_acl=True,
+                        acl_cache=None, from_inventory=False):
+    """
+    Make every object under prefix (or in folder_limit random folders) public.
+
+    Objects the ACL cache already knows to be public (and that have not
+    changed since) are recorded as already public without any ACL request;
+    every ACL read or write updates the cache.
+    """
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    results = ResultWriter()
+    processed_objects = 0
+    start_time = time.time()
+
     try:
-        # Get folders to process
-        all_folders = get_all_folders()
-        print(f"Found {len(all_folders)} folders in bucket '{bucket_name}'")
-        
-        folders_to_process = all_folders
-        
-        # If in test mode, select random folders
-        if folder_limit and folder_limit < len(all_folders):
-            folders_to_process = random.sample(all_folders, folder_limit)
-            print(f"TEST MODE: Selected {folder_limit} random folders to process")
-            print("Selected folders:")
-            for i, folder in enumerate(sorted(folders_to_process)):
-                print(f"  {i+1}. {folder}")
-        
-        # Count objects in selected folders for progress reporting
-        total_objects = 0
-        print("Counting objects in selected folders...")
-        for obj in bucket.objects.all():
-            # Check if the object belongs to one of our folders
-            if any(obj.key.startswith(folder) for folder in folders_to_process) or obj.key in folders_to_process:
-                total_objects += 1
-        
-        print(f"Starting to process {total_objects} objects from {len(folders_to_process)} folders...")
-        
-        # Process objects
-        for obj in bucket.objects.all():
-            key = obj.key
-            
-            # Skip if not in our selected folders
-            if not any(key.startswith(folder) for folder in folders_to_process) and key not in folders_to_process:
-                continue
-            
-            # Progress update
+        if folder_limit:
+            all_folders = get_all_folders(s3_client, bucket_name, prefix, from_inventory)
+            print(f"Found {len(all_folders)} folders in bucket '{bucket_name}'")
+
+            folders_to_process = all_folders
+            # If in test mode, select random folders
+            if folder_limit < len(all_folders):
+                folders_to_process = random.sample(all_folders, folder_limit)
+                print(f"TEST MODE: Selected {folder_limit} random folders to process")
+                print("Selected folders:")
+                for i, folder in enumerate(sorted(folders_to_process)):
+                    print(f"  {i+1}. {folder}")
+
+            objects = iter_selected_objects(s3_client, bucket_name, folders_to_process)
+        else:
+            objects = iter_source_objects(s3_client, bucket_name, prefix, from_inventory)
+
+        print(f"Processing objects under '{bucket_name}/{prefix}' with {workers} ACL workers...")
+
+        in_flight_objects = {}
+
+        def handle(future):
+            nonlocal processed_objects
+            key, status, error = future.result()
+            obj = in_flight_objects.pop(future)
+            results.record(key, status, error)
+            if acl_cache is not None and status != 'failed':
+                acl_cache.record(obj, public=True)
             processed_objects += 1
-            if processed_objects % 10 == 0 or processed_objects == total_objects:
+
+            if status == 'public':
+                print(f"Made public: {key}")
+            elif status == 'failed':
+                print(f"Failed to make public: {key} - Error: {error}")
+
+            # Progress update
+            if processed_objects % 100 == 0:
                 elapsed = time.time() - start_time
                 objects_per_second = processed_objects / elapsed if elapsed > 0 else 0
-                percent_complete = (processed_objects / total_objects) * 100 if total_objects > 0 else 0
-                print(f"Progress: {processed_objects}/{total_objects} ({percent_complete:.1f}%) - {objects_per_second:.1f} objects/sec")
-            
-            try:
-                # Check if object is already public
-                if is_object_public(key):
-                    already_public.append(key)
+                print(f"Progress: {processed_objects} objects - {objects_per_second:.1f} objects/sec")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = set()
+            for obj in objects:
+                cached = acl_cache.lookup(obj) if acl_cache is not None else None
+                if cached:
+                    results.record(obj['Key'], 'already_public')
+                    processed_objects += 1
                     continue
-                
-                # Set ACL to public-read
-                s3_client.put_object_acl(
-                    Bucket=bucket_name,
-                    Key=key,
-                    ACL='public-read'
-                )
-                successful_objects.append(key)
-                print(f"Made public: {key}")
-                
-            except Exception as e:
-                failed_objects.append({
-                    'key': key,
-                    'error': str(e)
-                })
-                print(f"Failed to make public: {key} - Error: {str(e)}")
-                
+
+                # A cached "private" state makes the ACL check redundant
+                future = executor.submit(set_public_acl, s3_client, bucket_name, obj['Key'],
+                                         check_acl and cached is None)
+                in_flight_objects[future] = obj
+                in_flight.add(future)
+
+                # Bound the queue so the listing does not run far ahead of the workers
+                if len(in_flight) >= workers * 4:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        handle(future)
+
+            for future in as_completed(in_flight):
+                handle(future)
+
     except ClientError as e:
         print(f"Client error: {e}")
     except NoCredentialsError:
@@ -168,59 +288,141 @@ def make_objects_public(folder_limit=None):
         print("Incomplete credentials provided.")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
+    finally:
+        results.close()
+        if acl_cache is not None:
+            acl_cache.commit()
+
+    results.processed = processed_objects
+    results.elapsed = time.time() - start_time
+    return results
+
+def audit_public_state(prefix='', workers=DEFAULT_WORKERS, acl_cache=None, from_inventory=False):
+    """
+    Report which objects under prefix are not public, without changing anything.
+
+    Objects with a valid cached ACL state need no request; the rest are
+    checked concurrently and cached. Returns (output file, counts).
+    """
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    counts = {'public': 0, 'not_public': 0, 'errors': 0, 'acl_requests': 0, 'cached': 0}
+    start_time = time.time()
 
-# Function to save results to CSV
-def save_results():
-    # Generate timestamp for filenames
     timestamp = time.strftime("%Y%m%d_%H%M%S")
-    
-    # Save successful operations
-    success_file = f'public_objects_success_{timestamp}.csv'
-    with open(success_file, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(['Object Key'])
-        for key in successful_objects:
-            writer.writerow([key])
-    
-    # Save failed operations
-    failed_file = f'public_objects_failed_{timestamp}.csv'
-    with open(failed_file, mode='w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=['key', 'error'])
-        writer.writeheader()
-        for error in failed_objects:
-            writer.writerow(error)
-    
-    # Save already public objects
-    already_file = f'already_public_objects_{timestamp}.csv'
-    with open(already_file, mode='w', newline='') as file:
+    output_file = f'not_public_objects_{timestamp}.csv'
+
+    with open(output_file, mode='w', newline='') as file:
         writer = csv.writer(file)
-        writer.writerow(['Object Key'])
-        for key in already_public:
-            writer.writerow([key])
-            
-    return success_file, failed_file, already_file
-
-# Run the function to make objects public
-if args.test:
-    make_objects_public(folder_limit=args.test)
-else:
-    make_objects_public()
-
-# Save results to CSV files
-success_file, failed_file, already_file = save_results()
-
-print("\nTo run this script in test mode with 50 random folders:")
-print("python make_objects_public.py --test 50")
-print("\nTo run on all folders (no limit):")
-print("python make_objects_public.py")
-
-# Print summary
-print("\nOperation complete!")
-print(f"Total objects processed: {processed_objects}")
-print(f"Objects made public: {len(successful_objects)}")
-print(f"Objects already public: {len(already_public)}")
-print(f"Failed operations: {len(failed_objects)}")
-print(f"Results saved to:")
-print(f"  - {success_file} (successfully made public)")
-print(f"  - {already_file} (already public)")
-print(f"  - {failed_file} (failed operations)")
+        writer.writerow(['Object Key', 'Status', 'Error'])
+
+        def record(obj, public, error=None):
+            if public is None:
+                counts['errors'] += 1
+                writer.writerow([obj['Key'], 'error', error])
+            elif public:
+                counts['public'] += 1
+            else:
+                counts['not_public'] += 1
+                writer.writerow([obj['Key'], 'private', ''])
+
+            checked = counts['public'] + counts['not_public'] + counts['errors']
+            if checked % 1000 == 0:
+                elapsed = time.time() - start_time
+                print(f"Audited {checked} objects ({counts['cached']} from cache, "
+                      f"{counts['acl_requests']} ACL requests) - {checked / elapsed if elapsed > 0 else 0:.1f} objects/sec")
+
+        def handle(future, obj):
+            public, error = future.result()
+            if public is not None and acl_cache is not None:
+                acl_cache.record(obj, public)
+            record(obj, public, error)
+
+        print(f"Auditing ACLs under '{bucket_name}/{prefix}'...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = {}
+            for obj in iter_source_objects(s3_client, bucket_name, prefix, from_inventory):
+                cached = acl_cache.lookup(obj) if acl_cache is not None else None
+                if cached is not None:
+                    counts['cached'] += 1
+                    record(obj, cached)
+                    continue
+
+                counts['acl_requests'] += 1
+                in_flight[executor.submit(check_public, s3_client, bucket_name, obj['Key'])] = obj
+                if len(in_flight) >= workers * 4:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        handle(future, in_flight.pop(future))
+
+            for future in as_completed(list(in_flight)):
+                handle(future, in_flight.pop(future))
+
+    if acl_cache is not None:
+        acl_cache.commit()
+    return output_file, counts
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Make Wasabi objects public')
+    parser.add_argument('--test', type=int, help='Test mode: specify number of random folders to process')
+    parser.add_argument('--prefix', default='', help='Only process objects under this prefix')
+    parser.add_argument('--from-inventory', action='store_true',
+                        help='Pick --test folders from the local inventory instead of listing the bucket')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Concurrent ACL requests (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--no-acl-check', action='store_true',
+                        help='Skip get_object_acl and always send put_object_acl')
+    parser.add_argument('--audit', action='store_true',
+                        help='Only report objects under --prefix that are not public')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore and do not update the ACL state cache')
+    args = parser.parse_args()
+
+    if args.from_inventory and not inventory_exists():
+        print("No inventory database found. Run build_inventory.py first.")
+        sys.exit(1)
+
+    acl_cache = None if args.no_cache else open_acl_cache(get_bucket_name(), args.prefix)
+
+    if args.audit:
+        output_file, counts = audit_public_state(
+            prefix=args.prefix,
+            workers=args.workers,
+            acl_cache=acl_cache,
+            from_inventory=args.from_inventory
+        )
+        print("\nAudit complete!")
+        print(f"Public objects: {counts['public']}")
+        print(f"Not public objects: {counts['not_public']}")
+        print(f"ACL read errors: {counts['errors']}")
+        print(f"Answered from cache: {counts['cached']} (ACL requests sent: {counts['acl_requests']})")
+        print(f"Not public objects saved to: {output_file}")
+        return
+
+    results = make_objects_public(
+        folder_limit=args.test,
+        prefix=args.prefix,
+        workers=args.workers,
+        check_acl=not args.no_acl_check,
+        acl_cache=acl_cache,
+        from_inventory=args.from_inventory
+    )
+
+    print("\nTo run this script in test mode with 50 random folders:")
+    print("python make_objects_public.py --test 50")
+    print("\nTo run on all folders (no limit):")
+    print("python make_objects_public.py")
+
+    # Print summary
+    print("\nOperation complete!")
+    print(f"Total objects processed: {results.processed} in {results.elapsed:.1f} seconds")
+    print(f"Objects made public: {results.counts['public']}")
+    print(f"Objects already public: {results.counts['already_public']}")
+    print(f"Failed operations: {results.counts['failed']}")
+    print(f"Results saved to:")
+    print(f"  - {results.success_file} (successfully made public)")
+    print(f"  - {results.already_file} (already public)")
+    print(f"  - {results.failed_file} (failed operations)")
+
+if __name__ == "__main__":
+    main()
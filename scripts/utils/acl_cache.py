@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of object ACL state (public or private).
+
+Stored as an acl_state table in the inventory database. Each entry records
+the ETag and LastModified the object had when its ACL was read or set, so
+an entry is only trusted while the object is unchanged; entries that a
+later inventory snapshot shows as changed or deleted are pruned.
+"""
+
+from datetime import datetime
+
+from utils.inventory import INVENTORY_DB, open_inventory, prefix_range
+
+ACL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS acl_state (
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    public INTEGER NOT NULL,
+    checked_at TEXT NOT NULL,
+    PRIMARY KEY (bucket, key)
+);
+"""
+
+# Cache writes are committed in batches
+COMMIT_EVERY = 1000
+
+def _version(obj):
+    """(etag, last_modified) of a listing entry, normalized the way the inventory stores them."""
+    last_modified = obj.get('LastModified')
+    if isinstance(last_modified, datetime):
+        last_modified = last_modified.isoformat()
+    return (obj.get('ETag') or '').strip('"'), last_modified
+
+class ACLCache:
+    """
+    ACL state keyed by (bucket, key), valid only for a matching ETag/LastModified.
+
+    Use from a single thread: workers report results back to the caller,
+    which records them here.
+    """
+
+    def __init__(self, bucket, conn=None, db_path=INVENTORY_DB):
+        self.bucket = bucket
+        self.conn = conn or open_inventory(db_path)
+        self.conn.executescript(ACL_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+
+    def lookup(self, obj):
+        """Return True/False for a cached, still valid entry, or None if the ACL must be read."""
+        etag, last_modified = _version(obj)
+        row = self.conn.execute(
+            'SELECT etag, last_modified, public FROM acl_state WHERE bucket = ? AND key = ?',
+            (self.bucket, obj['Key'])
+        ).fetchone()
+        if row is None or (row['etag'], row['last_modified']) != (etag, last_modified):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return bool(row['public'])
+
+    def record(self, obj, public):
+        etag, last_modified = _version(obj)
+        self.conn.execute(
+            'INSERT OR REPLACE INTO acl_state (bucket, key, etag, last_modified, public, checked_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (self.bucket, obj['Key'], etag, last_modified, int(bool(public)), datetime.now().isoformat())
+        )
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+    def prune_stale(self, prefix=''):
+        """
+        Drop entries under prefix that a newer inventory snapshot contradicts.
+
+        An entry goes when a snapshot taken after its ACL was checked shows
+        the object with another ETag/LastModified, or no longer lists it.
+        Keys the inventory has not seen yet (objects uploaded or made public
+        since the last snapshot) are kept. Returns the number of entries removed.
+        """
+        low, high = prefix_range(prefix)
+        # started_at rather than completed_at: a listing that began before the
+        # check may have passed the key's shard before the object existed
+        removed = self.conn.execute(
+            'DELETE FROM acl_state WHERE bucket = ? AND key >= ? AND key < ? AND EXISTS ('
+            '  SELECT 1 FROM snapshots s WHERE s.bucket = acl_state.bucket AND s.completed_at IS NOT NULL'
+            '  AND s.started_at > acl_state.checked_at'
+            '  AND substr(acl_state.key, 1, length(s.prefix)) = s.prefix'
+            ') AND NOT EXISTS ('
+            '  SELECT 1 FROM objects o WHERE o.bucket = acl_state.bucket AND o.key = acl_state.key'
+            '  AND o.etag IS acl_state.etag AND o.last_modified IS acl_state.last_modified)',
+            (self.bucket, low, high)
+        ).rowcount
+        self.conn.commit()
+        return removed
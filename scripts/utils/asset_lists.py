@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Readers for the asset lists the comparison scripts reconcile.
+
+Every reader yields (uuid, filename) pairs as they appear in the list.
+sort_source() normalizes one list into sorted runs on disk and
+merge_sorted_sources() walks several of them in one k-way merge, one UUID
+folder at a time, so any number of lists can be compared in bounded
+memory. load_asset_set() instead parses a whole list into an AssetSet,
+splitting the file across worker processes.
+"""
+
+import csv
+import heapq
+import time
+from functools import partial
+from itertools import groupby
+
+from utils.asset_set import AssetSet
+from utils.external_sort import DEFAULT_RUN_SIZE, ExternalSorter
+from utils.key_parser import normalize_uuid, split_uuid_filename
+from utils.parallel_csv import DEFAULT_WORKERS, csv_rows, map_chunks
+
+def iter_original_list(file_path):
+    """
+    Yield (uuid, filename) for every parseable line of the original asset list.
+    Unparseable lines are counted and reported at the end.
+    """
+    skipped_lines = 0
+    total_lines = 0
+    start_time = time.time()
+
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            # Skip header if present
+            header = f.readline().strip()
+            if header.lower().startswith('original'):
+                print(f"Skipping header: '{header}'")
+            else:
+                # If not a header, process the line
+                uuid, filename = split_uuid_filename(header)
+                if uuid and filename:
+                    yield uuid, filename
+
+            # Process the rest of the file
+            for line_num, line in enumerate(f, 2):
+                total_lines += 1
+
+                if total_lines % 10000 == 0:
+                    elapsed = time.time() - start_time
+                    print(f"Processed {total_lines:,} lines in {elapsed:.2f} seconds ({total_lines/elapsed:.2f} lines/sec)")
+
+                line = line.strip()
+                if not line:
+                    skipped_lines += 1
+                    continue
+
+                uuid, filename = split_uuid_filename(line)
+
+                if uuid and filename:
+                    yield uuid, filename
+                else:
+                    skipped_lines += 1
+                    # Log a few examples of lines we couldn't parse
+                    if skipped_lines <= 5:
+                        print(f"Warning: Could not parse line {line_num}: '{line}'")
+
+    except Exception as e:
+        print(f"Error loading original list: {e}")
+
+    print(f"Skipped {skipped_lines:,} lines that could not be parsed")
+
+def iter_wasabi_files(file_path):
+    """Yield (uuid, filename) for every row of a Wasabi details CSV file."""
+    start_time = time.time()
+    total_rows = 0
+
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                total_rows += 1
+                if total_rows % 10000 == 0:
+                    elapsed = time.time() - start_time
+                    print(f"Processed {total_rows:,} rows in {elapsed:.2f} seconds ({total_rows/elapsed:.2f} rows/sec)")
+
+                # Get UUID Folder from the updated output
+                yield row.get('UUID Folder'), row.get('Filename')
+
+    except Exception as e:
+        print(f"Error loading Wasabi files: {e}")
+
+def iter_external_hd_files(file_path):
+    """Yield (uuid, filename) for every row of an external HD CSV file."""
+    start_time = time.time()
+    total_rows = 0
+
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                total_rows += 1
+                if total_rows % 10000 == 0:
+                    elapsed = time.time() - start_time
+                    print(f"Processed {total_rows:,} rows in {elapsed:.2f} seconds ({total_rows/elapsed:.2f} rows/sec)")
+
+                # Get the filepath from the external HD file
+                filepath = row.get('FilePath', '')
+                if filepath:
+                    yield split_uuid_filename(filepath)
+
+    except Exception as e:
+        print(f"Error loading external HD files: {e}")
+
+def sort_source(entries, run_size=DEFAULT_RUN_SIZE, keep_format=False):
+    """
+    Normalize one source's (uuid, filename) entries into sorted runs on disk.
+    Records are (normalized uuid, filename, original uuid or '').
+    """
+    sorter = ExternalSorter(run_size)
+    for uuid, filename in entries:
+        if uuid and filename:
+            sorter.add((normalize_uuid(uuid), filename.strip(), uuid if keep_format else ''))
+    # Nothing stays buffered while the next source loads
+    sorter.flush()
+    print(f"Sorted {sorter.count:,} entries into {len(sorter.runs)} runs")
+    return sorter
+
+def tag_records(sorter, index):
+    """Yield a source's sorted records tagged with its index."""
+    for norm, filename, spelling in sorter.sorted():
+        yield norm, filename, spelling, index
+
+def merge_sorted_sources(sorters):
+    """
+    k-way merge sorted sources.
+    Yields (normalized uuid, spelling or None, [(filename, set of source indexes), ...])
+    once per UUID, so only one UUID folder is held in memory at a time. The
+    spelling is the first one kept by a source sorted with keep_format.
+    """
+    streams = [tag_records(sorter, index) for index, sorter in enumerate(sorters)]
+    for norm, records in groupby(heapq.merge(*streams), key=lambda r: r[0]):
+        spelling = None
+        files = []
+        for filename, group in groupby(records, key=lambda r: r[1]):
+            present = set()
+            for _, _, record_spelling, index in group:
+                present.add(index)
+                if record_spelling and spelling is None:
+                    spelling = record_spelling
+            files.append((filename, present))
+        yield norm, spelling, files
+
+def header_index(header, column):
+    """Position of column in a CSV header line, or None."""
+    names = next(csv.reader([header]), [])
+    return names.index(column) if column in names else None
+
+def original_chunk(text, header, keep_format=False):
+    """Parse a range of the original list. Returns (assets, lines, skipped, unparsed examples)."""
+    assets = AssetSet()
+    lines = text.split('\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    skipped = 0
+    examples = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            skipped += 1
+            continue
+        uuid, filename = split_uuid_filename(line)
+        if uuid and filename:
+            assets.add(uuid, filename, keep_format=keep_format)
+        else:
+            skipped += 1
+            if len(examples) < 5:
+                examples.append(line)
+    return assets, len(lines), skipped, examples
+
+def wasabi_chunk(text, header):
+    """Parse a range of a Wasabi details CSV. Returns (assets, rows)."""
+    assets = AssetSet()
+    uuid_index = header_index(header, 'UUID Folder')
+    filename_index = header_index(header, 'Filename')
+    rows = 0
+    for row in csv_rows(text):
+        if not row:
+            continue
+        rows += 1
+        uuid = row[uuid_index] if uuid_index is not None and uuid_index < len(row) else None
+        filename = row[filename_index] if filename_index is not None and filename_index < len(row) else None
+        assets.add(uuid, filename)
+    return assets, rows
+
+def external_hd_chunk(text, header):
+    """Parse a range of an external HD CSV. Returns (assets, rows)."""
+    assets = AssetSet()
+    path_index = header_index(header, 'FilePath')
+    rows = 0
+    for row in csv_rows(text):
+        if not row:
+            continue
+        rows += 1
+        filepath = row[path_index] if path_index is not None and path_index < len(row) else ''
+        if filepath:
+            assets.add(*split_uuid_filename(filepath))
+    return assets, rows
+
+def load_asset_set(file_path, kind, workers=DEFAULT_WORKERS, keep_format=False):
+    """
+    Parse a whole asset list ('original', 'wasabi' or 'external_hd') into
+    one AssetSet, spreading newline-aligned chunks over worker processes.
+    """
+    assets = AssetSet()
+    start_time = time.time()
+
+    if kind == 'original':
+        header, results = map_chunks(file_path, partial(original_chunk, keep_format=keep_format),
+                                     workers, errors='replace')
+        if header is not None:
+            header = header.strip()
+            if header.lower().startswith('original'):
+                print(f"Skipping header: '{header}'")
+            else:
+                # If not a header, process the line
+                uuid, filename = split_uuid_filename(header)
+                if uuid and filename:
+                    assets.add(uuid, filename, keep_format=keep_format)
+
+        total_lines = skipped_lines = 0
+        for chunk_assets, lines, skipped, examples in results:
+            assets.update(chunk_assets)
+            total_lines += lines
+            for line in examples[:max(0, 5 - skipped_lines)]:
+                print(f"Warning: Could not parse line: '{line}'")
+            skipped_lines += skipped
+        print(f"Processed {total_lines:,} lines in {time.time() - start_time:.2f} seconds")
+        print(f"Skipped {skipped_lines:,} lines that could not be parsed")
+        return assets
+
+    parse_chunk = {'wasabi': wasabi_chunk, 'external_hd': external_hd_chunk}[kind]
+    _, results = map_chunks(file_path, parse_chunk, workers)
+    total_rows = 0
+    for chunk_assets, rows in results:
+        assets.update(chunk_assets)
+        total_rows += rows
+    print(f"Processed {total_rows:,} rows in {time.time() - start_time:.2f} seconds")
+    return assets
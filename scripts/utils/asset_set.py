@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Compact UUID/filename sets for the comparison scripts.
+
+An asset is stored as three unsigned 64-bit integers -- the high and low
+halves of its normalized UUID and a hash of its filename -- in NumPy
+arrays sorted by one mixed 64-bit key, so the difference of two
+multi-million-row lists is a vectorised searchsorted instead of a Python
+set of strings. Filenames are kept as one UTF-8 blob with per-row offsets,
+and the original spelling of each UUID as a one-byte code per row (hyphen
+positions and case) with a small side table for spellings a code cannot
+reproduce.
+
+UUIDs that are not 32 hex digits once normalized are kept as plain
+'UUID/filename' strings. Two different filenames of the same UUID would
+have to share a 64-bit hash to be confused.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.key_parser import normalize_uuid
+
+# Rows buffered as strings before they are encoded into arrays in bulk
+CHUNK_SIZE = 100000
+
+HEX_DIGITS = frozenset('0123456789ABCDEF')
+
+# ASCII bytes that are upper-case hex digits
+_HEX_VALID = np.zeros(256, dtype=bool)
+_HEX_VALID[np.frombuffer(b'0123456789ABCDEF', dtype=np.uint8)] = True
+
+# Multipliers that spread UUID halves across the sort key
+_HI_MIX = np.uint64(0x9E3779B97F4A7C15)
+_LO_MIX = np.uint64(0xC2B2AE3D27D4EB4F)
+
+# Spelling codes: one bit per hyphen position (hex digits before it) plus a lower-case flag
+_HYPHEN_BITS = {8: 1, 12: 2, 16: 4, 20: 8}
+_LOWERCASE = 16
+# The spelling is in the side table
+FMT_SIDE_TABLE = 254
+# No spelling recorded: the normalized form is used
+FMT_NONE = 255
+
+def uuid_to_int(norm_uuid):
+    """128-bit integer for a normalized (hyphen-less, upper-case) UUID, or None if it is not one."""
+    if len(norm_uuid) != 32 or not HEX_DIGITS.issuperset(norm_uuid):
+        return None
+    return int(norm_uuid, 16)
+
+def hash_names(names):
+    """64-bit hashes of a list of filenames."""
+    return pd.util.hash_array(np.asarray(names, dtype=object))
+
+def encode_uuids(norm_uuids):
+    """
+    Encode normalized UUID strings into (hi, lo, valid) arrays in one pass.
+
+    hi and lo are the two 64-bit halves; rows that are not 32 hex digits
+    have valid False and zeros in hi and lo.
+    """
+    count = len(norm_uuids)
+    valid = np.fromiter((len(u) == 32 for u in norm_uuids), dtype=bool, count=count)
+    hi = np.zeros(count, dtype=np.uint64)
+    lo = np.zeros(count, dtype=np.uint64)
+
+    fixed = np.flatnonzero(valid)
+    if len(fixed):
+        text = ''.join(norm_uuids[i] for i in fixed).encode('ascii', 'replace')
+        digits = np.frombuffer(text, dtype=np.uint8).reshape(-1, 32)
+        hex_rows = _HEX_VALID[digits].all(axis=1)
+        valid[fixed[~hex_rows]] = False
+        fixed = fixed[hex_rows]
+        if len(fixed):
+            packed = bytes.fromhex(digits[hex_rows].tobytes().decode('ascii'))
+            halves = np.frombuffer(packed, dtype='>u8').reshape(-1, 2)
+            hi[fixed] = halves[:, 0]
+            lo[fixed] = halves[:, 1]
+
+    return hi, lo, valid
+
+def format_uuid(value, code=0):
+    """Spell a 128-bit UUID with the hyphens and case recorded in code."""
+    digits = f'{value:032x}' if code & _LOWERCASE else f'{value:032X}'
+    out = []
+    start = 0
+    for end, bit in ((8, 1), (12, 2), (16, 4), (20, 8)):
+        out.append(digits[start:end])
+        if code & bit:
+            out.append('-')
+        start = end
+    out.append(digits[start:])
+    return ''.join(out)
+
+def spelling_code(uuid, norm_uuid):
+    """Spelling code reproducing uuid from its integer, or FMT_SIDE_TABLE if none can."""
+    if len(norm_uuid) != 32 or not HEX_DIGITS.issuperset(norm_uuid):
+        return FMT_SIDE_TABLE
+
+    code = 0
+    if uuid != uuid.upper():
+        if uuid != uuid.lower():
+            return FMT_SIDE_TABLE
+        code = _LOWERCASE
+
+    digits = 0
+    for ch in uuid:
+        if ch == '-':
+            if digits not in _HYPHEN_BITS or code & _HYPHEN_BITS[digits]:
+                return FMT_SIDE_TABLE
+            code |= _HYPHEN_BITS[digits]
+        else:
+            digits += 1
+    return code
+
+def _mix(hi, lo, name):
+    return (hi * _HI_MIX) ^ (lo * _LO_MIX) ^ name
+
+class AssetSet:
+    """
+    Set of normalized (UUID, filename) assets.
+
+    Supports add(), update(), len(), set difference with '-', iteration over the
+    normalized 'UUID/filename' paths and paths() in the original spelling.
+    """
+
+    def __init__(self):
+        self.irregular = set()
+        # Normalized UUID -> original spelling, for spellings no code reproduces
+        self.spellings = {}
+        self._norms = []
+        self._names = []
+        self._codes = []
+        self._last_spelling = None
+        self._last_code = FMT_NONE
+        self._chunks = []
+        self._blob_parts = []
+        self._blob_size = 0
+        self._blob = b''
+
+        empty = np.empty(0, dtype=np.uint64)
+        self._key = self._hi = self._lo = self._name = empty
+        self._start = np.empty(0, dtype=np.int64)
+        self._length = np.empty(0, dtype=np.int32)
+        self._fmt = np.empty(0, dtype=np.uint8)
+
+    def add(self, uuid, filename, keep_format=False):
+        """
+        Add one asset, normalized like get_uuid_file_combo() always did.
+
+        With keep_format the UUID's original spelling is kept for paths().
+        Returns False if uuid or filename is empty.
+        """
+        if not uuid or not filename:
+            return False
+
+        norm = normalize_uuid(uuid)
+        self._norms.append(norm)
+        self._names.append(filename.strip())
+
+        if keep_format:
+            # Lists usually repeat one UUID for consecutive files
+            if uuid != self._last_spelling:
+                self._last_spelling = uuid
+                self._last_code = spelling_code(uuid, norm)
+                if self._last_code == FMT_SIDE_TABLE:
+                    self.spellings[norm] = uuid
+            self._codes.append(self._last_code)
+        else:
+            self._codes.append(FMT_NONE)
+
+        if len(self._norms) >= CHUNK_SIZE:
+            self._pack()
+        return True
+
+    def _pack(self):
+        """Encode the buffered rows into arrays; irregular rows go to the string set."""
+        if not self._norms:
+            return
+        norms, names, codes = self._norms, self._names, self._codes
+        self._norms, self._names, self._codes = [], [], []
+
+        hi, lo, valid = encode_uuids(norms)
+        for i in np.flatnonzero(~valid):
+            self.irregular.add(f"{norms[i]}/{names[i]}")
+
+        rows = np.flatnonzero(valid)
+        kept_names = [names[i] for i in rows]
+        encoded = [name.encode('utf-8', 'surrogatepass') for name in kept_names]
+        length = np.fromiter(map(len, encoded), dtype=np.int32, count=len(encoded))
+        start = np.zeros(len(encoded), dtype=np.int64)
+        if len(encoded):
+            start[1:] = np.cumsum(length[:-1], dtype=np.int64)
+        start += self._blob_size
+
+        self._blob_parts.append(b''.join(encoded))
+        self._blob_size += int(length.sum())
+        self._chunks.append((
+            hi[rows], lo[rows], hash_names(kept_names), start, length,
+            np.asarray(codes, dtype=np.uint8)[rows]
+        ))
+
+    def _columns(self):
+        """Sorted, de-duplicated (key, hi, lo, name) columns, merging rows added since the last call."""
+        self._pack()
+        if self._chunks:
+            existing = (self._hi, self._lo, self._name, self._start, self._length, self._fmt)
+            hi, lo, name, start, length, fmt = (
+                np.concatenate([existing[c]] + [chunk[c] for chunk in self._chunks]) for c in range(6)
+            )
+            self._chunks = []
+            self._blob = self._blob + b''.join(self._blob_parts)
+            self._blob_parts = []
+
+            key = _mix(hi, lo, name)
+            order = np.argsort(key, kind='stable')
+            key, hi, lo, name = key[order], hi[order], lo[order], name[order]
+            start, length, fmt = start[order], length[order], fmt[order]
+
+            same_key = np.zeros(len(key), dtype=bool)
+            same_key[1:] = key[1:] == key[:-1]
+            same_row = same_key.copy()
+            same_row[1:] &= (hi[1:] == hi[:-1]) & (lo[1:] == lo[:-1]) & (name[1:] == name[:-1])
+            keep = ~same_row
+
+            # Rows sharing a key with a different row may hide a non-adjacent duplicate
+            for i in np.flatnonzero(same_key & ~same_row):
+                j = i - 1
+                while j >= 0 and key[j] == key[i]:
+                    if keep[j] and hi[j] == hi[i] and lo[j] == lo[i] and name[j] == name[i]:
+                        keep[i] = False
+                        break
+                    j -= 1
+
+            self._key, self._hi, self._lo, self._name = key[keep], hi[keep], lo[keep], name[keep]
+            self._start, self._length, self._fmt = start[keep], length[keep], fmt[keep]
+        return self._key, self._hi, self._lo, self._name
+
+    def update(self, other):
+        """
+        Add every asset of another AssetSet, e.g. one a worker process built
+        from part of a file. The rows are merged as arrays, not re-parsed.
+        """
+        _, hi, lo, name = other._columns()
+        self._pack()
+        self._chunks.append((hi, lo, name, other._start + self._blob_size, other._length, other._fmt))
+        self._blob_parts.append(other._blob)
+        self._blob_size += len(other._blob)
+        self.irregular |= other.irregular
+        self.spellings.update(other.spellings)
+
+    def __len__(self):
+        return len(self._columns()[0]) + len(self.irregular)
+
+    def __sub__(self, other):
+        key, hi, lo, name = self._columns()
+        other_key, other_hi, other_lo, other_name = other._columns()
+
+        if len(other_key):
+            idx = np.searchsorted(other_key, key)
+            idx[idx >= len(other_key)] = 0
+            key_found = other_key[idx] == key
+            found = key_found & (other_hi[idx] == hi) & (other_lo[idx] == lo) & (other_name[idx] == name)
+
+            # Key matched a different row: the real match may sit further along the run
+            for i in np.flatnonzero(key_found & ~found):
+                j = idx[i]
+                while j < len(other_key) and other_key[j] == key[i]:
+                    if other_hi[j] == hi[i] and other_lo[j] == lo[i] and other_name[j] == name[i]:
+                        found[i] = True
+                        break
+                    j += 1
+            missing = ~found
+        else:
+            missing = np.ones(len(key), dtype=bool)
+
+        result = AssetSet()
+        result._key, result._hi, result._lo, result._name = key[missing], hi[missing], lo[missing], name[missing]
+        result._start, result._length, result._fmt = self._start[missing], self._length[missing], self._fmt[missing]
+        result._blob = self._blob
+        result._blob_size = len(self._blob)
+        result.irregular = self.irregular - other.irregular
+        result.spellings = dict(self.spellings)
+        return result
+
+    def _uuid_codes(self, hi, lo):
+        """{uuid: code} for the UUIDs in (hi, lo) that this set recorded a spelling for."""
+        self._columns()
+        wanted = np.isin(_mix(self._hi, self._lo, 0), _mix(hi, lo, 0)) & (self._fmt != FMT_NONE)
+        return {
+            (h << 64) | l: code
+            for h, l, code in zip(self._hi[wanted].tolist(), self._lo[wanted].tolist(), self._fmt[wanted].tolist())
+        }
+
+    def _rows(self):
+        """Yield (uuid int, spelling code, filename) for the encoded rows."""
+        _, hi, lo, _ = self._columns()
+        blob = self._blob
+        rows = zip(hi.tolist(), lo.tolist(), self._fmt.tolist(), self._start.tolist(), self._length.tolist())
+        for h, l, code, start, length in rows:
+            yield (h << 64) | l, code, blob[start:start + length].decode('utf-8', 'surrogatepass')
+
+    def __iter__(self):
+        """Yield normalized 'UUID/filename' paths."""
+        for value, _, filename in self._rows():
+            yield f"{value:032X}/{filename}"
+        yield from self.irregular
+
+    def paths(self, spellings=None):
+        """
+        Yield 'UUID/filename' paths with each UUID spelled as it was added.
+
+        Rows added without keep_format take the spelling recorded for the
+        same UUID in the spellings set (e.g. the original list) if given,
+        and the normalized form otherwise.
+        """
+        reference = {}
+        side_table = {}
+        if spellings is not None:
+            _, hi, lo, _ = self._columns()
+            unspelled = self._fmt == FMT_NONE
+            reference = spellings._uuid_codes(hi[unspelled], lo[unspelled])
+            side_table.update(spellings.spellings)
+        side_table.update(self.spellings)
+
+        for value, code, filename in self._rows():
+            if code == FMT_NONE:
+                code = reference.get(value, FMT_NONE)
+            if code == FMT_NONE:
+                uuid = f'{value:032X}'
+            elif code == FMT_SIDE_TABLE:
+                norm = f'{value:032X}'
+                uuid = side_table.get(norm, norm)
+            else:
+                uuid = format_uuid(value, code)
+            yield f"{uuid}/{filename}"
+
+        for combo in self.irregular:
+            norm_uuid, filename = combo.split('/', 1)
+            yield f"{side_table.get(norm_uuid, norm_uuid)}/{filename}"
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Bloom filter of the assets already on Wasabi, persisted next to the inventory.
+
+The filter holds one normalized 'UUID/filename' key per inventory object,
+so "is this asset already uploaded?" is answered from a few hundred KB of
+bits with no bucket calls. A negative answer is certain; a positive one is
+confirmed with an exact inventory lookup (UploadedAssetCheck does both).
+
+The file records a format version and the inventory snapshot it was built
+from; load_asset_filter() rebuilds it whenever either no longer matches.
+"""
+
+import hashlib
+import json
+import math
+import struct
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from utils.inventory import INVENTORY_DB, has_asset, latest_snapshot, prefix_range, require_snapshot
+from utils.key_parser import normalize_uuid
+
+MAGIC = b'WBLOOM'
+FORMAT_VERSION = 1
+
+# A false positive only costs one inventory lookup
+DEFAULT_ERROR_RATE = 0.01
+
+# Scanners and uploaders check assets under this prefix
+DEFAULT_FILTER_PREFIX = 'br_assets/'
+
+# Keys hashed per numpy batch while building
+BUILD_BATCH_SIZE = 100000
+
+_MASK64 = (1 << 64) - 1
+
+def asset_key(uuid, filename):
+    """Normalized 'UUID/filename' key, matching AssetSet and the inventory's uuid_norm column."""
+    return f"{normalize_uuid(uuid)}/{filename.strip()}"
+
+def _hash_pair(key):
+    digest = hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    # The second hash must be odd so the probe sequence visits distinct bits
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings using double hashing over one blake2b digest."""
+
+    def __init__(self, num_bits, num_hashes, meta=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray((num_bits + 7) // 8)
+        self.count = 0
+        self.meta = dict(meta or {})
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate=DEFAULT_ERROR_RATE, meta=None):
+        """Size a filter for capacity keys at the given false positive rate."""
+        capacity = max(1, capacity)
+        num_bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+        return cls(num_bits, num_hashes, meta)
+
+    def _positions(self, key):
+        h1, h2 = _hash_pair(key)
+        return [((h1 + i * h2) & _MASK64) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def add_many(self, keys):
+        """Add a batch of keys, computing every bit position with numpy."""
+        if not keys:
+            return
+        digests = b''.join(
+            hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=16).digest() for key in keys
+        )
+        halves = np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+        h1 = halves[:, 0]
+        h2 = halves[:, 1] | np.uint64(1)
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        for i in range(self.num_hashes):
+            # uint64 arithmetic wraps exactly like the & _MASK64 in _positions()
+            positions = (h1 + np.uint64(i) * h2) % np.uint64(self.num_bits)
+            np.bitwise_or.at(bits, (positions >> np.uint64(3)).astype(np.int64),
+                             (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+        self.count += len(keys)
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    def save(self, path):
+        header = json.dumps(dict(self.meta, num_bits=self.num_bits, num_hashes=self.num_hashes,
+                                 count=self.count)).encode('utf-8')
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(str(path) + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<HI', FORMAT_VERSION, len(header)))
+            f.write(header)
+            f.write(self.bits)
+        # Readers never see a half-written filter
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a saved filter; raises ValueError for other formats or versions."""
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a Bloom filter file")
+            version, header_size = struct.unpack('<HI', f.read(struct.calcsize('<HI')))
+            if version != FORMAT_VERSION:
+                raise ValueError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+            meta = json.loads(f.read(header_size).decode('utf-8'))
+            count = meta.pop('count')
+            bloom = cls(meta.pop('num_bits'), meta.pop('num_hashes'), meta)
+            bloom.count = count
+            bits = f.read()
+            if len(bits) != len(bloom.bits):
+                raise ValueError(f"{path} is truncated")
+            bloom.bits = bytearray(bits)
+        return bloom
+
+def filter_path(bucket, db_path=INVENTORY_DB):
+    """Filter file kept beside the inventory database, one per bucket."""
+    return Path(db_path).parent / f'asset_filter_{bucket}.bloom'
+
+def build_asset_filter(conn, bucket, prefix='', error_rate=DEFAULT_ERROR_RATE):
+    """Build a filter of every inventory asset under prefix, or None if no snapshot covers it."""
+    snapshot = require_snapshot(conn, bucket, prefix)
+    if snapshot is None:
+        return None
+
+    low, high = prefix_range(prefix)
+    where = ('WHERE bucket = ? AND key >= ? AND key < ? '
+             'AND uuid_norm IS NOT NULL AND filename IS NOT NULL')
+    total = conn.execute(f'SELECT COUNT(*) FROM objects {where}', (bucket, low, high)).fetchone()[0]
+
+    bloom = BloomFilter.for_capacity(total, error_rate, meta={
+        'bucket': bucket,
+        'prefix': prefix,
+        'snapshot_id': snapshot['id'],
+        'built_at': datetime.now().isoformat()
+    })
+    cursor = conn.execute(f'SELECT uuid_norm, filename FROM objects {where}', (bucket, low, high))
+    while True:
+        rows = cursor.fetchmany(BUILD_BATCH_SIZE)
+        if not rows:
+            break
+        bloom.add_many([f"{uuid_norm}/{filename.strip()}" for uuid_norm, filename in rows])
+
+    print(f"Built asset filter of {bloom.count:,} keys from snapshot {snapshot['id']} "
+          f"({len(bloom.bits) / 1024:,.0f} KB, {bloom.num_hashes} hashes)")
+    return bloom
+
+def load_asset_filter(conn, bucket, prefix=DEFAULT_FILTER_PREFIX, db_path=INVENTORY_DB, rebuild=False):
+    """
+    Return the saved filter if it covers prefix and matches the latest snapshot,
+    otherwise build and save a new one. None if the inventory has no snapshot.
+    """
+    path = filter_path(bucket, db_path)
+    snapshot = latest_snapshot(conn, bucket, prefix)
+    if not rebuild and snapshot is not None and path.exists():
+        try:
+            bloom = BloomFilter.load(path)
+            if (bloom.meta.get('bucket') == bucket and prefix.startswith(bloom.meta.get('prefix', ''))
+                    and bloom.meta.get('snapshot_id') == snapshot['id']):
+                return bloom
+            print(f"Asset filter {path} is out of date; rebuilding")
+        except (ValueError, KeyError, OSError) as e:
+            print(f"Could not read asset filter {path} ({e}); rebuilding")
+
+    bloom = build_asset_filter(conn, bucket, prefix)
+    if bloom is not None:
+        bloom.save(path)
+        print(f"Saved asset filter to {path}")
+    return bloom
+
+class UploadedAssetCheck:
+    """
+    "Is this UUID/filename already on Wasabi?" answered from the asset filter,
+    with an exact inventory lookup only for keys the filter reports present.
+
+    Also supports `"UUID/filename" in check`, so it can stand in for a set of
+    uploaded UUID/filename combinations.
+    """
+
+    def __init__(self, conn, bucket, bloom, prefix=DEFAULT_FILTER_PREFIX):
+        self.conn = conn
+        self.bucket = bucket
+        self.bloom = bloom
+        self.prefix = prefix
+        self.probes = 0
+        self.filter_hits = 0
+        self.confirmed = 0
+
+    def contains(self, uuid, filename):
+        if not uuid or not filename:
+            return False
+        self.probes += 1
+        uuid_norm = normalize_uuid(uuid)
+        filename = filename.strip()
+        if f"{uuid_norm}/{filename}" not in self.bloom:
+            return False
+        self.filter_hits += 1
+        if has_asset(self.conn, self.bucket, uuid_norm, filename, self.prefix):
+            self.confirmed += 1
+            return True
+        return False
+
+    def __contains__(self, combo):
+        uuid, _, filename = combo.partition('/')
+        return self.contains(uuid, filename)
+
+    def __len__(self):
+        return len(self.bloom)
+
+    def print_stats(self):
+        false_positives = self.filter_hits - self.confirmed
+        print(f"Asset filter: {self.probes:,} probes, {self.filter_hits:,} hits checked against the inventory, "
+              f"{false_positives:,} false positives")
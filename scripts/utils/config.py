@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Upload configuration loading.
+
+Reads config/upload_config.json, falling back to the committed
+config/upload_config.json.template so scripts always have defaults.
+"""
+
+import json
+import mimetypes
+from pathlib import Path
+
+# Project root is two levels above scripts/utils/
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+CONFIG_FILE = PROJECT_ROOT / 'config' / 'upload_config.json'
+CONFIG_TEMPLATE = PROJECT_ROOT / 'config' / 'upload_config.json.template'
+
+DEFAULT_CONFIG = {
+    'production_bucket': 'bestreviews.com',
+    'cold_storage_bucket': 'bestreviews-cold-storage',
+    'upload_threads': 5,
+    'multipart_threshold_mb': 64,
+    'multipart_chunk_mb': 16,
+    'public_access_production': True,
+    'public_access_cold': False,
+    'cache_control_production': 'public, max-age=31536000',
+    'cache_control_cold': ''
+}
+
+_config = None
+
+def load_upload_config(reload=False):
+    """Return the upload configuration dict (cached after the first read)."""
+    global _config
+    if _config is not None and not reload:
+        return _config
+
+    config = dict(DEFAULT_CONFIG)
+    for path in (CONFIG_FILE, CONFIG_TEMPLATE):
+        if path.exists():
+            with open(path) as f:
+                config.update(json.load(f))
+            break
+
+    _config = config
+    return _config
+
+def get_bucket_policy(bucket):
+    """
+    Return the metadata policy for a bucket: {'public': bool, 'cache_control': str}.
+
+    The production and cold storage buckets follow public_access_* and
+    cache_control_* from the config; any other bucket is private with no
+    Cache-Control.
+    """
+    config = load_upload_config()
+    if bucket == config['production_bucket']:
+        return {'public': config['public_access_production'],
+                'cache_control': config['cache_control_production']}
+    if bucket == config['cold_storage_bucket']:
+        return {'public': config['public_access_cold'],
+                'cache_control': config['cache_control_cold']}
+    return {'public': False, 'cache_control': ''}
+
+def get_upload_extra_args(bucket, local_path, make_public=False):
+    """
+    Build ExtraArgs for an upload so ACL and metadata are set in the initial PUT.
+
+    make_public sets the ACL when True or False; None applies the bucket
+    policy. Content-Type is guessed from the file extension.
+    """
+    policy = get_bucket_policy(bucket)
+    public = policy['public'] if make_public is None else make_public
+
+    extra_args = {'ACL': 'public-read' if public else 'private'}
+
+    content_type, _ = mimetypes.guess_type(local_path)
+    if content_type:
+        extra_args['ContentType'] = content_type
+    if policy['cache_control']:
+        extra_args['CacheControl'] = policy['cache_control']
+
+    return extra_args
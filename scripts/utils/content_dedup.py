@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Find byte-identical objects regardless of their UUID folder or filename.
+
+Objects are sorted on disk by (Size, ETag) so only objects of equal size
+are ever compared, in bounded memory. A single-part ETag is the MD5 of the
+content, and two objects with the same size and the same ETag (single-part
+or multipart with the same parts) hold the same bytes, so those groups need
+no reads at all.
+
+The same content uploaded once whole and once in parts (or with another
+part size) gets a different ETag. With cross_etag, a same-size group whose
+ETags differ and include a multipart one is resolved by reading: one
+representative per ETag has its first and last SAMPLE_BYTES compared
+(ranged GETs), and only ETags whose samples still match are streamed to
+get their content MD5. Single-part ETags are already content MD5s and are
+never downloaded.
+
+Identical bytes under another UUID folder or filename are still another
+asset, so split_by_asset() separates copies of one asset (safe to remove)
+from groups that span several assets (for review only).
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import groupby
+
+from utils.external_sort import DEFAULT_RUN_SIZE, ExternalSorter
+from utils.key_parser import parse_key
+
+# Head and tail bytes read to rule out same-size candidates cheaply
+SAMPLE_BYTES = 64 * 1024
+
+# Streaming chunk for full-content MD5s
+STREAM_CHUNK = 1024 * 1024
+
+DEFAULT_WORKERS = 8
+
+MULTIPART_ETAG = re.compile(r'^[0-9a-f]{32}-\d+$')
+
+# Sizes are zero-padded so the run files sort numerically
+SIZE_DIGITS = 15
+
+def is_multipart_etag(etag):
+    return MULTIPART_ETAG.match(etag) is not None
+
+def sort_by_content(objects, min_size=1, run_size=DEFAULT_RUN_SIZE):
+    """
+    Spill (size, etag, batch, key) records of every object of at least
+    min_size bytes into a sorter. Folder markers are skipped.
+    Returns (sorter, per-batch object counts, objects seen).
+    """
+    sorter = ExternalSorter(run_size)
+    batch_counts = defaultdict(int)
+    total = 0
+    for obj in objects:
+        key = obj['Key']
+        if key.endswith('/'):
+            continue
+        total += 1
+        if total % 10000 == 0:
+            print(f"Processed {total:,} objects...")
+
+        batch = parse_key(key).batch or ''
+        if batch:
+            batch_counts[batch] += 1
+        size = obj.get('Size') or 0
+        if size < min_size:
+            continue
+        etag = (obj.get('ETag') or '').strip('"').lower()
+        sorter.add((f"{size:0{SIZE_DIGITS}d}", etag, batch, key))
+    return sorter, batch_counts, total
+
+def iter_size_groups(sorter):
+    """Yield (size, {etag: [(batch, key), ...]}) for every size shared by two or more objects."""
+    for size, records in groupby(sorter.sorted(), key=lambda r: r[0]):
+        variants = {}
+        for etag, etag_records in groupby(records, key=lambda r: r[1]):
+            variants[etag] = [(batch, key) for _, _, batch, key in etag_records]
+        if len(variants) > 1 or len(next(iter(variants.values()))) > 1:
+            yield int(size), variants
+
+def needs_confirmation(variants):
+    """True if ETags differ only in a way the content could still be equal (a multipart ETag is involved)."""
+    etags = [etag for etag in variants if etag]
+    return len(etags) > 1 and any(is_multipart_etag(etag) for etag in etags)
+
+def sample_digest(client, bucket, key, size):
+    """MD5 of the first and last SAMPLE_BYTES; the whole object's MD5 when it is that small."""
+    if size <= 2 * SAMPLE_BYTES:
+        return hashlib.md5(client.get_object(Bucket=bucket, Key=key)['Body'].read()).hexdigest()
+    digest = hashlib.md5()
+    digest.update(client.get_object(Bucket=bucket, Key=key, Range=f'bytes=0-{SAMPLE_BYTES - 1}')['Body'].read())
+    digest.update(client.get_object(Bucket=bucket, Key=key, Range=f'bytes=-{SAMPLE_BYTES}')['Body'].read())
+    return digest.hexdigest()
+
+def content_md5(client, bucket, key):
+    """MD5 of the full object, streamed."""
+    digest = hashlib.md5()
+    body = client.get_object(Bucket=bucket, Key=key)['Body']
+    for chunk in body.iter_chunks(STREAM_CHUNK):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def confirm_size_group(client, bucket, size, variants):
+    """
+    Work out which ETag variants of one size hold the same content.
+    Returns ([(content id, [etags])] with two or more etags, bytes read).
+    """
+    bytes_read = 0
+    etags = [etag for etag in variants if etag]
+
+    # Ranged reads rule out most candidates without downloading them
+    by_sample = defaultdict(list)
+    for etag in etags:
+        _, key = variants[etag][0]
+        by_sample[sample_digest(client, bucket, key, size)].append(etag)
+        bytes_read += min(size, 2 * SAMPLE_BYTES)
+
+    merged = []
+    for sample, sample_etags in by_sample.items():
+        if len(sample_etags) < 2:
+            continue
+        if size <= 2 * SAMPLE_BYTES:
+            # The sample was the whole object
+            merged.append((sample, sample_etags))
+            continue
+
+        by_md5 = defaultdict(list)
+        for etag in sample_etags:
+            if is_multipart_etag(etag):
+                _, key = variants[etag][0]
+                by_md5[content_md5(client, bucket, key)].append(etag)
+                bytes_read += size
+            else:
+                # A single-part ETag is the content MD5
+                by_md5[etag].append(etag)
+        merged.extend((md5, md5_etags) for md5, md5_etags in by_md5.items() if len(md5_etags) > 1)
+
+    return merged, bytes_read
+
+def find_content_duplicates(objects, client=None, bucket=None, cross_etag=False, min_size=1,
+                            workers=DEFAULT_WORKERS, run_size=DEFAULT_RUN_SIZE):
+    """
+    Group objects with identical content.
+
+    Returns (duplicates, batch_counts, stats) where duplicates maps a content
+    id ('<size>:<etag or md5>') to [{'full_key', 'batch'}, ...] in the shape
+    find_wasabi_duplicates.analyze_duplicates() expects.
+    """
+    stats = {'objects': 0, 'same_etag_groups': 0, 'confirmed_groups': 0, 'bytes_read': 0, 'duplicate_bytes': 0}
+    duplicates = {}
+    to_confirm = []
+
+    sorter, batch_counts, stats['objects'] = sort_by_content(objects, min_size, run_size)
+    try:
+        for size, variants in iter_size_groups(sorter):
+            if cross_etag and needs_confirmation(variants):
+                to_confirm.append((size, variants))
+                continue
+            for etag, paths in variants.items():
+                # Objects without an ETag cannot be matched from the listing
+                if etag and len(paths) > 1:
+                    duplicates[f"{size}:{etag}"] = [{'full_key': key, 'batch': batch} for batch, key in paths]
+                    stats['same_etag_groups'] += 1
+                    stats['duplicate_bytes'] += size * (len(paths) - 1)
+    finally:
+        sorter.cleanup()
+
+    if to_confirm:
+        print(f"Confirming {len(to_confirm):,} same-size groups with differing ETags using {workers} workers...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(confirm_size_group, client, bucket, size, variants): (size, variants)
+                for size, variants in to_confirm
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                size, variants = futures[future]
+                try:
+                    merged, bytes_read = future.result()
+                except Exception as e:
+                    print(f"Error confirming {size:,}-byte group: {e}")
+                    merged, bytes_read = [], 0
+                stats['bytes_read'] += bytes_read
+
+                merged_etags = set()
+                for content_id, etags in merged:
+                    paths = [path for etag in etags for path in variants[etag]]
+                    duplicates[f"{size}:{content_id}"] = [{'full_key': key, 'batch': batch} for batch, key in paths]
+                    merged_etags.update(etags)
+                    stats['confirmed_groups'] += 1
+                    stats['duplicate_bytes'] += size * (len(paths) - 1)
+
+                # ETags that matched nothing else still group their own copies
+                for etag, paths in variants.items():
+                    if etag and etag not in merged_etags and len(paths) > 1:
+                        duplicates[f"{size}:{etag}"] = [{'full_key': key, 'batch': batch} for batch, key in paths]
+                        stats['same_etag_groups'] += 1
+                        stats['duplicate_bytes'] += size * (len(paths) - 1)
+
+                if done % 100 == 0 or done == len(futures):
+                    print(f"Confirmed {done:,}/{len(futures):,} groups")
+
+    return duplicates, batch_counts, stats
+
+def asset_identity(key):
+    """
+    (normalized UUID, stripped filename) of the asset a key holds, the form
+    AssetSet and the inventory compare on; the key itself outside UUID folders.
+    Filenames keep their case, so Photo.JPG and photo.jpg are separate assets.
+    """
+    parts = parse_key(key)
+    if not parts.uuid_norm or not parts.filename:
+        return key
+    return parts.uuid_norm, parts.filename.strip()
+
+def split_by_asset(duplicates):
+    """
+    Split find_content_duplicates() groups by the asset each copy belongs to.
+
+    Returns (same_asset, cross_asset): same_asset maps (content id, asset)
+    to two or more copies of that one asset; cross_asset maps a content id
+    to its per-asset path lists when the bytes are shared by several assets.
+    """
+    same_asset = {}
+    cross_asset = {}
+    for content_id, paths in duplicates.items():
+        by_asset = defaultdict(list)
+        for path in paths:
+            by_asset[asset_identity(path['full_key'])].append(path)
+        for identity, asset_paths in by_asset.items():
+            if len(asset_paths) > 1:
+                same_asset[(content_id, identity)] = asset_paths
+        if len(by_asset) > 1:
+            cross_asset[content_id] = list(by_asset.values())
+    return same_asset, cross_asset
+
+def content_size(content_id):
+    """Object size encoded in a content id ('<size>:<etag or md5>')."""
+    return int(content_id.split(':', 1)[0])
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Concurrent server-side copy engine.
+
+Runs a plan of (source, destination) copies inside one bucket with a pool
+of workers. Objects above a size threshold are copied with multipart
+upload_part_copy so no single request has to move the whole object;
+smaller ones use copy_object. Part copies of every worker share one part
+pool, so a run makes at most workers + part_threads requests at a time.
+
+Destinations that already hold the same size and ETag are skipped. A
+multipart copy gets a '-N' ETag of its own, so it records the source ETag
+in its metadata and that is compared instead. Every result is appended to
+a CSV log that a re-run reads back to skip work that already finished.
+"""
+
+import csv
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+from utils.multipart import choose_part_size
+
+DEFAULT_WORKERS = 16
+
+# copy_object handles up to 5 GB, but splitting large objects keeps requests short
+MULTIPART_COPY_THRESHOLD = 512 * 1024 * 1024
+MULTIPART_COPY_PART_SIZE = 128 * 1024 * 1024
+
+# Part copies in flight across all workers
+DEFAULT_PART_THREADS = 8
+
+# Metadata key holding the source ETag on multipart copies
+SOURCE_ETAG_KEY = 'source-etag'
+
+LOG_FIELDS = ['timestamp', 'source', 'destination', 'status', 'error']
+
+# Statuses that mean the copy does not have to be repeated
+DONE_STATUSES = {'copied', 'skipped'}
+
+def load_copy_log(log_file):
+    """Return the set of (source, destination) pairs a previous run finished."""
+    done = set()
+    if not os.path.exists(log_file):
+        return done
+    with open(log_file, newline='') as f:
+        for row in csv.DictReader(f):
+            if row.get('status') in DONE_STATUSES:
+                done.add((row['source'], row['destination']))
+    return done
+
+def head_or_none(s3_client, bucket, key):
+    try:
+        return s3_client.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+
+def pool_connections(workers, part_threads=DEFAULT_PART_THREADS):
+    """Connection pool size a client needs for run_copy_plan with these settings."""
+    return max(workers + part_threads, 50)
+
+def multipart_copy(s3_client, bucket, source, destination, size, part_size=MULTIPART_COPY_PART_SIZE,
+                   executor=None, threads=4):
+    """
+    Copy a large object with upload_part_copy, keeping its content headers and
+    metadata and recording the source ETag under SOURCE_ETAG_KEY.
+
+    Parts run on executor when given (shared across copies), otherwise on a
+    pool of threads for this copy alone.
+    """
+    source_head = s3_client.head_object(Bucket=bucket, Key=source)
+    metadata = dict(source_head.get('Metadata', {}))
+    metadata[SOURCE_ETAG_KEY] = source_head['ETag'].strip('"')
+    extra_args = {'Metadata': metadata}
+    for header in ('ContentType', 'CacheControl', 'ContentDisposition', 'ContentEncoding', 'ContentLanguage'):
+        if source_head.get(header):
+            extra_args[header] = source_head[header]
+
+    part_size = choose_part_size(size, part_size)
+    total_parts = max(1, math.ceil(size / part_size))
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=destination, **extra_args)['UploadId']
+
+    def copy_part(part_number):
+        start = (part_number - 1) * part_size
+        end = min(start + part_size, size) - 1
+        response = s3_client.upload_part_copy(
+            Bucket=bucket,
+            Key=destination,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            CopySource={'Bucket': bucket, 'Key': source},
+            CopySourceRange=f'bytes={start}-{end}'
+        )
+        return {'PartNumber': part_number, 'ETag': response['CopyPartResult']['ETag']}
+
+    try:
+        if executor is not None:
+            parts = list(executor.map(copy_part, range(1, total_parts + 1)))
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as part_executor:
+                parts = list(part_executor.map(copy_part, range(1, total_parts + 1)))
+        s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=destination,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+    except Exception:
+        # Do not leave a billable incomplete upload behind
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=destination, UploadId=upload_id)
+        raise
+
+def is_same_copy(existing, size, etag):
+    """True if a destination head shows a finished copy of a source with this size and ETag."""
+    if existing is None or existing['ContentLength'] != size:
+        return False
+    return etag in (existing['ETag'].strip('"'), existing.get('Metadata', {}).get(SOURCE_ETAG_KEY))
+
+def copy_one(s3_client, bucket, item, threshold=MULTIPART_COPY_THRESHOLD, skip_existing=True,
+             part_executor=None):
+    """
+    Copy one plan item ({'source', 'destination', 'size', 'etag'}).
+
+    Returns (item, status, error) with status 'copied', 'skipped' or 'error'.
+    """
+    source, destination = item['source'], item['destination']
+    try:
+        size = item.get('size')
+        etag = item.get('etag')
+        if size in (None, '') or not etag:
+            head = s3_client.head_object(Bucket=bucket, Key=source)
+            size, etag = head['ContentLength'], head['ETag'].strip('"')
+        size = int(size)
+
+        if skip_existing:
+            if is_same_copy(head_or_none(s3_client, bucket, destination), size, etag):
+                return item, 'skipped', None
+
+        if size > threshold:
+            multipart_copy(s3_client, bucket, source, destination, size, executor=part_executor)
+        else:
+            s3_client.copy_object(
+                Bucket=bucket,
+                Key=destination,
+                CopySource={'Bucket': bucket, 'Key': source}
+            )
+        return item, 'copied', None
+    except Exception as e:
+        return item, 'error', str(e)
+
+def run_copy_plan(s3_client, bucket, plan, log_file, workers=DEFAULT_WORKERS,
+                  threshold=MULTIPART_COPY_THRESHOLD, skip_existing=True, part_threads=DEFAULT_PART_THREADS):
+    """
+    Execute a copy plan concurrently, appending each result to log_file.
+
+    s3_client should have at least pool_connections(workers, part_threads)
+    connections. Pairs the log already records as copied or skipped are not retried.
+    Returns (counts, errors) where errors is a list of {'file', 'error'}.
+    """
+    done = load_copy_log(log_file)
+    counts = {'copied': 0, 'skipped': 0, 'error': 0, 'already_done': 0}
+    errors = []
+    start_time = time.time()
+    processed = 0
+
+    write_header = not os.path.exists(log_file) or os.path.getsize(log_file) == 0
+    os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+
+    with open(log_file, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=LOG_FIELDS)
+        if write_header:
+            writer.writeheader()
+
+        def handle(future):
+            nonlocal processed
+            item, status, error = future.result()
+            counts[status] += 1
+            processed += 1
+            writer.writerow({
+                'timestamp': datetime.now().isoformat(),
+                'source': item['source'],
+                'destination': item['destination'],
+                'status': status,
+                'error': error or ''
+            })
+            # Flush per row so the log is usable for resuming after a crash
+            f.flush()
+
+            if status == 'copied':
+                print(f"File {item['source']} copied to {item['destination']}")
+            elif status == 'error':
+                print(f"Error copying {item['source']}: {error}")
+                errors.append({'file': item['source'], 'error': error})
+
+            if processed % 100 == 0:
+                elapsed = time.time() - start_time
+                print(f"Progress: {processed} copies - {processed / elapsed if elapsed > 0 else 0:.1f} objects/sec")
+
+        # Workers only wait on this pool, so it cannot deadlock
+        with ThreadPoolExecutor(max_workers=part_threads) as part_executor, \
+                ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = set()
+            for item in plan:
+                if (item['source'], item['destination']) in done:
+                    counts['already_done'] += 1
+                    continue
+
+                in_flight.add(executor.submit(copy_one, s3_client, bucket, item, threshold, skip_existing,
+                                              part_executor))
+                if len(in_flight) >= workers * 4:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        handle(future)
+
+            for future in as_completed(in_flight):
+                handle(future)
+
+    return counts, errors
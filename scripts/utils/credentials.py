@@ -2,37 +2,55 @@
 """
 Secure credential management for Wasabi operations.
 Loads credentials from environment variables or .env file.
+
+Clients are cached per process: every script that calls get_s3_client()
+shares one connection-pooled client per bucket/endpoint/profile, so
+multi-threaded callers reuse open connections instead of paying for a new
+TLS handshake on each request.
 """
 
 import os
+import threading
 from pathlib import Path
 import boto3
+from botocore.config import Config
+
+# Process-wide client registry, guarded by a lock so worker threads can
+# request clients concurrently. boto3 clients are thread-safe; resources are
+# not, so resources are cached per thread instead.
+_client_cache = {}
+_client_lock = threading.Lock()
+_resource_cache = threading.local()
+_env_loaded = False
+
+def _read_env_file(env_path):
+    """Copy KEY=VALUE lines from an env file into os.environ."""
+    with open(env_path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '=' in line:
+                key, value = line.split('=', 1)
+                os.environ[key] = value
+
+def load_env_file(force=False):
+    """Load .env file if it exists (only once per process unless forced)."""
+    global _env_loaded
+    if _env_loaded and not force:
+        return
+    _env_loaded = True
 
-def load_env_file():
-    """Load .env file if it exists."""
     # Start from the script location and go up to find .env
-    script_dir = Path(__file__).parent
-    for i in range(4):  # Look up to 4 levels up
-        env_path = script_dir / ('..' * i) / '.env'
-        env_path = env_path.resolve()
+    script_dir = Path(__file__).resolve().parent
+    for parent in [script_dir, *script_dir.parents][:4]:  # Look up to 4 levels up
+        env_path = parent / '.env'
         if env_path.exists():
-            with open(env_path) as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        os.environ[key] = value
+            _read_env_file(env_path)
             return
-    
+
     # Also try current working directory
     env_path = Path('.env')
     if env_path.exists():
-        with open(env_path) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key] = value
+        _read_env_file(env_path)
 
 def get_wasabi_credentials():
     """
@@ -41,20 +59,20 @@ def get_wasabi_credentials():
     """
     # Try to load from .env file first
     load_env_file()
-    
+
     # Get credentials from environment
     access_key = os.getenv('WASABI_ACCESS_KEY')
     secret_key = os.getenv('WASABI_SECRET_KEY')
     region = os.getenv('WASABI_REGION', 'us-central-1')
     endpoint = os.getenv('WASABI_ENDPOINT', 'https://s3.us-central-1.wasabisys.com')
     bucket = os.getenv('WASABI_BUCKET', 'bestreviews.com')
-    
+
     if not access_key or not secret_key:
         raise ValueError(
             "Wasabi credentials not found. Please set WASABI_ACCESS_KEY and WASABI_SECRET_KEY "
             "environment variables or create a .env file with these values."
         )
-    
+
     return {
         'access_key': access_key,
         'secret_key': secret_key,
@@ -63,24 +81,94 @@ def get_wasabi_credentials():
         'bucket': bucket
     }
 
-def get_s3_client():
-    """Create and return a configured S3 client for Wasabi."""
-    creds = get_wasabi_credentials()
-    
-    return boto3.client('s3',
-        aws_access_key_id=creds['access_key'],
-        aws_secret_access_key=creds['secret_key'],
-        region_name=creds['region'],
-        endpoint_url=creds['endpoint']
+def get_client_config(max_pool_connections=None):
+    """
+    Build the botocore Config shared by all Wasabi clients.
+
+    Pool size, timeouts and retry behaviour can be tuned through the
+    environment (see .env.template) without touching the scripts.
+    """
+    load_env_file()
+
+    if max_pool_connections is None:
+        max_pool_connections = int(os.getenv('WASABI_MAX_POOL_CONNECTIONS', '50'))
+
+    return Config(
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=os.getenv('WASABI_TCP_KEEPALIVE', 'true').lower() == 'true',
+        connect_timeout=float(os.getenv('WASABI_CONNECT_TIMEOUT', '10')),
+        read_timeout=float(os.getenv('WASABI_READ_TIMEOUT', '60')),
+        retries={
+            'mode': os.getenv('WASABI_RETRY_MODE', 'adaptive'),
+            'max_attempts': int(os.getenv('WASABI_MAX_ATTEMPTS', '10'))
+        }
     )
 
-def get_s3_resource():
-    """Create and return a configured S3 resource for Wasabi."""
+def _client_kwargs(creds, endpoint=None, profile=None, max_pool_connections=None):
+    """Arguments shared by boto3 client() and resource() construction."""
+    kwargs = {
+        'region_name': creds['region'],
+        'endpoint_url': endpoint or creds['endpoint'],
+        'config': get_client_config(max_pool_connections)
+    }
+    # A named profile supplies its own keys from ~/.aws/credentials
+    if not profile:
+        kwargs['aws_access_key_id'] = creds['access_key']
+        kwargs['aws_secret_access_key'] = creds['secret_key']
+    return kwargs
+
+def _cache_key(creds, bucket=None, endpoint=None, profile=None, max_pool_connections=None):
+    return (
+        bucket or creds['bucket'],
+        endpoint or creds['endpoint'],
+        profile,
+        max_pool_connections
+    )
+
+def get_s3_client(bucket=None, endpoint=None, profile=None, max_pool_connections=None):
+    """
+    Return a cached, connection-pooled S3 client for Wasabi.
+
+    Clients are keyed by bucket/endpoint/profile (and pool size when one is
+    given explicitly), so repeated calls - including from worker threads -
+    return the same client and share its connection pool.
+    """
+    creds = get_wasabi_credentials()
+    key = _cache_key(creds, bucket, endpoint, profile, max_pool_connections)
+
+    with _client_lock:
+        client = _client_cache.get(key)
+        if client is None:
+            session = boto3.session.Session(profile_name=profile)
+            client = session.client('s3', **_client_kwargs(creds, endpoint, profile, max_pool_connections))
+            _client_cache[key] = client
+
+    return client
+
+def get_s3_resource(bucket=None, endpoint=None, profile=None, max_pool_connections=None):
+    """
+    Return a cached S3 resource for Wasabi.
+
+    boto3 resources are not thread-safe, so each thread gets its own
+    resource; within a thread repeated calls reuse the same one.
+    """
     creds = get_wasabi_credentials()
-    
-    return boto3.resource('s3',
-        aws_access_key_id=creds['access_key'],
-        aws_secret_access_key=creds['secret_key'],
-        region_name=creds['region'],
-        endpoint_url=creds['endpoint']
-    )
\ No newline at end of file
+    key = _cache_key(creds, bucket, endpoint, profile, max_pool_connections)
+
+    resources = getattr(_resource_cache, 'resources', None)
+    if resources is None:
+        resources = _resource_cache.resources = {}
+
+    resource = resources.get(key)
+    if resource is None:
+        session = boto3.session.Session(profile_name=profile)
+        resource = session.resource('s3', **_client_kwargs(creds, endpoint, profile, max_pool_connections))
+        resources[key] = resource
+
+    return resource
+
+def clear_client_cache():
+    """Drop all cached clients (e.g. after rotating credentials)."""
+    with _client_lock:
+        _client_cache.clear()
+    _resource_cache.resources = {}
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Crash-safe journal for bulk deletions.
+
+Every completed delete_objects batch is appended to a JSON Lines file and
+fsynced before the next result is handled, so an interrupted run can be
+restarted with the same journal and only re-send keys that were never
+confirmed deleted.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+class DeletionJournal:
+    """
+    Append-only JSONL journal of deleted and failed keys.
+
+    The first line records the bucket; each following line is one batch:
+    {"time": ..., "deleted": [...], "failed": {key: error}}. A key that
+    failed in one batch and was deleted by a later one counts as deleted.
+    A truncated last line (crash mid-write) is ignored.
+    """
+
+    def __init__(self, path, bucket):
+        self.path = str(path)
+        self.bucket = bucket
+        self.deleted = set()
+        self.failed = {}
+        self.batches = 0
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._append({'bucket': bucket, 'created': datetime.now().isoformat()})
+
+    def _load(self):
+        with open(self.path) as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    print(f"Ignoring unreadable journal line {line_number} in {self.path}")
+                    continue
+
+                if 'bucket' in record:
+                    if record['bucket'] != self.bucket:
+                        raise ValueError(f"Journal {self.path} belongs to bucket '{record['bucket']}', "
+                                         f"not '{self.bucket}'")
+                    continue
+
+                self.batches += 1
+                self.deleted.update(record.get('deleted', []))
+                self.failed.update(record.get('failed', {}))
+
+        for key in self.deleted:
+            self.failed.pop(key, None)
+
+        # Terminate a half-written last line so new records start on their own line
+        with open(self.path, 'rb+') as f:
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+
+    def _append(self, record):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_batch(self, deleted_keys, errors):
+        """Checkpoint one batch: deleted_keys is a list, errors a list of (key, message)."""
+        with self._lock:
+            failed = dict(errors)
+            self._append({
+                'time': datetime.now().isoformat(),
+                'deleted': list(deleted_keys),
+                'failed': failed
+            })
+            self.batches += 1
+            self.deleted.update(deleted_keys)
+            for key in deleted_keys:
+                self.failed.pop(key, None)
+            self.failed.update(failed)
+
+    def pending(self, keys):
+        """Yield the keys from an iterable that are not yet recorded as deleted."""
+        for key in keys:
+            if key not in self.deleted:
+                yield key
+
+    def failed_keys(self):
+        """Keys whose last recorded attempt failed, in key order."""
+        return sorted(self.failed)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+External (disk-backed) sorting of string tuples.
+
+Records are buffered up to run_size, sorted and spilled to temporary CSV
+run files; sorted() then k-way merges the runs with heapq.merge. Memory
+use is bounded by run_size no matter how many records are added.
+"""
+
+import csv
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+
+DEFAULT_RUN_SIZE = 500000
+
+# Keys and paths can be long; lift the csv module's 128 KB field limit
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+def read_run(path):
+    """Yield the records of one run file as tuples."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            yield tuple(row)
+
+class ExternalSorter:
+    """
+    Sort an arbitrary number of records (tuples of strings) in bounded memory.
+
+    Use as a context manager so the temporary run files are removed.
+    """
+
+    def __init__(self, run_size=DEFAULT_RUN_SIZE, key=None, tmp_dir=None):
+        self.run_size = run_size
+        self.key = key
+        self.count = 0
+        self.runs = []
+        self._buffer = []
+        self._tmp_dir = tempfile.mkdtemp(prefix='external_sort_', dir=tmp_dir)
+
+    def add(self, record):
+        self._buffer.append(record)
+        self.count += 1
+        if len(self._buffer) >= self.run_size:
+            self._spill()
+
+    def flush(self):
+        """Spill the buffered records to a run file now, freeing their memory."""
+        self._spill()
+
+    def _spill(self):
+        if not self._buffer:
+            return
+        self._buffer.sort(key=self.key)
+        path = os.path.join(self._tmp_dir, f'run_{len(self.runs):05d}.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(self._buffer)
+        self.runs.append(path)
+        self._buffer = []
+
+    def sorted(self):
+        """Yield every record added so far in sorted order."""
+        if not self.runs:
+            # Everything fit in memory: no disk round trip needed
+            self._buffer.sort(key=self.key)
+            yield from (tuple(record) for record in self._buffer)
+            return
+
+        self._spill()
+        yield from heapq.merge(*(read_run(path) for path in self.runs), key=self.key)
+
+    def cleanup(self):
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        self._buffer = []
+        self.runs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
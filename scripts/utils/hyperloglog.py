@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+HyperLogLog distinct counter.
+
+Estimates the number of distinct values seen in a fixed amount of memory
+(2**precision one-byte registers; 16 KB at the default precision, with a
+typical error around 0.8%). Used where an exact set of every UUID or
+filename would not fit in memory.
+"""
+
+import hashlib
+import math
+
+class HyperLogLog:
+    """Approximate distinct counter supporting add(), len() and merge()."""
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+
+        if self.num_registers >= 128:
+            self.alpha = 0.7213 / (1 + 1.079 / self.num_registers)
+        else:
+            self.alpha = {16: 0.673, 32: 0.697, 64: 0.709}[self.num_registers]
+
+    def add(self, value):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        elif isinstance(value, int):
+            value = value.to_bytes(16, 'big', signed=False)
+        hashed = int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        # Position of the leftmost 1-bit in the remaining bits (1-based)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        estimate = self.alpha * self.num_registers ** 2 / sum(2.0 ** -r for r in self.registers)
+
+        # Small-range correction (linear counting)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.num_registers and zeros:
+            estimate = self.num_registers * math.log(self.num_registers / zeros)
+
+        return int(round(estimate))
+
+    def __len__(self):
+        return self.count()
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLogs with different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
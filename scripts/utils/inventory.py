@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Local bucket inventory shared by all scripts.
+
+A SQLite database (data/inventory/bucket_inventory.db) holds one row per
+object with Key, Size, ETag, LastModified and the batch/UUID/filename
+parsed from the key. Each build or refresh is recorded as a snapshot with
+an id and timestamps, so tools can query the inventory instead of paging
+through list_objects_v2 again.
+
+An existing snapshot can be refreshed shard by shard (br_assets/BatchNN/xx/):
+only shards whose object count, newest LastModified or total size differ
+from the local copy have their inserts and deletes applied.
+
+Filenames are indexed both as-is and case-folded, so basename lookups
+(find_asset.py) are index probes instead of bucket walks.
+"""
+
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from utils.config import PROJECT_ROOT
+from utils.listing import DEFAULT_WORKERS, discover_shards, list_prefix
+from utils.key_parser import parse_key
+
+INVENTORY_DB = PROJECT_ROOT / 'data' / 'inventory' / 'bucket_inventory.db'
+
+# Rows are written in batches to keep inserts fast on large listings
+INSERT_BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bucket TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    completed_at TEXT,
+    object_count INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS objects (
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    size INTEGER,
+    etag TEXT,
+    last_modified TEXT,
+    batch TEXT,
+    uuid TEXT,
+    uuid_norm TEXT,
+    filename TEXT,
+    filename_fold TEXT,
+    snapshot_id INTEGER,
+    PRIMARY KEY (bucket, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_objects_filename ON objects (bucket, filename);
+CREATE INDEX IF NOT EXISTS idx_objects_uuid ON objects (bucket, uuid_norm, filename);
+CREATE INDEX IF NOT EXISTS idx_objects_batch ON objects (bucket, batch);
+"""
+
+# Created after migrations so older databases get the column first
+INDEX_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_objects_filename_fold ON objects (bucket, filename_fold);
+"""
+
+def fold_filename(filename):
+    """Case-folded form of a filename used for case-insensitive lookups."""
+    return filename.casefold() if filename else None
+
+def _migrate(conn):
+    """Bring databases created by older versions up to the current schema."""
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(objects)')}
+    if 'filename_fold' not in columns:
+        print("Upgrading inventory: adding case-folded filename index...")
+        conn.execute('ALTER TABLE objects ADD COLUMN filename_fold TEXT')
+        conn.create_function('fold_filename', 1, fold_filename, deterministic=True)
+        conn.execute('UPDATE objects SET filename_fold = fold_filename(filename)')
+        conn.commit()
+
+def open_inventory(db_path=INVENTORY_DB):
+    """Open (and create if needed) the inventory database."""
+    db_path = str(db_path)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    _migrate(conn)
+    conn.executescript(INDEX_SCHEMA)
+    return conn
+
+def inventory_exists(db_path=INVENTORY_DB):
+    return os.path.exists(str(db_path))
+
+def prefix_range(prefix):
+    """Return (low, high) bounds so that key >= low AND key < high matches the prefix."""
+    return prefix, prefix + '\U0010ffff'
+
+def _object_row(bucket, obj, snapshot_id):
+    key = obj['Key']
+    batch, _, uuid, uuid_norm, filename = parse_key(key)
+    last_modified = obj.get('LastModified')
+    if isinstance(last_modified, datetime):
+        last_modified = last_modified.isoformat()
+    return (
+        bucket, key, obj.get('Size'), (obj.get('ETag') or '').strip('"'), last_modified,
+        batch, uuid, uuid_norm, filename, fold_filename(filename), snapshot_id
+    )
+
+def start_snapshot(conn, bucket, prefix, kind):
+    cursor = conn.execute(
+        'INSERT INTO snapshots (bucket, prefix, kind, started_at) VALUES (?, ?, ?, ?)',
+        (bucket, prefix, kind, datetime.now().isoformat())
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+def complete_snapshot(conn, snapshot_id, object_count):
+    conn.execute(
+        'UPDATE snapshots SET completed_at = ?, object_count = ? WHERE id = ?',
+        (datetime.now().isoformat(), object_count, snapshot_id)
+    )
+    conn.commit()
+
+def upsert_objects(conn, bucket, objects, snapshot_id):
+    """Insert or update a batch of listing entries."""
+    # Updating in place (rather than INSERT OR REPLACE) keeps each key's rowid,
+    # so the trigram postings of unchanged objects stay valid across snapshots
+    conn.executemany(
+        'INSERT INTO objects '
+        '(bucket, key, size, etag, last_modified, batch, uuid, uuid_norm, filename, filename_fold, snapshot_id) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT (bucket, key) DO UPDATE SET size = excluded.size, etag = excluded.etag, '
+        'last_modified = excluded.last_modified, batch = excluded.batch, uuid = excluded.uuid, '
+        'uuid_norm = excluded.uuid_norm, filename = excluded.filename, filename_fold = excluded.filename_fold, '
+        'snapshot_id = excluded.snapshot_id',
+        [_object_row(bucket, obj, snapshot_id) for obj in objects]
+    )
+
+def build_snapshot(conn, bucket, objects, prefix=''):
+    """
+    Record a full listing of a prefix as a new snapshot.
+
+    objects is any iterable of list_objects_v2 entries. Rows under the
+    prefix that were not seen in this listing are removed once the listing
+    completes. Returns the snapshot id.
+    """
+    snapshot_id = start_snapshot(conn, bucket, prefix, 'full')
+    batch = []
+    count = 0
+
+    for obj in objects:
+        batch.append(obj)
+        count += 1
+        if len(batch) >= INSERT_BATCH_SIZE:
+            upsert_objects(conn, bucket, batch, snapshot_id)
+            conn.commit()
+            batch = []
+            print(f"Inventoried {count:,} objects...")
+
+    if batch:
+        upsert_objects(conn, bucket, batch, snapshot_id)
+
+    low, high = prefix_range(prefix)
+    deleted = conn.execute(
+        'DELETE FROM objects WHERE bucket = ? AND key >= ? AND key < ? AND snapshot_id != ?',
+        (bucket, low, high, snapshot_id)
+    ).rowcount
+    complete_snapshot(conn, snapshot_id, count)
+
+    print(f"Snapshot {snapshot_id}: {count:,} objects under '{prefix}' ({deleted:,} removed since last snapshot)")
+    return snapshot_id
+
+def shard_prefix(key, depth):
+    """Return the first `depth` path segments of a key as a prefix, or None if the key sits above that level."""
+    parts = key.split('/')
+    if len(parts) <= depth:
+        return None
+    return '/'.join(parts[:depth]) + '/'
+
+def _fingerprint(entries):
+    """(count, newest LastModified, total size) for a list of listing entries or rows."""
+    if not entries:
+        return (0, None, 0)
+    return (
+        len(entries),
+        max(entry[2] or '' for entry in entries),
+        sum(entry[1] or 0 for entry in entries)
+    )
+
+def _listing_rows(entries):
+    rows = {}
+    for obj in entries:
+        last_modified = obj.get('LastModified')
+        if isinstance(last_modified, datetime):
+            last_modified = last_modified.isoformat()
+        rows[obj['Key']] = ((obj.get('ETag') or '').strip('"'), obj.get('Size'), last_modified)
+    return rows
+
+def _local_rows(conn, bucket, low, high):
+    cursor = conn.execute(
+        'SELECT key, etag, size, last_modified FROM objects WHERE bucket = ? AND key >= ? AND key < ?',
+        (bucket, low, high)
+    )
+    return {row['key']: (row['etag'], row['size'], row['last_modified']) for row in cursor}
+
+def apply_delta(conn, bucket, remote_entries, local_rows, snapshot_id):
+    """Bring local rows in line with a remote listing. Returns (inserted, updated, deleted)."""
+    remote_rows = _listing_rows(remote_entries)
+    inserted = [key for key in remote_rows if key not in local_rows]
+    updated = [key for key in remote_rows if key in local_rows and remote_rows[key] != local_rows[key]]
+    deleted = [key for key in local_rows if key not in remote_rows]
+
+    changed = set(inserted) | set(updated)
+    if changed:
+        upsert_objects(conn, bucket, [obj for obj in remote_entries if obj['Key'] in changed], snapshot_id)
+    if deleted:
+        conn.executemany('DELETE FROM objects WHERE bucket = ? AND key = ?', [(bucket, key) for key in deleted])
+
+    return len(inserted), len(updated), len(deleted)
+
+def refresh_snapshot(conn, client, bucket, prefix='br_assets/', depth=3, workers=DEFAULT_WORKERS):
+    """
+    Incrementally refresh the inventory under a prefix.
+
+    Shards are discovered with delimiter listings; shards that vanished are
+    dropped, and the remaining shards are listed concurrently and compared
+    to the local rows by (count, newest LastModified, total size). Only
+    shards that differ get a delta applied.
+    Returns the snapshot id.
+    """
+    if not prefix.endswith('/'):
+        raise ValueError("refresh prefix must end with '/'")
+
+    snapshot_id = start_snapshot(conn, bucket, prefix, 'refresh')
+    remote_shards, loose_entries = discover_shards(client, bucket, prefix, depth=depth, workers=workers)
+    print(f"Found {len(remote_shards):,} shards under '{prefix}'")
+
+    # Group local keys by shard to find shards that no longer exist remotely
+    low, high = prefix_range(prefix)
+    local_shards = set()
+    local_loose = {}
+    for row in conn.execute(
+        'SELECT key, etag, size, last_modified FROM objects WHERE bucket = ? AND key >= ? AND key < ?',
+        (bucket, low, high)
+    ):
+        shard = shard_prefix(row['key'], depth)
+        if shard is None:
+            local_loose[row['key']] = (row['etag'], row['size'], row['last_modified'])
+        else:
+            local_shards.add(shard)
+
+    totals = {'inserted': 0, 'updated': 0, 'deleted': 0, 'changed_shards': 0}
+
+    for shard in sorted(local_shards - set(remote_shards)):
+        shard_low, shard_high = prefix_range(shard)
+        totals['deleted'] += conn.execute(
+            'DELETE FROM objects WHERE bucket = ? AND key >= ? AND key < ?',
+            (bucket, shard_low, shard_high)
+        ).rowcount
+        totals['changed_shards'] += 1
+
+    inserted, updated, deleted = apply_delta(conn, bucket, loose_entries, local_loose, snapshot_id)
+    totals['inserted'] += inserted
+    totals['updated'] += updated
+    totals['deleted'] += deleted
+
+    def list_shard(shard):
+        contents, _ = list_prefix(client, bucket, shard)
+        return contents
+
+    checked = 0
+    chunk_size = workers * 4
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Work through shards in chunks so only a bounded number of listings is held in memory
+        for start in range(0, len(remote_shards), chunk_size):
+            chunk = remote_shards[start:start + chunk_size]
+            for shard, remote_entries in zip(chunk, executor.map(list_shard, chunk)):
+                remote_rows = _listing_rows(remote_entries)
+                shard_low, shard_high = prefix_range(shard)
+                local_fp = conn.execute(
+                    'SELECT COUNT(*), MAX(last_modified), COALESCE(SUM(size), 0) FROM objects '
+                    'WHERE bucket = ? AND key >= ? AND key < ?',
+                    (bucket, shard_low, shard_high)
+                ).fetchone()
+                remote_fp = _fingerprint([(etag, size, lm) for etag, size, lm in remote_rows.values()])
+
+                if tuple(local_fp) != remote_fp:
+                    local_rows = _local_rows(conn, bucket, shard_low, shard_high)
+                    inserted, updated, deleted = apply_delta(conn, bucket, remote_entries, local_rows, snapshot_id)
+                    if inserted or updated or deleted:
+                        totals['changed_shards'] += 1
+                        totals['inserted'] += inserted
+                        totals['updated'] += updated
+                        totals['deleted'] += deleted
+
+                checked += 1
+            conn.commit()
+            print(f"Checked {checked:,}/{len(remote_shards):,} shards ({totals['changed_shards']:,} changed)...")
+
+    object_count = conn.execute(
+        'SELECT COUNT(*) FROM objects WHERE bucket = ? AND key >= ? AND key < ?',
+        (bucket, low, high)
+    ).fetchone()[0]
+    complete_snapshot(conn, snapshot_id, object_count)
+
+    print(f"Snapshot {snapshot_id}: refreshed '{prefix}' - {totals['changed_shards']:,} shards changed, "
+          f"{totals['inserted']:,} inserted, {totals['updated']:,} updated, {totals['deleted']:,} deleted")
+    return snapshot_id
+
+def latest_snapshot(conn, bucket, prefix=None):
+    """Return the most recent completed snapshot row covering the prefix, or None."""
+    rows = conn.execute(
+        'SELECT * FROM snapshots WHERE bucket = ? AND completed_at IS NOT NULL ORDER BY id DESC',
+        (bucket,)
+    ).fetchall()
+    for row in rows:
+        if prefix is None or prefix.startswith(row['prefix']):
+            return row
+    return None
+
+def as_listing_entry(row):
+    last_modified = row['last_modified']
+    return {
+        'Key': row['key'],
+        'Size': row['size'],
+        'ETag': f'"{row["etag"]}"' if row['etag'] else '',
+        'LastModified': datetime.fromisoformat(last_modified) if last_modified else None
+    }
+
+def iter_objects(conn, bucket, prefix=''):
+    """
+    Yield inventory rows under a prefix in key order, shaped like
+    list_objects_v2 'Contents' entries so scanners can use either source.
+    """
+    low, high = prefix_range(prefix)
+    cursor = conn.execute(
+        'SELECT key, size, etag, last_modified FROM objects '
+        'WHERE bucket = ? AND key >= ? AND key < ? ORDER BY key',
+        (bucket, low, high)
+    )
+    for row in cursor:
+        yield as_listing_entry(row)
+
+def find_by_filename(conn, bucket, filename, case_sensitive=False, prefix=''):
+    """
+    Return listing-shaped entries whose basename equals filename.
+
+    Uses the filename index (case-folded unless case_sensitive), so the
+    cost does not depend on the size of the bucket.
+    """
+    if case_sensitive:
+        column, term = 'filename', filename
+    else:
+        column, term = 'filename_fold', fold_filename(filename)
+    low, high = prefix_range(prefix)
+    cursor = conn.execute(
+        f'SELECT key, size, etag, last_modified FROM objects '
+        f'WHERE bucket = ? AND {column} = ? AND key >= ? AND key < ? ORDER BY key',
+        (bucket, term, low, high)
+    )
+    return [as_listing_entry(row) for row in cursor]
+
+def has_asset(conn, bucket, uuid_norm, filename, prefix=''):
+    """
+    True if an object under prefix has this normalized UUID folder and filename.
+
+    Filenames are compared with surrounding whitespace stripped, the form
+    the asset filter and AssetSet use. The UUID index narrows the probe to
+    one folder, so the comparison is done on its few rows.
+    """
+    low, high = prefix_range(prefix)
+    filename = filename.strip()
+    cursor = conn.execute(
+        'SELECT filename FROM objects WHERE bucket = ? AND uuid_norm = ? AND filename IS NOT NULL '
+        'AND key >= ? AND key < ?',
+        (bucket, uuid_norm, low, high)
+    )
+    return any(row['filename'].strip() == filename for row in cursor)
+
+def require_snapshot(conn, bucket, prefix=''):
+    """Return the latest snapshot covering prefix, printing guidance if there is none."""
+    snapshot = latest_snapshot(conn, bucket, prefix)
+    if snapshot is None:
+        print(f"No completed inventory snapshot covers '{prefix}' in bucket '{bucket}'.")
+        print("Build one with: python scripts/analysis/build_inventory.py --prefix " + (prefix or "''"))
+        return None
+    print(f"Using inventory snapshot {snapshot['id']} of '{snapshot['prefix']}' "
+          f"taken {snapshot['completed_at']} ({snapshot['object_count']:,} objects)")
+    return snapshot
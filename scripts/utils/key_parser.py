@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Shared parsing of object keys and asset paths.
+
+Keys follow br_assets/<batch>/<xx>/<yy>/<UUID>/<filename>; parse_key()
+splits one into batch, shard, UUID (raw and normalized) and filename in a
+single pass. The UUID pattern is compiled once, keys of the usual
+six-segment shape only test the UUID position, and any segment shorter
+than a hyphen-less UUID (32 characters) is rejected before the regex runs.
+"""
+
+import re
+from collections import namedtuple
+
+# Explicit character classes match faster than re.I
+UUID_PATTERN = re.compile(r'[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}')
+UUID_SEARCH = re.compile(r'([0-9A-F]{8}-?[0-9A-F]{4}-?[0-9A-F]{4}-?[0-9A-F]{4}-?[0-9A-F]{12})', re.I)
+HEX_PREFIX = re.compile(r'[0-9A-F]{8,}', re.I)
+
+# Shortest string UUID_PATTERN can match (no hyphens)
+MIN_UUID_LENGTH = 32
+
+KeyParts = namedtuple('KeyParts', ['batch', 'shard', 'uuid', 'uuid_norm', 'filename'])
+
+_uuid_match = UUID_PATTERN.match
+_new_parts = tuple.__new__
+
+def is_uuid_like(s):
+    """True if s starts with a UUID, with or without hyphens."""
+    return len(s) >= MIN_UUID_LENGTH and _uuid_match(s) is not None
+
+def normalize_uuid(uuid):
+    """Remove hyphens and upper-case a UUID; None stays None."""
+    if not uuid:
+        return None
+    return uuid.replace('-', '').upper()
+
+def find_uuid_segment(parts):
+    """Index of the first UUID-like folder segment in parts (the filename excluded), or None."""
+    for i in range(len(parts) - 1):
+        part = parts[i]
+        if len(part) >= MIN_UUID_LENGTH and _uuid_match(part):
+            return i
+    return None
+
+def parse_key(key):
+    """
+    Split an object key into KeyParts(batch, shard, uuid, uuid_norm, filename).
+
+    batch is the second segment of keys at least three segments deep, shard
+    is the folders between batch and the UUID folder ('00/00'), and filename
+    is None for folder keys ending in '/'.
+    """
+    parts = key.split('/')
+    batch = parts[1] if len(parts) >= 3 else None
+    filename = parts[-1] or None
+
+    # Fast path for br_assets/<batch>/<xx>/<yy>/<UUID>/<filename>: only the
+    # UUID position can be UUID-like when the other folders are short
+    if (len(parts) == 6 and len(parts[0]) < MIN_UUID_LENGTH and len(parts[1]) < MIN_UUID_LENGTH
+            and len(parts[2]) < MIN_UUID_LENGTH and len(parts[3]) < MIN_UUID_LENGTH):
+        index = 4 if _uuid_match(parts[4]) else None
+    else:
+        index = find_uuid_segment(parts)
+
+    if index is None:
+        return _new_parts(KeyParts, (batch, None, None, None, filename))
+
+    uuid = parts[index]
+    shard = '/'.join(parts[2:index]) if index > 2 else None
+    return _new_parts(KeyParts, (batch, shard, uuid, uuid.replace('-', '').upper(), filename))
+
+def parse_keys(keys):
+    """Parse a list of keys at once; map() keeps the per-key loop in C."""
+    return list(map(parse_key, keys))
+
+def split_uuid_filename(path):
+    """
+    Extract (uuid, filename) from an asset list line such as
+    E70CC37E-AA88-4D59-831AB9C37C662207/_592A1080.jpg
+
+    Paths with a slash use their last two segments; otherwise a UUID
+    anywhere in the line, then a UUID_filename form, are tried. Returns
+    (None, path) when nothing matches.
+    """
+    if '/' in path:
+        parts = path.strip().split('/')
+        return parts[-2], parts[-1]
+
+    uuid_match = UUID_SEARCH.search(path)
+    if uuid_match:
+        uuid = uuid_match.group(1)
+        # Assume filename is after the UUID
+        rest = path[uuid_match.end():].strip()
+        if rest.startswith('\\'):
+            rest = rest[1:]
+        if rest:
+            return uuid, rest
+
+    parts = path.split('_', 1)
+    if len(parts) == 2 and HEX_PREFIX.match(parts[0]):
+        return parts[0], '_' + parts[1]
+
+    return None, path
+
+def parse_local_path(filepath):
+    """
+    Extract (batch, uuid, filename) from a local path such as
+    D:\\OrganizedBatches\\Batch1\\00\\00\\00005048-8BA2-45A2-A9525155916759FB\\WB7A3733.jpg
+
+    batch is the first segment containing 'batch' (any case) and uuid the
+    first UUID-like segment; either is None when absent.
+    """
+    parts = filepath.replace('\\', '/').split('/')
+
+    uuid = None
+    for part in parts:
+        if len(part) >= MIN_UUID_LENGTH and _uuid_match(part):
+            uuid = part
+            break
+
+    batch = None
+    for part in parts:
+        if 'batch' in part.lower():
+            batch = part
+            break
+
+    return batch, uuid, parts[-1]
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Parallel prefix-sharded bucket listing.
+
+Keys are naturally sharded (br_assets/BatchNN/<hex>/<hex>/UUID/file), so a
+prefix is split into shards with delimiter listings and the shards are
+listed concurrently by a worker pool. Results come back as one merged
+stream of list_objects_v2 entries, optionally in key order, and each shard
+retries from its last key on errors instead of restarting.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from botocore.exceptions import ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotocoreConnectionError
+
+DEFAULT_WORKERS = 16
+
+# Error codes worth retrying a shard for; anything else is raised immediately
+RETRYABLE_CODES = {
+    'SlowDown', 'Throttling', 'ThrottlingException', 'RequestTimeout', 'RequestTimeTooSkewed',
+    'InternalError', 'ServiceUnavailable', '500', '502', '503', '504'
+}
+
+def is_retryable_error(error):
+    """True for throttling, 5xx and connection errors."""
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') in RETRYABLE_CODES
+    # HTTPClientError covers dropped connections (ConnectionClosedError) and read timeouts;
+    # botocore's ConnectionError covers endpoint, connect-timeout and proxy failures
+    return isinstance(error, (HTTPClientError, BotocoreConnectionError, ConnectionError))
+
+def list_prefix(client, bucket, prefix, max_retries=5, delimiter=None):
+    """
+    List one prefix sequentially, resuming after the last key on errors.
+
+    Returns (contents, common_prefixes).
+    """
+    contents = []
+    common_prefixes = []
+    params = {'Bucket': bucket, 'Prefix': prefix}
+    if delimiter:
+        params['Delimiter'] = delimiter
+
+    attempt = 0
+    continuation = None
+    last_key = None
+    while True:
+        try:
+            request = dict(params)
+            if continuation:
+                request['ContinuationToken'] = continuation
+            elif last_key:
+                request['StartAfter'] = last_key
+
+            response = client.list_objects_v2(**request)
+            page_contents = response.get('Contents', [])
+            page_prefixes = [cp['Prefix'] for cp in response.get('CommonPrefixes', [])]
+            contents.extend(page_contents)
+            common_prefixes.extend(page_prefixes)
+            if page_contents or page_prefixes:
+                last_key = max(
+                    page_contents[-1]['Key'] if page_contents else '',
+                    page_prefixes[-1] if page_prefixes else ''
+                )
+            attempt = 0
+
+            if not response.get('IsTruncated'):
+                return contents, common_prefixes
+            continuation = response.get('NextContinuationToken')
+        except Exception as e:
+            attempt += 1
+            if attempt > max_retries or not is_retryable_error(e):
+                raise
+            # Continuation tokens may expire; resume from the last key instead
+            continuation = None
+            delay = min(2 ** attempt, 30)
+            print(f"Error listing '{prefix}' ({e}); retrying in {delay}s (attempt {attempt}/{max_retries})")
+            time.sleep(delay)
+
+def discover_shards(client, bucket, prefix='', depth=None, workers=DEFAULT_WORKERS, target_shards=None,
+                    max_levels=3):
+    """
+    Split a prefix into shards using delimiter listings.
+
+    With depth given, descends until prefixes have that many '/'-separated
+    segments (e.g. depth=3 gives br_assets/BatchNN/xx/). Otherwise descends
+    until there are at least target_shards prefixes (default 4x workers) or
+    max_levels levels have been expanded.
+
+    Returns (shards, loose): sorted shard prefixes, and listing entries for
+    objects that live above the shard level (folder markers, loose files).
+    """
+    target_shards = target_shards or workers * 4
+    level = [prefix]
+    loose = []
+    expanded = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            if depth is not None:
+                if level and level[0].count('/') >= depth:
+                    break
+            elif len(level) >= target_shards or expanded >= max_levels:
+                break
+
+            next_level = []
+            results = executor.map(lambda p: list_prefix(client, bucket, p, delimiter='/'), level)
+            for current, (contents, children) in zip(level, results):
+                loose.extend(contents)
+                next_level.extend(children)
+            expanded += 1
+
+            if not next_level:
+                level = []
+                break
+            level = next_level
+
+    return sorted(level), loose
+
+def list_objects_parallel(client, bucket, prefix='', workers=DEFAULT_WORKERS, ordered=False,
+                          depth=None, max_retries=5):
+    """
+    Generator yielding every object under prefix, listing shards concurrently.
+
+    With ordered=True objects are yielded in key order (shards are consumed
+    in order through a sliding window); otherwise shards are yielded as soon
+    as they finish.
+    """
+    shards, loose = discover_shards(client, bucket, prefix, depth=depth, workers=workers)
+
+    # Loose entries sit outside every shard, so each one is its own unit
+    units = [(shard, None) for shard in shards] + [(obj['Key'], obj) for obj in loose]
+    if ordered:
+        units.sort(key=lambda unit: unit[0])
+
+    window = workers * 2
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit(unit):
+            shard, obj = unit
+            if obj is not None:
+                return None
+            return executor.submit(list_prefix, client, bucket, shard, max_retries)
+
+        pending = []
+        unit_iter = iter(units)
+
+        def fill():
+            for unit in unit_iter:
+                pending.append((unit, submit(unit)))
+                if len(pending) >= window:
+                    break
+
+        fill()
+        while pending:
+            if ordered:
+                (shard, obj), future = pending.pop(0)
+            else:
+                # Prefer whichever in-flight shard finished first
+                done = next((item for item in pending if item[1] is None or item[1].done()), None)
+                if done is None:
+                    next(as_completed([f for _, f in pending if f is not None]))
+                    continue
+                pending.remove(done)
+                (shard, obj), future = done
+
+            if obj is not None:
+                yield obj
+            else:
+                contents, _ = future.result()
+                yield from contents
+            fill()
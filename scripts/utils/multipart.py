@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Resumable multipart uploads for large assets.
+
+An on-disk journal records the upload id and completed parts of every
+in-progress multipart upload, so a restarted run resumes where it stopped
+instead of re-sending the whole file. Also provides a sweeper for
+multipart uploads that were abandoned and still hold billable storage.
+"""
+
+import json
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from botocore.exceptions import ClientError
+
+from utils.config import PROJECT_ROOT
+
+JOURNAL_FILE = PROJECT_ROOT / 'data' / 'state' / 'multipart_journal.json'
+
+# S3 limits: parts are at least 5 MB and an upload has at most 10,000 parts
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+class UploadJournal:
+    """
+    JSON journal of in-progress multipart uploads.
+
+    Entries are keyed by bucket/key and hold the upload id, the source file
+    signature (size and mtime) and the ETag of every completed part. The file
+    is rewritten atomically after each change so a crash never corrupts it.
+    """
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self._entries = json.load(f)
+
+    @staticmethod
+    def _key(bucket, key):
+        return f"{bucket}/{key}"
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def get(self, bucket, key):
+        with self._lock:
+            entry = self._entries.get(self._key(bucket, key))
+            return dict(entry) if entry else None
+
+    def start(self, bucket, key, upload_id, local_path, size, mtime, part_size):
+        with self._lock:
+            self._entries[self._key(bucket, key)] = {
+                'bucket': bucket,
+                'key': key,
+                'upload_id': upload_id,
+                'local_path': os.path.abspath(local_path),
+                'size': size,
+                'mtime': mtime,
+                'part_size': part_size,
+                'started': datetime.now().isoformat(),
+                'parts': {}
+            }
+            self._save()
+
+    def record_part(self, bucket, key, part_number, etag):
+        with self._lock:
+            entry = self._entries.get(self._key(bucket, key))
+            if entry is not None:
+                entry['parts'][str(part_number)] = etag
+                self._save()
+
+    def finish(self, bucket, key):
+        with self._lock:
+            if self._entries.pop(self._key(bucket, key), None) is not None:
+                self._save()
+
+    def upload_ids(self):
+        with self._lock:
+            return {entry['upload_id'] for entry in self._entries.values()}
+
+def choose_part_size(file_size, part_size):
+    """Grow the part size if needed to stay under the 10,000 part limit."""
+    part_size = max(part_size, MIN_PART_SIZE)
+    return max(part_size, math.ceil(file_size / MAX_PARTS))
+
+def list_uploaded_parts(s3_client, bucket, key, upload_id):
+    """Return {part_number: etag} for parts the server already holds, or None if the upload is gone."""
+    parts = {}
+    try:
+        paginator = s3_client.get_paginator('list_parts')
+        for page in paginator.paginate(Bucket=bucket, Key=key, UploadId=upload_id):
+            for part in page.get('Parts', []):
+                parts[part['PartNumber']] = part['ETag']
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchUpload', '404'):
+            return None
+        raise
+    return parts
+
+def _upload_part(s3_client, bucket, key, upload_id, local_path, part_number, part_size):
+    with open(local_path, 'rb') as f:
+        f.seek((part_number - 1) * part_size)
+        body = f.read(part_size)
+    response = s3_client.upload_part(
+        Bucket=bucket,
+        Key=key,
+        UploadId=upload_id,
+        PartNumber=part_number,
+        Body=body
+    )
+    return part_number, response['ETag']
+
+def resumable_upload(s3_client, bucket, local_path, key, journal, part_size=16 * 1024 * 1024,
+                     extra_args=None, threads=4):
+    """
+    Upload a file with multipart upload, resuming a journaled upload if one exists.
+
+    Returns the number of parts that actually had to be sent.
+    """
+    file_size = os.path.getsize(local_path)
+    mtime = os.path.getmtime(local_path)
+    part_size = choose_part_size(file_size, part_size)
+    total_parts = max(1, math.ceil(file_size / part_size))
+
+    upload_id = None
+    completed = {}
+
+    entry = journal.get(bucket, key)
+    if entry:
+        unchanged = (entry['size'] == file_size and entry['mtime'] == mtime
+                     and entry['part_size'] == part_size)
+        server_parts = list_uploaded_parts(s3_client, bucket, key, entry['upload_id'])
+        if unchanged and server_parts is not None:
+            upload_id = entry['upload_id']
+            # Trust the server's view of which parts arrived
+            completed = server_parts
+            print(f"Resuming upload of '{key}': {len(completed)}/{total_parts} parts already sent")
+        else:
+            if server_parts is not None:
+                s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=entry['upload_id'])
+            journal.finish(bucket, key)
+
+    if upload_id is None:
+        response = s3_client.create_multipart_upload(Bucket=bucket, Key=key, **(extra_args or {}))
+        upload_id = response['UploadId']
+        journal.start(bucket, key, upload_id, local_path, file_size, mtime, part_size)
+
+    pending = [n for n in range(1, total_parts + 1) if n not in completed]
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [
+            executor.submit(_upload_part, s3_client, bucket, key, upload_id, local_path, n, part_size)
+            for n in pending
+        ]
+        for future in futures:
+            part_number, etag = future.result()
+            completed[part_number] = etag
+            journal.record_part(bucket, key, part_number, etag)
+
+    s3_client.complete_multipart_upload(
+        Bucket=bucket,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={'Parts': [
+            {'PartNumber': n, 'ETag': completed[n]} for n in sorted(completed)
+        ]}
+    )
+    journal.finish(bucket, key)
+
+    return len(pending)
+
+def abort_orphaned_uploads(s3_client, bucket, prefix='', journal=None, older_than_hours=24, dry_run=False):
+    """
+    Abort multipart uploads under a prefix that no journal entry can resume.
+
+    Uploads tracked by the journal are left alone so they can still be
+    resumed; anything else older than older_than_hours is aborted.
+    Returns the list of (key, upload_id, initiated) that were (or would be) aborted.
+    """
+    tracked = journal.upload_ids() if journal else set()
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=older_than_hours)
+    aborted = []
+
+    paginator = s3_client.get_paginator('list_multipart_uploads')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for upload in page.get('Uploads', []):
+            if upload['UploadId'] in tracked or upload['Initiated'] > cutoff:
+                continue
+
+            if dry_run:
+                print(f"Dry run: Would abort upload of '{upload['Key']}' started {upload['Initiated']}")
+            else:
+                try:
+                    s3_client.abort_multipart_upload(
+                        Bucket=bucket, Key=upload['Key'], UploadId=upload['UploadId']
+                    )
+                    print(f"Aborted orphaned upload of '{upload['Key']}' started {upload['Initiated']}")
+                except ClientError as e:
+                    print(f"Error aborting upload of '{upload['Key']}': {e}")
+                    continue
+            aborted.append((upload['Key'], upload['UploadId'], upload['Initiated']))
+
+    return aborted
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Trigram index over inventory filenames (and optionally full keys).
+
+Every case-folded basename is split into 3-character grams stored as
+postings (gram -> object rowid) in the inventory database. A substring or
+glob query only verifies the objects listed under its rarest grams instead
+of scanning every row; prefix queries use the filename index directly.
+
+The index is derived from the objects table. It is built in full once;
+after that, the first query following a new inventory snapshot only
+re-indexes objects written since the indexed snapshot and drops postings
+of objects that were deleted (ngram_docs remembers what each rowid was
+indexed as, so its old grams can be removed).
+"""
+
+import fnmatch
+import re
+from collections import Counter
+from datetime import datetime
+
+from utils.inventory import as_listing_entry, fold_filename, prefix_range
+
+NGRAM_SIZE = 3
+
+# Rows are written in batches to keep inserts fast on large inventories
+INSERT_BATCH_SIZE = 50000
+
+# Searchable fields: 'filename' indexes basenames, 'key' indexes full keys
+FIELDS = {'filename': 'filename', 'key': 'key'}
+
+MATCH_MODES = ('exact', 'substring', 'prefix', 'glob')
+
+# Past this share of changed objects a full rebuild is cheaper than row-by-row updates
+REBUILD_FRACTION = 0.25
+
+NGRAM_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ngrams (
+    field TEXT NOT NULL,
+    gram TEXT NOT NULL,
+    object_id INTEGER NOT NULL,
+    PRIMARY KEY (field, gram, object_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ngram_counts (
+    field TEXT NOT NULL,
+    gram TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (field, gram)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ngram_docs (
+    field TEXT NOT NULL,
+    object_id INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (field, object_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ngram_meta (
+    field TEXT PRIMARY KEY,
+    snapshot_id INTEGER,
+    built_at TEXT
+);
+"""
+
+GLOB_SPECIAL = re.compile(r'\*|\?|\[[^\]]*\]')
+
+def ngrams(text):
+    """Set of NGRAM_SIZE-character grams in text."""
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+def _current_snapshot_id(conn):
+    return conn.execute('SELECT MAX(id) FROM snapshots WHERE completed_at IS NOT NULL').fetchone()[0]
+
+def _mark_indexed(conn, field, snapshot_id):
+    conn.execute(
+        'INSERT OR REPLACE INTO ngram_meta (field, snapshot_id, built_at) VALUES (?, ?, ?)',
+        (field, snapshot_id, datetime.now().isoformat())
+    )
+
+def build_ngram_index(conn, field='filename'):
+    """(Re)build the postings for one field from the objects table."""
+    column = FIELDS[field]
+    snapshot_id = _current_snapshot_id(conn)
+    print(f"Building {field} trigram index...")
+
+    conn.execute('DELETE FROM ngrams WHERE field = ?', (field,))
+    conn.execute('DELETE FROM ngram_counts WHERE field = ?', (field,))
+    conn.execute('DELETE FROM ngram_docs WHERE field = ?', (field,))
+
+    counts = Counter()
+    postings = []
+    docs = []
+    indexed = 0
+    for object_id, value in conn.execute(f'SELECT rowid, {column} FROM objects WHERE {column} IS NOT NULL'):
+        folded = fold_filename(value)
+        grams = ngrams(folded)
+        counts.update(grams)
+        postings.extend((field, gram, object_id) for gram in grams)
+        docs.append((field, object_id, folded))
+        indexed += 1
+        if len(postings) >= INSERT_BATCH_SIZE:
+            conn.executemany('INSERT OR IGNORE INTO ngrams (field, gram, object_id) VALUES (?, ?, ?)', postings)
+            conn.executemany('INSERT INTO ngram_docs (field, object_id, value) VALUES (?, ?, ?)', docs)
+            postings = []
+            docs = []
+
+    if postings:
+        conn.executemany('INSERT OR IGNORE INTO ngrams (field, gram, object_id) VALUES (?, ?, ?)', postings)
+    if docs:
+        conn.executemany('INSERT INTO ngram_docs (field, object_id, value) VALUES (?, ?, ?)', docs)
+    conn.executemany(
+        'INSERT INTO ngram_counts (field, gram, count) VALUES (?, ?, ?)',
+        [(field, gram, count) for gram, count in counts.items()]
+    )
+    _mark_indexed(conn, field, snapshot_id)
+    conn.commit()
+    print(f"Indexed {indexed:,} {field}s ({len(counts):,} distinct trigrams)")
+
+def update_ngram_index(conn, field, since_snapshot_id):
+    """
+    Bring the postings for one field up to date with the objects table.
+
+    Only objects written by snapshots after since_snapshot_id are compared
+    with what was indexed for their rowid; deleted objects are found by
+    rowid. Returns the number of objects re-indexed or dropped.
+    """
+    column = FIELDS[field]
+    snapshot_id = _current_snapshot_id(conn)
+
+    # (object_id, old folded value, new folded value), all read before any writes
+    changes = []
+    cursor = conn.execute(
+        f'SELECT o.rowid, d.value, o.{column} FROM objects o '
+        f'LEFT JOIN ngram_docs d ON d.field = ? AND d.object_id = o.rowid '
+        f'WHERE o.snapshot_id > ?',
+        (field, since_snapshot_id or 0)
+    )
+    for object_id, old, value in cursor:
+        new = fold_filename(value)
+        if new != old:
+            changes.append((object_id, old, new))
+
+    deleted = conn.execute(
+        'SELECT object_id, value FROM ngram_docs d WHERE field = ? '
+        'AND NOT EXISTS (SELECT 1 FROM objects o WHERE o.rowid = d.object_id)',
+        (field,)
+    ).fetchall()
+    changes.extend((object_id, old, None) for object_id, old in deleted)
+
+    indexed = conn.execute('SELECT COUNT(*) FROM ngram_docs WHERE field = ?', (field,)).fetchone()[0]
+    if len(changes) > indexed * REBUILD_FRACTION:
+        build_ngram_index(conn, field)
+        return len(changes)
+
+    counts = Counter()
+    for object_id, old, new in changes:
+        if old is not None:
+            old_grams = ngrams(old)
+            conn.executemany('DELETE FROM ngrams WHERE field = ? AND gram = ? AND object_id = ?',
+                             [(field, gram, object_id) for gram in old_grams])
+            counts.subtract(old_grams)
+            conn.execute('DELETE FROM ngram_docs WHERE field = ? AND object_id = ?', (field, object_id))
+        if new is not None:
+            new_grams = ngrams(new)
+            conn.executemany('INSERT OR IGNORE INTO ngrams (field, gram, object_id) VALUES (?, ?, ?)',
+                             [(field, gram, object_id) for gram in new_grams])
+            counts.update(new_grams)
+            conn.execute('INSERT INTO ngram_docs (field, object_id, value) VALUES (?, ?, ?)',
+                         (field, object_id, new))
+
+    conn.executemany(
+        'INSERT INTO ngram_counts (field, gram, count) VALUES (?, ?, ?) '
+        'ON CONFLICT (field, gram) DO UPDATE SET count = count + excluded.count',
+        [(field, gram, count) for gram, count in counts.items() if count]
+    )
+    conn.execute('DELETE FROM ngram_counts WHERE field = ? AND count <= 0', (field,))
+    _mark_indexed(conn, field, snapshot_id)
+    conn.commit()
+    if changes:
+        print(f"Updated {field} trigram index for {len(changes):,} changed objects")
+    return len(changes)
+
+def ensure_ngram_index(conn, field='filename'):
+    """Build the index for a field if it is missing; update it if it is older than the latest snapshot."""
+    conn.executescript(NGRAM_SCHEMA)
+    row = conn.execute('SELECT snapshot_id FROM ngram_meta WHERE field = ?', (field,)).fetchone()
+    if row is None:
+        build_ngram_index(conn, field)
+    elif row['snapshot_id'] != _current_snapshot_id(conn):
+        has_docs = conn.execute('SELECT 1 FROM ngram_docs WHERE field = ? LIMIT 1', (field,)).fetchone()
+        has_postings = conn.execute('SELECT 1 FROM ngrams WHERE field = ? LIMIT 1', (field,)).fetchone()
+        if has_postings and not has_docs:
+            # Built before ngram_docs existed, so old grams cannot be removed
+            build_ngram_index(conn, field)
+        else:
+            update_ngram_index(conn, field, row['snapshot_id'])
+
+def _required_grams(term, mode):
+    """Grams every match must contain (folded term), or an empty set if none can be derived."""
+    folded = fold_filename(term) or ''
+    if mode == 'glob':
+        grams = set()
+        for literal in GLOB_SPECIAL.split(folded):
+            grams |= ngrams(literal)
+        return grams
+    return ngrams(folded)
+
+def _candidate_rows(conn, bucket, field, grams, prefix):
+    """Rows containing the rarest two of grams (None if grams cannot narrow the search)."""
+    if not grams:
+        return None
+
+    counts = dict(conn.execute(
+        f'SELECT gram, count FROM ngram_counts WHERE field = ? AND gram IN ({",".join("?" * len(grams))})',
+        (field, *grams)
+    ).fetchall())
+    if len(counts) < len(grams):
+        # A gram that occurs nowhere means nothing can match
+        return []
+
+    rarest = sorted(grams, key=lambda gram: counts[gram])[:2]
+    subquery = ' INTERSECT '.join('SELECT object_id FROM ngrams WHERE field = ? AND gram = ?' for _ in rarest)
+    params = [value for gram in rarest for value in (field, gram)]
+    low, high = prefix_range(prefix)
+    return conn.execute(
+        f'SELECT o.key, o.size, o.etag, o.last_modified, o.filename FROM objects o '
+        f'WHERE o.rowid IN ({subquery}) AND o.bucket = ? AND o.key >= ? AND o.key < ? ORDER BY o.key',
+        (*params, bucket, low, high)
+    ).fetchall()
+
+def value_matches(value, term, mode, case_sensitive=False):
+    """True if value matches term under one of MATCH_MODES."""
+    if not value:
+        return False
+    if not case_sensitive:
+        value, term = fold_filename(value), fold_filename(term)
+    if mode == 'exact':
+        return value == term
+    if mode == 'substring':
+        return term in value
+    if mode == 'prefix':
+        return value.startswith(term)
+    return fnmatch.fnmatchcase(value, term)
+
+def search(conn, bucket, term, mode='substring', field='filename', case_sensitive=False, prefix=''):
+    """
+    Return listing-shaped entries whose filename (or key) matches term.
+
+    mode is one of MATCH_MODES. Call ensure_ngram_index() first.
+    """
+    low, high = prefix_range(prefix)
+
+    if mode in ('exact', 'prefix') and field == 'filename':
+        # The case-folded filename index answers these with a range scan
+        folded = fold_filename(term)
+        fold_high = folded if mode == 'exact' else prefix_range(folded)[1]
+        rows = conn.execute(
+            'SELECT key, size, etag, last_modified, filename FROM objects '
+            'WHERE bucket = ? AND filename_fold >= ? AND filename_fold <= ? AND key >= ? AND key < ? ORDER BY key',
+            (bucket, folded, fold_high, low, high)
+        ).fetchall()
+    else:
+        rows = _candidate_rows(conn, bucket, field, _required_grams(term, mode), prefix)
+        if rows is None:
+            # Term too short for trigrams: verify every local row instead
+            rows = conn.execute(
+                'SELECT key, size, etag, last_modified, filename FROM objects '
+                'WHERE bucket = ? AND key >= ? AND key < ? ORDER BY key',
+                (bucket, low, high)
+            ).fetchall()
+
+    return [as_listing_entry(row) for row in rows
+            if value_matches(row[FIELDS[field]], term, mode, case_sensitive)]
+
+def search_many(conn, bucket, terms, mode='substring', field='filename', case_sensitive=False, prefix=''):
+    """Run search() for every term. Returns {term: [entries]} in input order."""
+    ensure_ngram_index(conn, field)
+    return {term: search(conn, bucket, term, mode, field, case_sensitive, prefix) for term in terms}
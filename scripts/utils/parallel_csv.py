@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Parse large line-oriented files (asset lists, details CSVs) across cores.
+
+The file is cut into byte ranges whose boundaries are moved forward to the
+next newline, so every range holds whole lines and no two ranges share
+one. Each range is decoded and parsed by a top-level function in a
+ProcessPoolExecutor, and the partial results come back in file order for
+the caller to merge. Records must not contain quoted newlines, which holds
+for the details and external HD CSVs these scripts read.
+
+Files smaller than MIN_CHUNK_BYTES per worker use fewer ranges; a single
+range is parsed in-process without starting a pool.
+"""
+
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Smallest range worth shipping to another process
+MIN_CHUNK_BYTES = 4 * 1024 * 1024
+
+def chunk_ranges(file_path, num_chunks, skip_header=True):
+    """
+    Split a file into at most num_chunks newline-aligned (start, end) byte ranges.
+    Returns (header line or None, ranges); the header is excluded from the ranges.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        header = f.readline() if skip_header else None
+        data_start = f.tell()
+
+        bounds = [data_start]
+        for i in range(1, num_chunks):
+            target = data_start + (size - data_start) * i // num_chunks
+            if target <= bounds[-1]:
+                continue
+            # Reading from the byte before target finishes the line it is in
+            f.seek(target - 1)
+            f.readline()
+            position = f.tell()
+            if bounds[-1] < position < size:
+                bounds.append(position)
+        bounds.append(size)
+
+    return header, [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def csv_rows(text):
+    """csv.reader over a decoded range."""
+    return csv.reader(io.StringIO(text, newline=''))
+
+def _parse_range(file_path, start, end, parse_chunk, header, encoding, errors):
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return parse_chunk(data.decode(encoding, errors), header)
+
+def map_chunks(file_path, parse_chunk, workers=DEFAULT_WORKERS, skip_header=True,
+               encoding='utf-8', errors='strict'):
+    """
+    Run parse_chunk(text, header) over newline-aligned ranges of a file.
+
+    parse_chunk must be a module-level function (or functools.partial of
+    one) so it can be sent to worker processes; header is the decoded first
+    line without its line ending, or None when skip_header is False.
+    Returns (header, [parse_chunk results in file order]).
+    """
+    size = os.path.getsize(file_path)
+    num_chunks = max(1, min(workers * 2, size // MIN_CHUNK_BYTES))
+    header, ranges = chunk_ranges(file_path, num_chunks if workers > 1 else 1, skip_header)
+    if header is not None:
+        header = header.decode(encoding, errors).rstrip('\r\n')
+
+    if workers <= 1 or len(ranges) <= 1:
+        return header, [_parse_range(file_path, start, end, parse_chunk, header, encoding, errors)
+                        for start, end in ranges]
+
+    print(f"Parsing {file_path} in {len(ranges)} chunks with {workers} workers...")
+    results = [None] * len(ranges)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_parse_range, file_path, start, end, parse_chunk, header, encoding, errors): i
+            for i, (start, end) in enumerate(ranges)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if done % max(1, len(ranges) // 10) == 0 or done == len(ranges):
+                print(f"Parsed {done}/{len(ranges)} chunks")
+
+    return header, results
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Tests for delete_objects_batch() in scripts/core/bulk_delete_assets.py."""
+
+import os
+import sys
+import unittest
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_dir, 'scripts', 'core'))
+
+from bulk_delete_assets import AdaptiveBackoff, delete_objects_batch
+
+class StubClient:
+    """delete_objects() returns or raises the queued results in order."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.requests = []
+
+    def delete_objects(self, Bucket, Delete):
+        self.requests.append([obj['Key'] for obj in Delete['Objects']])
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+class DeleteObjectsBatchTest(unittest.TestCase):
+
+    def test_rejected_keys_are_not_reported_deleted_when_a_retry_raises(self):
+        client = StubClient(
+            {'Errors': [
+                {'Key': 'a', 'Code': 'AccessDenied', 'Message': 'Access Denied'},
+                {'Key': 'b', 'Code': 'SlowDown', 'Message': 'Reduce your request rate'},
+            ]},
+            ValueError('connection reset')
+        )
+
+        deleted, errors = delete_objects_batch(client, 'bucket', ['a', 'b', 'c'],
+                                               backoff=AdaptiveBackoff(initial_delay=0, max_delay=0))
+
+        self.assertEqual(client.requests, [['a', 'b', 'c'], ['b']])
+        self.assertEqual(deleted, ['c'])
+        self.assertEqual(dict(errors), {'a': 'AccessDenied: Access Denied', 'b': 'connection reset'})
+
+if __name__ == '__main__':
+    unittest.main()